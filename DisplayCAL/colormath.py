@@ -14,6 +14,23 @@ import math
 import sys
 import warnings
 
+from DisplayCAL.util_cache import IdentityCache, LRUCache, freeze
+
+# Named caches, see clear_caches() and debug_caches()
+caches = {}
+
+
+def register_cache(name, maxsize=128, cls=LRUCache):
+    """Create an LRUCache (or subclass) and register it under name"""
+    cache = caches[name] = cls(maxsize)
+    return cache
+
+
+def clear_caches():
+    """Clear all registered caches"""
+    for cache in caches.values():
+        cache.clear()
+
 
 def get_transfer_function_phi(alpha, gamma):
     return (math.pow(1 + alpha, gamma) * math.pow(gamma - 1, gamma - 1)) / (
@@ -584,21 +601,10 @@ def wp_adaption_matrix(
     # based on formula http://brucelindbloom.com/Eqn_ChromAdapt.html
     # cat = adaption matrix or predefined choice ('CAT02', 'Bradford',
     # 'Von Kries', 'XYZ Scaling', see cat_matrices), defaults to 'Bradford'
-    cachehash = (
-        (
-            tuple(whitepoint_source)
-            if isinstance(whitepoint_source, (list, tuple))
-            else whitepoint_source
-        ),
-        (
-            tuple(whitepoint_destination)
-            if isinstance(whitepoint_destination, (list, tuple))
-            else whitepoint_destination
-        ),
-        cat if isinstance(cat, str) else id(cat),
-    )
-    if cachehash in wp_adaption_matrix.cache:
-        return wp_adaption_matrix.cache[cachehash]
+    cachehash = freeze((whitepoint_source, whitepoint_destination, cat))
+    wpam = wp_adaption_matrix.cache.get(cachehash)
+    if wpam is not None:
+        return wpam
     cat = get_cat_matrix(cat)
     wpam = (
         cat.inverted()
@@ -609,7 +615,7 @@ def wp_adaption_matrix(
     return wpam
 
 
-wp_adaption_matrix.cache = {}
+wp_adaption_matrix.cache = register_cache("wp_adaption_matrix.cache", 256)
 
 
 def adapt(X, Y, Z, whitepoint_source=None, whitepoint_destination=None, cat="Bradford"):
@@ -1338,7 +1344,18 @@ def eeColor_to_VidRGB(v):
 def DIN992Lab(L99, a99, b99, kCH=1.0, kE=1.0):
     C99, H99 = DIN99familyab2DIN99CH(a99, b99)
     return DIN99familyLCH2Lab(
-        L99, C99, H99, 0, 105.51, 0.0158, 16, 0.7, 1 / (0.045 * kCH * kE), 0.045, kE, 0
+        L99,
+        C99,
+        H99,
+        0,
+        105.51,
+        0.0158,
+        16,
+        0.7,
+        1 / (0.045 * kCH * kE),
+        0.045,
+        kE=kE,
+        hdeg=0,
     )
 
 
@@ -1350,7 +1367,17 @@ def DIN99b2Lab(L99, a99, b99):
 def DIN99o2Lab(L99, a99, b99, kCH=1.0, kE=1.0):
     C99, H99 = DIN99familyab2DIN99CH(a99, b99)
     return DIN99familyLCH2Lab(
-        L99, C99, H99, 0, 303.67, 0.0039, 26, 0.83, 1 / (0.0435 * kCH * kE), 0.075, kE
+        L99,
+        C99,
+        H99,
+        0,
+        303.67,
+        0.0039,
+        26,
+        0.83,
+        1 / (0.0435 * kCH * kE),
+        0.075,
+        kE=kE,
     )
 
 
@@ -2032,9 +2059,10 @@ def get_rgb_space(rgb_space=None, scale=1.0):
         rgb_space = "sRGB"
     if isinstance(rgb_space, str):
         rgb_space = rgb_spaces[rgb_space]
-    cachehash = tuple(map(id, rgb_space[:5])), scale
-    if cachehash in get_rgb_space.cache:
-        return get_rgb_space.cache[cachehash]
+    components = tuple(rgb_space[:5])
+    cached = get_rgb_space.cache.lookup(components, scale)
+    if cached is not None:
+        return cached
     gamma = rgb_space[0] or rgb_spaces["sRGB"][0]
     whitepoint = get_whitepoint(rgb_space[1] or rgb_spaces["sRGB"][1], scale)
     rx, ry, rY = rxyY = rgb_space[2] or rgb_spaces["sRGB"][2]
@@ -2042,7 +2070,7 @@ def get_rgb_space(rgb_space=None, scale=1.0):
     bx, by, bY = bxyY = rgb_space[4] or rgb_spaces["sRGB"][4]
     matrix = rgb_to_xyz_matrix(rx, ry, gx, gy, bx, by, whitepoint, scale)
     rgb_space = gamma, whitepoint, rxyY, gxyY, bxyY, matrix
-    get_rgb_space.cache[cachehash] = rgb_space
+    get_rgb_space.cache.store(components, scale, value=rgb_space)
     return rgb_space
 
 
@@ -2061,7 +2089,7 @@ def get_rgb_space_primaries_wp_xy(rgb_space=None, digits=4):
     return xy
 
 
-get_rgb_space.cache = {}
+get_rgb_space.cache = register_cache("get_rgb_space.cache", 128, IdentityCache)
 
 
 def get_standard_illuminant(
@@ -2071,8 +2099,9 @@ def get_standard_illuminant(
 ):
     """Return a standard illuminant as XYZ coordinates."""
     cachehash = illuminant_name, tuple(priority), scale
-    if cachehash in get_standard_illuminant.cache:
-        return get_standard_illuminant.cache[cachehash]
+    illuminant = get_standard_illuminant.cache.get(cachehash)
+    if illuminant is not None:
+        return illuminant
     illuminant = None
     for standard_name in priority:
         if standard_name not in standard_illuminants:
@@ -2087,7 +2116,7 @@ def get_standard_illuminant(
     raise ValueError('Unrecognized illuminant "%s"' % illuminant_name)
 
 
-get_standard_illuminant.cache = {}
+get_standard_illuminant.cache = register_cache("get_standard_illuminant.cache", 64)
 
 
 def get_whitepoint(whitepoint=None, scale=1.0, planckian=False):
@@ -2097,8 +2126,9 @@ def get_whitepoint(whitepoint=None, scale=1.0, planckian=False):
     if not whitepoint:
         whitepoint = "D50"
     cachehash = whitepoint, scale, planckian
-    if cachehash in get_whitepoint.cache:
-        return get_whitepoint.cache[cachehash]
+    cached = get_whitepoint.cache.get(cachehash)
+    if cached is not None:
+        return cached
     if isinstance(whitepoint, str):
         whitepoint = get_standard_illuminant(whitepoint)
     elif isinstance(whitepoint, (float, int)):
@@ -2122,7 +2152,7 @@ def get_whitepoint(whitepoint=None, scale=1.0, planckian=False):
     return whitepoint
 
 
-get_whitepoint.cache = {}
+get_whitepoint.cache = register_cache("get_whitepoint.cache", 256)
 
 
 def make_monotonically_increasing(iterable, passes=0, window=None):
@@ -2664,7 +2694,8 @@ def XYZ2RGB(X, Y, Z, rgb_space=None, scale=1.0, round_=False, clamp=True, oetf=N
        gamma = 2.2.
 
     """
-    trc, whitepoint, rxyY, gxyY, bxyY, matrix = get_rgb_space(rgb_space)
+    rgb_space = get_rgb_space(rgb_space)
+    trc, whitepoint, rxyY, gxyY, bxyY, matrix = rgb_space
     RGB = matrix.inverted() * [X, Y, Z]
     is_trc = isinstance(trc, (list, tuple))
     for i, v in enumerate(RGB):
@@ -2677,16 +2708,20 @@ def XYZ2RGB(X, Y, Z, rgb_space=None, scale=1.0, round_=False, clamp=True, oetf=N
         if oetf:
             RGB[i] = oetf(v)
         elif isinstance(gamma, (list, tuple)):
-            key = id(gamma)
-            if key not in XYZ2RGB.interp:
+            # get_rgb_space only returns the same result while the TRC is
+            # unchanged, so the result can key the interpolators. Entries
+            # keep a reference to it, so its id is not reused while cached
+            key = id(rgb_space), i
+            entry = XYZ2RGB.interp.get(key)
+            if entry is None:
                 ginterp = Interp(
                     gamma,
                     [n / float(len(gamma) - 1) for n in range(len(gamma))],
                     use_numpy=True,
                 )
-                XYZ2RGB.interp[key] = ginterp
+                XYZ2RGB.interp[key] = rgb_space, ginterp
             else:
-                ginterp = XYZ2RGB.interp[key]
+                ginterp = entry[1]
             RGB[i] = ginterp(v)
         else:
             RGB[i] = specialpow(v, 1.0 / gamma)
@@ -2696,7 +2731,7 @@ def XYZ2RGB(X, Y, Z, rgb_space=None, scale=1.0, round_=False, clamp=True, oetf=N
     return RGB
 
 
-XYZ2RGB.interp = {}
+XYZ2RGB.interp = register_cache("XYZ2RGB.interp", 192)
 
 
 def XYZ2xyY(X, Y, Z, whitepoint=None):
@@ -3563,7 +3598,17 @@ class BT2390:
 
 
 class Matrix3x3(list):
-    """Simple 3x3 matrix"""
+    """Simple 3x3 matrix
+
+    The rows are lists, so elements can be accessed as matrix[row][column].
+    Multiplying with another matrix composes both, multiplying with a
+    3-vector applies the matrix to it. NumPy arrays with more than one
+    dimension, e.g. (N, 3), are treated as arrays of vectors and the result
+    is an array of the same shape.
+
+    """
+
+    __slots__ = ("_inverted", "_transposed", "_rounded", "_applied", "_array")
 
     def __init__(self, matrix=None):
         super(Matrix3x3, self).__init__()
@@ -3575,23 +3620,32 @@ class Matrix3x3(list):
     def update(self, matrix):
         if len(matrix) != 3:
             raise ValueError("Invalid number of rows for 3x3 matrix: %i" % len(matrix))
-        self._reset()
-        while len(self):
-            self.pop()
+        rows = []
         for row in matrix:
             if len(row) != 3:
                 raise ValueError(
                     "Invalid number of columns for 3x3 matrix: %i" % len(row)
                 )
-            self.append([])
-            for column in row:
-                self[-1].append(column)
+            rows.append(list(row))
+        self._reset()
+        self[:] = rows
 
     def _reset(self):
         self._inverted = None
         self._transposed = None
         self._rounded = {}
         self._applied = {}
+        self._array = None
+
+    @property
+    def array(self):
+        """The matrix as read-only 3x3 NumPy array"""
+        if self._array is None:
+            import numpy
+
+            self._array = numpy.array(self, dtype=numpy.float64)
+            self._array.flags.writeable = False
+        return self._array
 
     def __add__(self, matrix):
         instance = self.__class__()
@@ -3627,54 +3681,20 @@ class Matrix3x3(list):
         return self
 
     def __mul__(self, matrix):
-        if not isinstance(matrix[0], (list, tuple)):
-            return [
-                matrix[0] * self[0][0]
-                + matrix[1] * self[0][1]
-                + matrix[2] * self[0][2],
-                matrix[0] * self[1][0]
-                + matrix[1] * self[1][1]
-                + matrix[2] * self[1][2],
-                matrix[0] * self[2][0]
-                + matrix[1] * self[2][1]
-                + matrix[2] * self[2][2],
-            ]
+        if getattr(matrix, "ndim", 1) > 1:
+            # Array of vectors
+            return matrix @ self.array.T
+        (a, b, c), (d, e, f), (g, h, i) = self
+        x, y, z = matrix[0], matrix[1], matrix[2]
+        if not isinstance(x, (list, tuple)):
+            return [x * a + y * b + z * c, x * d + y * e + z * f, x * g + y * h + z * i]
+        (j, k, l), (m, n, o), (p, q, r) = x, y, z
         instance = self.__class__()
         instance.update(
             [
-                [
-                    self[0][0] * matrix[0][0]
-                    + self[0][1] * matrix[1][0]
-                    + self[0][2] * matrix[2][0],
-                    self[0][0] * matrix[0][1]
-                    + self[0][1] * matrix[1][1]
-                    + self[0][2] * matrix[2][1],
-                    self[0][0] * matrix[0][2]
-                    + self[0][1] * matrix[1][2]
-                    + self[0][2] * matrix[2][2],
-                ],
-                [
-                    self[1][0] * matrix[0][0]
-                    + self[1][1] * matrix[1][0]
-                    + self[1][2] * matrix[2][0],
-                    self[1][0] * matrix[0][1]
-                    + self[1][1] * matrix[1][1]
-                    + self[1][2] * matrix[2][1],
-                    self[1][0] * matrix[0][2]
-                    + self[1][1] * matrix[1][2]
-                    + self[1][2] * matrix[2][2],
-                ],
-                [
-                    self[2][0] * matrix[0][0]
-                    + self[2][1] * matrix[1][0]
-                    + self[2][2] * matrix[2][0],
-                    self[2][0] * matrix[0][1]
-                    + self[2][1] * matrix[1][1]
-                    + self[2][2] * matrix[2][1],
-                    self[2][0] * matrix[0][2]
-                    + self[2][1] * matrix[1][2]
-                    + self[2][2] * matrix[2][2],
-                ],
+                [a * j + b * m + c * p, a * k + b * n + c * q, a * l + b * o + c * r],
+                [d * j + e * m + f * p, d * k + e * n + f * q, d * l + e * o + f * r],
+                [g * j + h * m + i * p, g * k + h * n + i * q, g * l + h * o + i * r],
             ]
         )
         return instance
@@ -3687,46 +3707,26 @@ class Matrix3x3(list):
         if fn in self._applied:
             return self._applied[fn]
         matrix = self.__class__()
-        for row in self:
-            matrix.append([])
-            for column in row:
-                matrix[-1].append(fn(column))
+        matrix.update([[fn(column) for column in row] for row in self])
         self._applied[fn] = matrix
         return matrix
 
     def cofactors(self):
         instance = self.__class__()
-        instance.update(
-            [
-                [
-                    (self[1][1] * self[2][2] - self[1][2] * self[2][1]),
-                    -1 * (self[1][0] * self[2][2] - self[1][2] * self[2][0]),
-                    (self[1][0] * self[2][1] - self[1][1] * self[2][0]),
-                ],
-                [
-                    -1 * (self[0][1] * self[2][2] - self[0][2] * self[2][1]),
-                    (self[0][0] * self[2][2] - self[0][2] * self[2][0]),
-                    -1 * (self[0][0] * self[2][1] - self[0][1] * self[2][0]),
-                ],
-                [
-                    (self[0][1] * self[1][2] - self[0][2] * self[1][1]),
-                    -1 * (self[0][0] * self[1][2] - self[1][0] * self[0][2]),
-                    (self[0][0] * self[1][1] - self[0][1] * self[1][0]),
-                ],
-            ]
-        )
+        instance.update(self._cofactors())
         return instance
 
+    def _cofactors(self):
+        (a, b, c), (d, e, f), (g, h, i) = self
+        return [
+            [(e * i - f * h), -1 * (d * i - f * g), (d * h - e * g)],
+            [-1 * (b * i - c * h), (a * i - c * g), -1 * (a * h - b * g)],
+            [(b * f - c * e), -1 * (a * f - d * c), (a * e - b * d)],
+        ]
+
     def determinant(self):
-        return (
-            self[0][0] * self[1][1] * self[2][2]
-            + self[1][0] * self[2][1] * self[0][2]
-            + self[0][1] * self[1][2] * self[2][0]
-        ) - (
-            self[2][0] * self[1][1] * self[0][2]
-            + self[1][0] * self[0][1] * self[2][2]
-            + self[2][1] * self[1][2] * self[0][0]
-        )
+        (a, b, c), (d, e, f), (g, h, i) = self
+        return (a * e * i + d * h * c + b * f * g) - (g * e * c + d * b * i + h * f * a)
 
     def invert(self):
         # inplace
@@ -3735,28 +3735,21 @@ class Matrix3x3(list):
     def inverted(self):
         if self._inverted:
             return self._inverted
-        determinant = self.determinant()
-        matrix = self.adjoint()
+        # Inverses are also cached by value, so equal matrices (e.g. ones
+        # that are re-created on every call) only get inverted once
+        key = freeze(self)
+        rows = Matrix3x3.inverse_cache.get(key)
+        if rows is None:
+            determinant = self.determinant()
+            cofactors = self._cofactors()
+            # Adjoint (transposed cofactors) divided by the determinant
+            rows = tuple(
+                tuple(cofactors[column][row] / determinant for column in range(3))
+                for row in range(3)
+            )
+            Matrix3x3.inverse_cache[key] = rows
         instance = self.__class__()
-        instance.update(
-            [
-                [
-                    matrix[0][0] / determinant,
-                    matrix[0][1] / determinant,
-                    matrix[0][2] / determinant,
-                ],
-                [
-                    matrix[1][0] / determinant,
-                    matrix[1][1] / determinant,
-                    matrix[1][2] / determinant,
-                ],
-                [
-                    matrix[2][0] / determinant,
-                    matrix[2][1] / determinant,
-                    matrix[2][2] / determinant,
-                ],
-            ]
-        )
+        instance.update(rows)
         self._inverted = instance
         return instance
 
@@ -3764,10 +3757,7 @@ class Matrix3x3(list):
         if digits in self._rounded:
             return self._rounded[digits]
         matrix = self.__class__()
-        for row in self:
-            matrix.append([])
-            for column in row:
-                matrix[-1].append(round(column, digits))
+        matrix.update([[round(column, digits) for column in row] for row in self])
         self._rounded[digits] = matrix
         return matrix
 
@@ -3789,6 +3779,9 @@ class Matrix3x3(list):
         return instance
 
 
+Matrix3x3.inverse_cache = register_cache("Matrix3x3.inverse_cache", 256)
+
+
 class NumberTuple(tuple):
     def __repr__(self):
         return "(%s)" % ", ".join(str(value) for value in self)
@@ -4103,29 +4096,32 @@ optimalcolors_Lab = [
 
 
 def debug_caches():
-    for cache in (
-        "XYZ2RGB.interp",
-        "wp_adaption_matrix.cache",
-        "get_rgb_space.cache",
-        "get_standard_illuminant.cache",
-        "get_whitepoint.cache",
-    ):
-        cn, ck = cache.split(".")
-        c = getattr(globals()[cn], ck)
+    for cache, c in caches.items():
         count = 0
         seen = {}
-        for k in c:
-            v = c[k]
-            for kk in c:
-                vv = c[kk]
+        items = c.items()
+        for k, v in items:
+            for kk, vv in items:
                 # Check for equality, not identity
                 if k != kk and v == vv and kk not in seen:
                     count += 1
                     seen[kk] = True
-        print(cache, len(c), "entries", max(count - 1, 0), "duplicates")
+        stats = c.stats()
+        print(
+            cache,
+            stats["entries"],
+            "entries (max %i)," % stats["maxsize"],
+            stats["hits"],
+            "hits,",
+            stats["misses"],
+            "misses,",
+            stats["evictions"],
+            "evictions,",
+            max(count - 1, 0),
+            "duplicates",
+        )
         if count > 1:
-            for k in c:
-                v = c[k]
+            for k, v in items:
                 print(k, v)
 
 
@@ -0,0 +1,1200 @@
+# -*- coding: utf-8 -*-
+"""
+Array versions of the color conversions in colormath.
+
+The functions in this module have the same names and parameters as their
+counterparts in colormath, but take the color values as one array-like
+argument with the three components on the last axis, e.g. an (N, 3) array of
+XYZ values, and return float64 NumPy arrays of the same shape.
+
+Whitepoints can be given as in colormath (name, XYZ or color temperature) or
+as arrays that broadcast against the input, e.g. one XYZ whitepoint per color.
+CAT matrices can be given as names, 3x3 matrices or (N, 3, 3) arrays.
+
+Transfer functions passed as eotf/oetf need to accept NumPy arrays.
+
+"""
+
+import math
+
+import numpy
+
+from DisplayCAL import colormath
+from DisplayCAL.colormath import LSTAR_E, LSTAR_K
+from DisplayCAL.util_cache import freeze
+
+
+def asarray(values):
+    """Return values as float64 array with three components on the last axis"""
+    values = numpy.asarray(values, dtype=numpy.float64)
+    if values.ndim == 0 or values.shape[-1] != 3:
+        raise ValueError(
+            "Expected three components on the last axis, got shape %r" % (values.shape,)
+        )
+    return values
+
+
+def split(values):
+    """Split values into its three components"""
+    return values[..., 0], values[..., 1], values[..., 2]
+
+
+def stack(c1, c2, c3):
+    """Stack three components (broadcasting them) into one array"""
+    return numpy.stack(numpy.broadcast_arrays(c1, c2, c3), axis=-1).astype(
+        numpy.float64, copy=False
+    )
+
+
+def apply_matrix(matrix, values):
+    """Apply a 3x3 matrix (or an array of 3x3 matrices) to values"""
+    if isinstance(matrix, colormath.Matrix3x3):
+        matrix = matrix.array
+    matrix = numpy.asarray(matrix, dtype=numpy.float64)
+    values = asarray(values)
+    if matrix.ndim == 2:
+        return values @ matrix.T
+    return numpy.matmul(matrix, values[..., None])[..., 0]
+
+
+def get_cat_matrix(cat="Bradford"):
+    """Return a CAT matrix (or array of CAT matrices) as array"""
+    if isinstance(cat, (str, bytes)):
+        cat = colormath.get_cat_matrix(cat)
+    return numpy.asarray(cat, dtype=numpy.float64)
+
+
+def get_whitepoint(whitepoint=None, scale=1.0, planckian=False):
+    """Return a whitepoint (or array of whitepoints) as XYZ array
+
+    Like colormath.get_whitepoint, XYZ values are returned unscaled.
+
+    """
+    if isinstance(whitepoint, (list, tuple, numpy.ndarray)):
+        return asarray(whitepoint)
+    return numpy.array(
+        colormath.get_whitepoint(whitepoint, scale, planckian), dtype=numpy.float64
+    )
+
+
+def specialpow(a, b, slope_limit=0):
+    """Array version of colormath.specialpow"""
+    a = numpy.asarray(a, dtype=numpy.float64)
+    if b >= 0.0:
+        # Power curve
+        v = numpy.copysign(numpy.power(numpy.abs(a), b), a)
+        if slope_limit:
+            limit = a / slope_limit
+            v = numpy.where(a < 0.0, numpy.minimum(v, limit), numpy.maximum(v, limit))
+        return v
+    sign = numpy.where(a < 0.0, -1.0, 1.0)
+    a = numpy.abs(a)
+    if b in (1.0 / -601, 1.0 / -709):
+        # XYZ -> RGB, Rec. 601/709 TRC
+        v = numpy.where(
+            a < colormath.REC709_K0 / colormath.REC709_P,
+            a * colormath.REC709_P,
+            1.099 * a**0.45 - 0.099,
+        )
+    elif b == 1.0 / -240:
+        # XYZ -> RGB, SMPTE 240M TRC
+        v = numpy.where(
+            a < colormath.SMPTE240M_K0 / colormath.SMPTE240M_P,
+            a * colormath.SMPTE240M_P,
+            1.1115 * a**0.45 - 0.1115,
+        )
+    elif b == 1.0 / -3.0:
+        # XYZ -> RGB, L* TRC
+        v = numpy.where(a <= LSTAR_E, 0.01 * a * LSTAR_K, 1.16 * numpy.cbrt(a) - 0.16)
+    elif b == 1.0 / -2.4:
+        # XYZ -> RGB, sRGB TRC
+        v = numpy.where(
+            a <= colormath.SRGB_K0 / colormath.SRGB_P,
+            a * colormath.SRGB_P,
+            1.055 * a ** (1.0 / 2.4) - 0.055,
+        )
+    elif b == 1.0 / -2084:
+        # XYZ -> RGB, SMPTE 2084 (PQ)
+        am1 = a**colormath.SMPTE2084_M1
+        v = ((2413.0 * am1 + 107) / (2392.0 * am1 + 128)) ** colormath.SMPTE2084_M2
+    elif b == -2.4:
+        # RGB -> XYZ, sRGB TRC
+        v = numpy.where(
+            a <= colormath.SRGB_K0,
+            a / colormath.SRGB_P,
+            ((a + 0.055) / 1.055) ** 2.4,
+        )
+    elif b == -3.0:
+        # RGB -> XYZ, L* TRC
+        v = numpy.where(a <= 0.08, 100.0 * a / LSTAR_K, ((a + 0.16) / 1.16) ** 3.0)
+    elif b == -240:
+        # RGB -> XYZ, SMPTE 240M TRC
+        v = numpy.where(
+            a < colormath.SMPTE240M_K0,
+            a / colormath.SMPTE240M_P,
+            ((0.1115 + a) / 1.1115) ** (1.0 / 0.45),
+        )
+    elif b in (-601, -709):
+        # RGB -> XYZ, Rec. 601/709 TRC
+        v = numpy.where(
+            a < colormath.REC709_K0,
+            a / colormath.REC709_P,
+            ((a + 0.099) / 1.099) ** (1.0 / 0.45),
+        )
+    elif b == -2084:
+        # RGB -> XYZ, SMPTE 2084 (PQ)
+        am2 = a ** (1.0 / colormath.SMPTE2084_M2)
+        v = (
+            numpy.maximum(am2 - colormath.SMPTE2084_C1, 0)
+            / (colormath.SMPTE2084_C2 - colormath.SMPTE2084_C3 * am2)
+        ) ** (1.0 / colormath.SMPTE2084_M1)
+    else:
+        raise ValueError("Invalid gamma %r" % b)
+    return v * sign
+
+
+def pq_encode(v):
+    """PQ (SMPTE 2084) inverse EOTF, linear [0, 1] to E'"""
+    return specialpow(v, 1.0 / -2084)
+
+
+def pq_decode(v):
+    """PQ (SMPTE 2084) EOTF, E' to linear [0, 1]"""
+    return specialpow(v, -2084)
+
+
+# Transfer functions
+
+HLG_A = 0.17883277
+HLG_B = 1 - 4 * HLG_A
+HLG_C = 0.5 - HLG_A * math.log(4 * HLG_A)
+
+
+class TransferFunction:
+    """Transfer function between linear light and a non-linear signal
+
+    decode() is the EOTF (signal to linear light), encode() is its inverse.
+    Both take array-likes and return float64 arrays.
+
+    """
+
+    def decode(self, v):
+        raise NotImplementedError
+
+    def encode(self, v):
+        raise NotImplementedError
+
+    def lut(self, size=65537):
+        """Return a precomputed table version of this transfer function"""
+        return TransferFunctionLUT(self, size)
+
+
+class SpecialPowTransferFunction(TransferFunction):
+    """Power curve or one of the standard curves known to specialpow
+
+    gamma is the decoding exponent as understood by colormath.specialpow,
+    e.g. 2.2, -2.4 (sRGB), -3.0 (L*), -240 (SMPTE 240M), -709 (Rec. 709) or
+    -2084 (SMPTE 2084 PQ).
+
+    """
+
+    def __init__(self, gamma):
+        self.gamma = gamma
+
+    def decode(self, v):
+        return specialpow(v, self.gamma)
+
+    def encode(self, v):
+        return specialpow(v, 1.0 / self.gamma)
+
+
+class HLGTransferFunction(TransferFunction):
+    """Hybrid Log Gamma (HLG) EOTF for neutral colors
+
+    Array version of colormath.HLG.eotf for gray values (R = G = B).
+
+    """
+
+    def __init__(
+        self,
+        black_cdm2=0.0,
+        white_cdm2=1000.0,
+        system_gamma=1.2,
+        ambient_cdm2=5,
+        apply_black_offset=True,
+    ):
+        self.hlg = colormath.HLG(black_cdm2, white_cdm2, system_gamma, ambient_cdm2)
+        self.apply_black_offset = apply_black_offset
+
+    def oetf(self, v, inverse=False):
+        """Array version of colormath.HLG.oetf"""
+        v = numpy.asarray(v, dtype=numpy.float64)
+        with numpy.errstate(invalid="ignore", divide="ignore"):
+            if inverse:
+                # Non-linear HLG signal to relative scene linear light
+                result = numpy.where(
+                    (v >= 0) & (v <= 1 / 2.0),
+                    v**2 / 3.0,
+                    (numpy.exp((v - HLG_C) / HLG_A) + HLG_B) / 12.0,
+                )
+            else:
+                # Relative scene linear light to non-linear HLG signal
+                result = numpy.where(
+                    (v >= 0) & (v <= 1 / 12.0),
+                    numpy.sqrt(3 * v),
+                    HLG_A * numpy.log(12 * v - HLG_B) + HLG_C,
+                )
+        return numpy.where(v == 1, 1.0, result)
+
+    def ootf(self, v, inverse=False):
+        """Array version of colormath.HLG.ootf for gray values"""
+        v = numpy.asarray(v, dtype=numpy.float64)
+        hlg = self.hlg
+        if self.apply_black_offset:
+            black_cdm2 = float(hlg.black_cdm2)
+        else:
+            black_cdm2 = 0
+        alpha = (hlg.white_cdm2 - black_cdm2) / hlg.white_cdm2
+        beta = black_cdm2 / hlg.white_cdm2
+        gamma = hlg.gamma
+        Y = 0.2627 * v + 0.6780 * v + 0.0593 * v
+        with numpy.errstate(invalid="ignore", divide="ignore"):
+            if inverse:
+                return numpy.where(
+                    Y > beta,
+                    ((Y - beta) / alpha) ** ((1 - gamma) / gamma)
+                    * ((v - beta) / alpha),
+                    0.0,
+                )
+            Y = numpy.where(Y != 0, Y ** (gamma - 1), Y)
+        return alpha * Y * v + beta
+
+    def decode(self, v):
+        return self.ootf(self.oetf(v, True))
+
+    def encode(self, v):
+        return self.oetf(self.ootf(v, True))
+
+
+class BT1886TransferFunction(TransferFunction):
+    """BT.1886 like EOTF with black offset
+
+    Uses the same input/output offset split as colormath.BT1886, but without
+    the Rec. 709 viewing adjustment and black point hue blending. black_Y is
+    the relative black level, outoffset the part of it (0..1) that is
+    accounted for in the output.
+
+    """
+
+    def __init__(self, black_Y=0.0, outoffset=0.0, gamma=2.4):
+        self.gamma = gamma
+        black_Y = max(black_Y, 0.0)
+        # Offset acounted for in output
+        self.outo = black_Y * outoffset
+        # Balance of offset accounted for in input
+        ino = black_Y - self.outo
+        bkipow = math.pow(ino, 1.0 / gamma)
+        wtipow = math.pow(1.0 - self.outo, 1.0 / gamma)
+        self.ingo = bkipow / (wtipow - bkipow)
+        self.outsc = math.pow(wtipow - bkipow, gamma)
+
+    def decode(self, v):
+        v = numpy.asarray(v, dtype=numpy.float64) + self.ingo
+        with numpy.errstate(invalid="ignore"):
+            v = numpy.where(v > 0, self.outsc * v**self.gamma, v)
+        return v + self.outo
+
+    def encode(self, v):
+        v = numpy.asarray(v, dtype=numpy.float64) - self.outo
+        with numpy.errstate(invalid="ignore"):
+            v = numpy.where(v > 0, (v / self.outsc) ** (1.0 / self.gamma), v)
+        return v - self.ingo
+
+
+class TransferFunctionLUT(TransferFunction):
+    """Precomputed table version of a transfer function
+
+    The table has size entries, evenly spaced over the signal range 0..1.
+    decode() interpolates linearly in the table, encode() interpolates in the
+    same table inversely, which needs decode to be monotonically increasing.
+    Input outside of the table range is clipped.
+
+    decode_error and encode_error estimate the largest absolute interpolation
+    errors. They are the largest errors found when sampling the transfer
+    function at eight points between each pair of table entries.
+
+    """
+
+    def __init__(self, transfer_function, size=65537):
+        if size < 2:
+            raise ValueError("LUT size must be at least 2, got %r" % size)
+        self.transfer_function = transfer_function
+        self.signal = numpy.linspace(0.0, 1.0, size)
+        self.linear = transfer_function.decode(self.signal)
+        # Flatten the small steps at the joints of piecewise defined transfer
+        # functions (up to 5.5e-5 for Rec. 709 as defined in specialpow) so
+        # the inverse lookup stays valid
+        increasing = numpy.maximum.accumulate(self.linear)
+        if numpy.max(increasing - self.linear) > 1e-4:
+            raise ValueError("Transfer function is not monotonically increasing")
+        self.linear = increasing
+        self._slope = numpy.diff(self.linear)
+        steps = (numpy.arange(1, 9) / 9.0)[:, None]
+        signal = (self.signal[:-1] + steps / (size - 1)).ravel()
+        linear = transfer_function.decode(signal)
+        self.decode_error = float(numpy.max(numpy.abs(self.decode(signal) - linear)))
+        self.encode_error = float(numpy.max(numpy.abs(self.encode(linear) - signal)))
+
+    @property
+    def size(self):
+        return len(self.signal)
+
+    def decode(self, v):
+        maxindex = len(self._slope)
+        v = numpy.clip(numpy.asarray(v, dtype=numpy.float64), 0.0, 1.0) * maxindex
+        i = numpy.minimum(v.astype(numpy.intp), maxindex - 1)
+        return self.linear[i] + self._slope[i] * (v - i)
+
+    def encode(self, v):
+        return numpy.interp(v, self.linear, self.signal)
+
+    def lut(self, size=65537):
+        return self.transfer_function.lut(size)
+
+
+# Names (case-insensitive) for get_transfer_function. Numbers are exponents
+# for specialpow
+transfer_functions = {
+    "sRGB": -2.4,
+    "L*": -3.0,
+    "Rec. 601": -601,
+    "Rec. 709": -709,
+    "SMPTE 240M": -240,
+    "SMPTE 2084": -2084,
+    "PQ": -2084,
+    "HLG": HLGTransferFunction,
+    "BT.1886": BT1886TransferFunction,
+}
+
+
+def get_transfer_function(name, lut_size=None, **kwargs):
+    """Return a TransferFunction by name or specialpow exponent
+
+    name is one of the names in transfer_functions, a specialpow exponent
+    like 2.2 or -2.4, or a TransferFunction instance. kwargs are passed to
+    the transfer function class, e.g. white_cdm2 for HLG.
+
+    If lut_size is given, a TransferFunctionLUT of that size is returned.
+    LUTs are cached by name, size and parameters.
+
+    """
+    if lut_size:
+        key = (
+            freeze(name),
+            lut_size,
+            tuple((key, freeze(value)) for key, value in sorted(kwargs.items())),
+        )
+        lut = get_transfer_function.cache.get(key)
+        if lut is None:
+            lut = get_transfer_function(name, **kwargs).lut(lut_size)
+            get_transfer_function.cache[key] = lut
+        return lut
+    if isinstance(name, TransferFunction):
+        return name
+    if isinstance(name, str):
+        names = {key.lower(): value for key, value in transfer_functions.items()}
+        if name.lower() not in names:
+            raise ValueError("Unknown transfer function %r" % name)
+        name = names[name.lower()]
+    if isinstance(name, type):
+        return name(**kwargs)
+    return SpecialPowTransferFunction(name, **kwargs)
+
+
+get_transfer_function.cache = colormath.register_cache(
+    "colormath_array.get_transfer_function.cache", 16
+)
+
+
+class BT2390(colormath.BT2390):
+    """Array version of colormath.BT2390"""
+
+    def apply(
+        self,
+        v,
+        KS=None,
+        maxi=None,
+        maxci=None,
+        mini=None,
+        mmaxi=None,
+        mmini=None,
+        bpc=False,
+        normalize=True,
+    ):
+        """Apply roll-off (E' in, E' out) to an array of values"""
+        if KS is None:
+            KS = self.KS
+        if maxi is None:
+            maxi = self.maxi
+        if mini is None:
+            mini = self.mini
+        if mmaxi is None:
+            mmaxi = self.mmaxi
+        if mmini is None:
+            mmini = self.mmini
+        if maxci is None:
+            maxci = self.maxci
+        v = numpy.asarray(v, dtype=numpy.float64)
+        normalize = normalize and mmini is not None and mmaxi is not None
+        if normalize:
+            # Normalize PQ values based on mastering display black/white levels
+            E1 = numpy.clip((v - mmini) / (mmaxi - mmini), 0, 1.0)
+        else:
+            E1 = v
+        with numpy.errstate(invalid="ignore", divide="ignore"):
+            # See colormath.BT2390.apply for the deviations from BT.2390-3
+            E2 = self.P(E1, KS, maxi)
+            if maxi <= maxci < 1:
+                E2 = numpy.minimum(E1 - (E1 - E2) * self.s, maxi)
+            elif maxci < 1:
+                E2 = numpy.minimum(E1, maxci)
+            E2 = numpy.where((KS < E1) & (E1 <= 1), E2, E1)
+            if mini:
+                # Apply black level lift
+                b = mini
+                if b >= 0:
+                    p = min(1.0 / b, 4)
+                else:
+                    p = 4
+                E3 = E2 + b * (1 - E2) ** p
+                if maxi < 1:
+                    E3 = colormath.convert_range(
+                        E3, b, maxi + b * (1 - maxi) ** p, b, maxi
+                    )
+                E3 = numpy.where(E2 <= 1, E3, E2)
+            else:
+                E3 = E2
+        if bpc:
+            E3 = colormath.convert_range(E3, mini, maxi, 0, maxi)
+        if normalize:
+            # Invert the normalization of the PQ values
+            E3 = E3 * (mmaxi - mmini) + mmini
+        return numpy.maximum(E3, 0)
+
+
+def wp_adaption_matrix(
+    whitepoint_source=None, whitepoint_destination=None, cat="Bradford"
+):
+    """Return the chromatic adaption matrix (or array of matrices) between
+    source and destination whitepoints
+
+    """
+    cat = get_cat_matrix(cat)
+    XYZWS = get_whitepoint(whitepoint_source)
+    XYZWD = get_whitepoint(whitepoint_destination)
+    # make sure the scaling is identical
+    XYZWD = numpy.where(
+        ((XYZWS[..., 1] <= 1.0) & (XYZWD[..., 1] > 1.0))[..., None],
+        XYZWD / XYZWD[..., 1:2] * XYZWS[..., 1:2],
+        XYZWD,
+    )
+    XYZWS = numpy.where(
+        ((XYZWD[..., 1] <= 1.0) & (XYZWS[..., 1] > 1.0))[..., None],
+        XYZWS / XYZWS[..., 1:2] * XYZWD[..., 1:2],
+        XYZWS,
+    )
+    ratio = apply_matrix(cat, XYZWD) / apply_matrix(cat, XYZWS)
+    return numpy.linalg.inv(cat) @ (ratio[..., :, None] * cat)
+
+
+def adapt(XYZ, whitepoint_source=None, whitepoint_destination=None, cat="Bradford"):
+    """Transform XYZ under source illuminant to XYZ under destination illuminant"""
+    return apply_matrix(
+        wp_adaption_matrix(whitepoint_source, whitepoint_destination, cat), XYZ
+    )
+
+
+def XYZ2Lab(XYZ, whitepoint=None, scale=100):
+    """Convert from XYZ to Lab (see colormath.XYZ2Lab)"""
+    r = asarray(XYZ) / get_whitepoint(whitepoint, scale)
+    f = numpy.where(r > LSTAR_E, numpy.cbrt(r), (LSTAR_K * r + 16) / 116.0)
+    fx, fy, fz = split(f)
+    return stack(116 * fy - 16, 500 * (fx - fy), 200 * (fy - fz))
+
+
+def Lab2XYZ(Lab, whitepoint=None, scale=1.0):
+    """Convert from Lab to XYZ (see colormath.Lab2XYZ)"""
+    L, a, b = split(asarray(Lab))
+    fy = (L + 16) / 116.0
+    fx = a / 500.0 + fy
+    fz = fy - b / 200.0
+    xr = numpy.where(fx**3 > LSTAR_E, fx**3, (116.0 * fx - 16) / LSTAR_K)
+    yr = numpy.where(L > LSTAR_K * LSTAR_E, fy**3, L / LSTAR_K)
+    zr = numpy.where(fz**3 > LSTAR_E, fz**3, (116.0 * fz - 16) / LSTAR_K)
+    return stack(xr, yr, zr) * get_whitepoint(whitepoint, scale)
+
+
+def Lab2LCHab(Lab):
+    """Convert from Lab to LCh(ab), hue in degrees [0, 360)"""
+    L, a, b = split(asarray(Lab))
+    H = 180.0 * numpy.arctan2(b, a) / numpy.pi
+    return stack(L, numpy.hypot(a, b), numpy.where(H < 0.0, H + 360.0, H))
+
+
+def LCHab2Lab(LCH):
+    """Convert from LCh(ab) to Lab"""
+    L, C, H = split(asarray(LCH))
+    H = H * numpy.pi / 180.0
+    return stack(L, C * numpy.cos(H), C * numpy.sin(H))
+
+
+def Lab2xyY(Lab, whitepoint=None, scale=1.0):
+    return XYZ2xyY(Lab2XYZ(Lab, whitepoint, scale), whitepoint)
+
+
+def XYZ2xyY(XYZ, whitepoint=None):
+    """Convert from XYZ to xyY (see colormath.XYZ2xyY)
+
+    For black, x and y are set to the chromaticity of the whitepoint.
+
+    """
+    XYZ = asarray(XYZ)
+    X, Y, Z = split(XYZ)
+    total = X + Y + Z
+    black = total == 0
+    if black.any():
+        wX, wY, wZ = split(get_whitepoint(whitepoint))
+        wtotal = wX + wY + wZ
+        total = numpy.where(black, 1.0, total)
+        x = numpy.where(black, wX / wtotal, X / total)
+        y = numpy.where(black, wY / wtotal, Y / total)
+    else:
+        x = X / total
+        y = Y / total
+    return stack(x, y, Y)
+
+
+def xyY2XYZ(xyY):
+    """Convert from xyY to XYZ (see colormath.xyY2XYZ)
+
+    Where y = 0, X = Y = Z = 0 is returned.
+
+    """
+    x, y, Y = split(asarray(xyY))
+    zero = y == 0
+    y = numpy.where(zero, 1.0, y)
+    XYZ = stack(x * Y / y, Y, (1 - x - y) * Y / y)
+    XYZ[zero] = 0
+    return XYZ
+
+
+def xyY2Lab(xyY, whitepoint=None):
+    return XYZ2Lab(xyY2XYZ(xyY), whitepoint)
+
+
+def _Lu_v_(XYZ, whitepoint=None):
+    """Return L, u', v' and a mask of black (X + Y + Z = 0) values"""
+    X, Y, Z = split(asarray(XYZ))
+    denominator = X + 15.0 * Y + 3.0 * Z
+    black = X + Y + Z == 0
+    wX, wY, wZ = split(get_whitepoint(whitepoint))
+    wdenominator = wX + 15.0 * wY + 3.0 * wZ
+    u_r = 4.0 * wX / wdenominator
+    v_r = 9.0 * wY / wdenominator
+    denominator = numpy.where(black, 1.0, denominator)
+    u_ = numpy.where(black, u_r, 4.0 * X / denominator)
+    v_ = numpy.where(black, v_r, 9.0 * Y / denominator)
+    yr = Y / get_whitepoint(whitepoint, 100)[..., 1]
+    L = numpy.where(yr > LSTAR_E, 116.0 * numpy.cbrt(yr) - 16.0, LSTAR_K * yr)
+    L = numpy.where(black, 0.0, L)
+    return L, u_, v_, u_r, v_r
+
+
+def XYZ2Lu_v_(XYZ, whitepoint=None):
+    """Convert from XYZ to CIE Lu'v'"""
+    L, u_, v_ = _Lu_v_(XYZ, whitepoint)[:3]
+    return stack(L, u_, v_)
+
+
+def XYZ2Luv(XYZ, whitepoint=None):
+    """Convert from XYZ to Luv"""
+    L, u_, v_, u_r, v_r = _Lu_v_(XYZ, whitepoint)
+    return stack(L, 13.0 * L * (u_ - u_r), 13.0 * L * (v_ - v_r))
+
+
+def Luv2XYZ(Luv, whitepoint=None, scale=1.0):
+    """Convert from Luv to XYZ"""
+    L, u, v = split(asarray(Luv))
+    Xr, Yr, Zr = split(get_whitepoint(whitepoint))
+    Y = numpy.where(L > LSTAR_K * LSTAR_E, ((L + 16.0) / 116.0) ** 3, L / LSTAR_K)
+    uo = (4.0 * Xr) / (Xr + 15.0 * Yr + 3.0 * Zr)
+    vo = (9.0 * Yr) / (Xr + 15.0 * Yr + 3.0 * Zr)
+    a = (1.0 / 3.0) * (((52.0 * L) / (u + 13 * L * uo)) - 1)
+    b = -5.0 * Y
+    c = -(1.0 / 3.0)
+    d = Y * (((39.0 * L) / (v + 13 * L * vo)) - 5)
+    X = (d - b) / (a - c)
+    return stack(X, Y, X * a + b) * scale
+
+
+def _get_trcs(trc):
+    """Return the per-channel TRCs of an RGB space"""
+    if isinstance(trc, (list, tuple)) and len(trc) == 3:
+        return trc
+    return (trc,) * 3
+
+
+def RGB2XYZ(RGB, rgb_space=None, scale=1.0, eotf=None):
+    """Convert from RGB to XYZ (see colormath.RGB2XYZ)"""
+    trc, whitepoint, rxyY, gxyY, bxyY, matrix = colormath.get_rgb_space(rgb_space)
+    RGB = asarray(RGB)
+    channels = []
+    for i, gamma in enumerate(_get_trcs(trc)):
+        v = RGB[..., i]
+        if eotf:
+            v = eotf(v)
+        elif isinstance(gamma, (list, tuple)):
+            v = numpy.interp(v, numpy.linspace(0.0, 1.0, len(gamma)), gamma)
+        else:
+            v = specialpow(v, gamma)
+        channels.append(v)
+    return apply_matrix(matrix, stack(*channels)) * scale
+
+
+def XYZ2RGB(XYZ, rgb_space=None, scale=1.0, round_=False, clamp=True, oetf=None):
+    """Convert from XYZ to RGB (see colormath.XYZ2RGB)"""
+    trc, whitepoint, rxyY, gxyY, bxyY, matrix = colormath.get_rgb_space(rgb_space)
+    RGB = apply_matrix(matrix.inverted(), XYZ)
+    if clamp:
+        RGB = numpy.clip(RGB, 0.0, 1.0)
+    channels = []
+    for i, gamma in enumerate(_get_trcs(trc)):
+        v = RGB[..., i]
+        if oetf:
+            v = oetf(v)
+        elif isinstance(gamma, (list, tuple)):
+            v = numpy.interp(v, gamma, numpy.linspace(0.0, 1.0, len(gamma)))
+        else:
+            v = specialpow(v, 1.0 / gamma)
+        channels.append(v)
+    RGB = stack(*channels) * scale
+    if round_ is not False:
+        RGB = numpy.round(RGB, round_)
+    return RGB
+
+
+def RGB2Lab(RGB, rgb_space=None, whitepoint=None, noadapt=False, cat="Bradford"):
+    XYZ = RGB2XYZ(RGB, rgb_space, scale=100)
+    if not noadapt:
+        rgb_space = colormath.get_rgb_space(rgb_space)
+        XYZ = adapt(XYZ, rgb_space[1], whitepoint, cat)
+    return XYZ2Lab(XYZ, whitepoint=whitepoint)
+
+
+def Lab2RGB(
+    Lab,
+    rgb_space=None,
+    scale=1.0,
+    round_=False,
+    clamp=True,
+    whitepoint=None,
+    whitepoint_source=None,
+    noadapt=False,
+    cat="Bradford",
+):
+    """Convert from Lab to RGB"""
+    XYZ = Lab2XYZ(Lab, whitepoint)
+    if not noadapt:
+        rgb_space = colormath.get_rgb_space(rgb_space)
+        XYZ = adapt(XYZ, whitepoint_source, rgb_space[1], cat)
+    return XYZ2RGB(XYZ, rgb_space, scale, round_, clamp)
+
+
+def XYZ2IPT(XYZ):
+    LMS = apply_matrix(colormath.get_cat_matrix("IPT"), XYZ)
+    return apply_matrix(colormath.LMS2IPT_matrix, specialpow(LMS, 0.43))
+
+
+def IPT2XYZ(IPT):
+    LMS = apply_matrix(colormath.IPT2LMS_matrix, IPT)
+    return apply_matrix(
+        colormath.get_cat_matrix("IPT").inverted(), specialpow(LMS, 1 / 0.43)
+    )
+
+
+def LinearRGB2ICtCp(RGB, oetf=pq_encode):
+    """Rec. 2020 linear RGB to non-linear ICtCp"""
+    LMS = apply_matrix(colormath.LinearRGB2LMS_matrix, RGB)
+    return apply_matrix(colormath.L_M_S_2ICtCp_matrix, oetf(LMS))
+
+
+def ICtCp2LinearRGB(ICtCp, eotf=pq_decode):
+    """Non-linear ICtCp to Rec. 2020 linear RGB"""
+    L_M_S_ = apply_matrix(colormath.ICtCp2L_M_S__matrix, ICtCp)
+    return apply_matrix(colormath.LMS2LinearRGB_matrix, eotf(L_M_S_))
+
+
+def XYZ2ICtCp(XYZ, clamp=False, oetf=pq_encode):
+    RGB = XYZ2RGB(XYZ, "Rec. 2020", clamp=clamp, oetf=lambda v: v)
+    return LinearRGB2ICtCp(RGB, oetf)
+
+
+def ICtCp2XYZ(ICtCp, eotf=pq_decode):
+    RGB = ICtCp2LinearRGB(ICtCp, eotf)
+    return RGB2XYZ(RGB, "Rec. 2020", eotf=lambda v: v)
+
+
+def RGB2ICtCp(RGB, rgb_space="Rec. 2020", eotf=pq_decode, clamp=False, oetf=pq_encode):
+    """R'G'B' to ICtCp"""
+    return XYZ2ICtCp(RGB2XYZ(RGB, rgb_space, eotf=eotf), clamp, oetf)
+
+
+def ICtCp2RGB(
+    ICtCp, rgb_space="Rec. 2020", eotf=pq_decode, clamp=False, oetf=pq_encode
+):
+    """ICtCp to R'G'B'"""
+    return XYZ2RGB(ICtCp2XYZ(ICtCp, eotf), rgb_space, clamp=clamp, oetf=oetf)
+
+
+# DIN99 family
+
+
+def DIN99familyCH2DIN99ab(C99, H99):
+    h99ef = H99 * numpy.pi / 180
+    return C99 * numpy.cos(h99ef), C99 * numpy.sin(h99ef)
+
+
+def DIN99familyab2DIN99CH(a99, b99):
+    """Return C99 and H99 (see colormath.DIN99familyab2DIN99CH)"""
+    h99ef = numpy.arctan2(b99, a99)
+    # Like colormath, wrap negative hues only for a99 >= 0
+    h99ef = numpy.where((a99 >= 0) & (h99ef < 0), h99ef + 2 * numpy.pi, h99ef)
+    return numpy.hypot(a99, b99), h99ef * 180 / numpy.pi
+
+
+def Lab2DIN99familyLCH(Lab, l1, l2, deg, f1, c1, c2, kE=1.0, hdeg=None):
+    L, a, b = split(asarray(Lab))
+    L99 = (1.0 / kE) * l1 * numpy.log(1 + l2 * L)
+    rad = deg * numpy.pi / 180
+    e = a * numpy.cos(rad) + b * numpy.sin(rad)
+    f = f1 * (b * numpy.cos(rad) - a * numpy.sin(rad))
+    G = numpy.hypot(e, f)
+    C99 = c1 * numpy.log(1 + c2 * G)
+    if hdeg is None:
+        hdeg = deg
+    H99 = numpy.arctan2(f, e) * 180 / numpy.pi + hdeg
+    return stack(L99, C99, H99)
+
+
+def DIN99familyLCH2Lab(
+    LCH99, x, l1, l2, deg, f1, c1, c2, whitepoint=None, kE=1.0, hdeg=None
+):
+    L99, C99, H99 = split(asarray(LCH99))
+    G = (numpy.exp(C99 / c1) - 1) / c2
+    if hdeg is None:
+        hdeg = deg
+    h99ef = (H99 - hdeg) * numpy.pi / 180
+    e = G * numpy.cos(h99ef)
+    f = G * numpy.sin(h99ef)
+    rad = deg * numpy.pi / 180
+    L = (numpy.exp((L99 * kE) / l1) - 1) / l2
+    a = e * numpy.cos(rad) - (f / f1) * numpy.sin(rad)
+    b = e * numpy.sin(rad) + (f / f1) * numpy.cos(rad)
+    Lab = stack(L, a, b)
+    if x:
+        whitepoint99d = XYZ2DIN99cdXYZ(get_whitepoint(whitepoint, 100), x)
+        XYZ = DIN99cdXYZ2XYZ(Lab2XYZ(Lab, whitepoint99d, scale=100), x)
+        Lab = XYZ2Lab(XYZ, whitepoint)
+    return Lab
+
+
+def _LCH2Lab99(LCH99):
+    L99, C99, H99 = split(asarray(LCH99))
+    return stack(L99, *DIN99familyCH2DIN99ab(C99, H99))
+
+
+def _Lab2LCH99(Lab99):
+    L99, a99, b99 = split(asarray(Lab99))
+    return stack(L99, *DIN99familyab2DIN99CH(a99, b99))
+
+
+def DIN99cdXYZ2XYZ(XYZ, x):
+    X, Y, Z = split(asarray(XYZ))
+    return stack((X + x * Z) / (1 + x), Y, Z)
+
+
+def XYZ2DIN99cdXYZ(XYZ, x):
+    X, Y, Z = split(asarray(XYZ))
+    return stack((1 + x) * X - x * Z, Y, Z)
+
+
+def Lab2DIN99LCH(Lab, kCH=1.0, kE=1.0):
+    return Lab2DIN99familyLCH(
+        Lab, 105.51, 0.0158, 16, 0.7, 1 / (0.045 * kCH * kE), 0.045, kE, 0
+    )
+
+
+def Lab2DIN99bLCH(Lab, kE=1.0):
+    return Lab2DIN99familyLCH(Lab, 303.67, 0.0039, 26, 0.83, 23, 0.075)
+
+
+def Lab2DIN99oLCH(Lab, kCH=1.0, kE=1.0):
+    return Lab2DIN99familyLCH(
+        Lab, 303.67, 0.0039, 26, 0.83, 1 / (0.0435 * kCH * kE), 0.075, kE
+    )
+
+
+def Lab2DIN99(Lab, kCH=1.0, kE=1.0):
+    return _LCH2Lab99(Lab2DIN99LCH(Lab, kCH, kE))
+
+
+def Lab2DIN99b(Lab, kE=1.0):
+    return _LCH2Lab99(Lab2DIN99bLCH(Lab, kE))
+
+
+def Lab2DIN99o(Lab, kCH=1.0, kE=1.0):
+    return _LCH2Lab99(Lab2DIN99oLCH(Lab, kCH, kE))
+
+
+def Lab2DIN99c(Lab, kE=1.0, whitepoint=None):
+    return XYZ2DIN99c(Lab2XYZ(Lab, whitepoint, scale=100), whitepoint)
+
+
+def Lab2DIN99d(Lab, kE=1.0, whitepoint=None):
+    return XYZ2DIN99d(Lab2XYZ(Lab, whitepoint, scale=100), whitepoint)
+
+
+def XYZ2DIN99(XYZ, whitepoint=None):
+    return Lab2DIN99(XYZ2Lab(numpy.maximum(asarray(XYZ), 0), whitepoint))
+
+
+def XYZ2DIN99b(XYZ, whitepoint=None):
+    return Lab2DIN99b(XYZ2Lab(XYZ, whitepoint))
+
+
+def XYZ2DIN99o(XYZ, whitepoint=None):
+    return Lab2DIN99o(XYZ2Lab(XYZ, whitepoint))
+
+
+def XYZ2DIN99bLCH(XYZ, whitepoint=None):
+    return Lab2DIN99bLCH(XYZ2Lab(XYZ, whitepoint))
+
+
+def XYZ2DIN99oLCH(XYZ, whitepoint=None):
+    return Lab2DIN99oLCH(XYZ2Lab(XYZ, whitepoint))
+
+
+def XYZ2DIN99cdLCH(XYZ, x, l1, l2, deg, f1, c1, c2, whitepoint=None):
+    whitepoint99d = XYZ2DIN99cdXYZ(get_whitepoint(whitepoint, 100), x)
+    Lab = XYZ2Lab(XYZ2DIN99cdXYZ(XYZ, x), whitepoint99d)
+    return Lab2DIN99familyLCH(Lab, l1, l2, deg, f1, c1, c2)
+
+
+def XYZ2DIN99cd(XYZ, x, l1, l2, deg, f1, c1, c2, whitepoint=None):
+    return _LCH2Lab99(XYZ2DIN99cdLCH(XYZ, x, l1, l2, deg, f1, c1, c2, whitepoint))
+
+
+def XYZ2DIN99c(XYZ, whitepoint=None):
+    return XYZ2DIN99cd(XYZ, 0.1, 317.651, 0.0037, 0, 0.94, 23, 0.066, whitepoint)
+
+
+def XYZ2DIN99d(XYZ, whitepoint=None):
+    return XYZ2DIN99cd(XYZ, 0.12, 325.221, 0.0036, 50, 1.14, 22.5, 0.06, whitepoint)
+
+
+def XYZ2DIN99dLCH(XYZ, whitepoint=None):
+    return XYZ2DIN99cdLCH(XYZ, 0.12, 325.221, 0.0036, 50, 1.14, 22.5, 0.06, whitepoint)
+
+
+def DIN992Lab(Lab99, kCH=1.0, kE=1.0):
+    return DIN99familyLCH2Lab(
+        _Lab2LCH99(Lab99),
+        0,
+        105.51,
+        0.0158,
+        16,
+        0.7,
+        1 / (0.045 * kCH * kE),
+        0.045,
+        kE=kE,
+        hdeg=0,
+    )
+
+
+def DIN99b2Lab(Lab99):
+    return DIN99bLCH2Lab(_Lab2LCH99(Lab99))
+
+
+def DIN99o2Lab(Lab99, kCH=1.0, kE=1.0):
+    return DIN99familyLCH2Lab(
+        _Lab2LCH99(Lab99),
+        0,
+        303.67,
+        0.0039,
+        26,
+        0.83,
+        1 / (0.0435 * kCH * kE),
+        0.075,
+        kE=kE,
+    )
+
+
+def DIN99bLCH2Lab(LCH99):
+    return DIN99familyLCH2Lab(LCH99, 0, 303.67, 0.0039, 26, 0.83, 23, 0.075)
+
+
+def DIN99c2Lab(Lab99, whitepoint=None):
+    return DIN99familyLCH2Lab(
+        _Lab2LCH99(Lab99), 0.1, 317.651, 0.0037, 0, 0.94, 23, 0.066, whitepoint
+    )
+
+
+def DIN99d2Lab(Lab99, whitepoint=None):
+    return DIN99dLCH2Lab(_Lab2LCH99(Lab99), whitepoint)
+
+
+def DIN99dLCH2Lab(LCH99, whitepoint=None):
+    return DIN99familyLCH2Lab(
+        LCH99, 0.12, 325.221, 0.0036, 50, 1.14, 22.5, 0.06, whitepoint
+    )
+
+
+# Color differences
+
+
+def get_delta_method(method):
+    """Return the normalized name of a colormath.delta method
+
+    One of "1994", "cmc", "2000", "itp" or "1976".
+
+    """
+    if isinstance(method, str):
+        method = method.lower()
+    else:
+        method = str(int(method))
+    if method in ("94", "1994", "cie94", "cie1994"):
+        return "1994"
+    if method in ("cmc(2:1)", "cmc21", "cmc(1:1)", "cmc11", "cmc"):
+        return "cmc"
+    if method in ("00", "2k", "2000", "cie00", "cie2k", "cie2000"):
+        return "2000"
+    if method in ("itp", "ictcp", "2124"):
+        return "itp"
+    return "1976"
+
+
+class _DeltaTerms:
+    """Lazily computed terms shared between the delta methods"""
+
+    def __init__(self, Lab1, Lab2):
+        self.L1, self.a1, self.b1 = split(Lab1)
+        self.L2, self.a2, self.b2 = split(Lab2)
+        self.dL = self.L2 - self.L1
+        self.da = self.a1 - self.a2
+        self.db = self.b1 - self.b2
+        self._C = None
+        self._dH = None
+
+    @property
+    def C(self):
+        if self._C is None:
+            self._C = (
+                numpy.sqrt(self.a1**2 + self.b1**2),
+                numpy.sqrt(self.a2**2 + self.b2**2),
+            )
+        return self._C
+
+    @property
+    def dC(self):
+        C1, C2 = self.C
+        return C2 - C1
+
+    @property
+    def dH(self):
+        if self._dH is None:
+            dH2 = self.da**2 + self.db**2 - self.dC**2
+            self._dH = numpy.sqrt(numpy.maximum(dH2, 0))
+        return self._dH
+
+    def result(self, dE, dL, dC, dH, dLw, dCw, dHw):
+        return {
+            "E": dE,
+            "L": dL,
+            "C": dC,
+            "H": dH,
+            "a": self.da,
+            "b": self.db,
+            # Weighted
+            "Lw": dLw,
+            "Cw": dCw,
+            "Hw": dHw,
+        }
+
+
+def _delta_1976(terms, p1, p2, p3, cie94_use_symmetric_chrominance):
+    dE = numpy.sqrt(terms.dL**2 + terms.da**2 + terms.db**2)
+    dL, dC, dH = terms.dL, terms.dC, terms.dH
+    return terms.result(dE, dL, dC, dH, dL, dC, dH)
+
+
+def _delta_1994(terms, p1, p2, p3, cie94_use_symmetric_chrominance):
+    textiles = p1
+    C1, C2 = terms.C
+    dL, dC, dH = terms.dL, terms.dC, terms.dH
+    K1 = 0.048 if textiles else 0.045
+    K2 = 0.014 if textiles else 0.015
+    if cie94_use_symmetric_chrominance:
+        C_ = numpy.sqrt(C1 * C2)
+    else:
+        C_ = C1
+    SC = 1.0 + K1 * C_
+    SH = 1.0 + K2 * C_
+    KL = 2.0 if textiles else 1.0
+    dLw, dCw, dHw = dL / KL, dC / SC, dH / SH
+    dE = numpy.sqrt(dLw**2 + dCw**2 + dHw**2)
+    return terms.result(dE, dL, dC, dH, dLw, dCw, dHw)
+
+
+def _delta_cmc(terms, p1, p2, p3, cie94_use_symmetric_chrominance):
+    l = p1 if isinstance(p1, (float, int)) else 1.0
+    c = p2 if isinstance(p2, (float, int)) else 1.0
+    C1, C2 = terms.C
+    L1, a1, b1 = terms.L1, terms.a1, terms.b1
+    dL, dC, dH = terms.dL, terms.dC, terms.dH
+    SL = numpy.where(L1 < 16, 0.511, (0.040975 * L1) / (1 + 0.01765 * L1))
+    SC = (0.0638 * C1) / (1 + 0.0131 * C1) + 0.638
+    F = numpy.sqrt(C1**4 / (C1**4 + 1900.0))
+    H1 = numpy.degrees(numpy.arctan2(b1, a1)) + numpy.where(b1 >= 0, 0, 360.0)
+    T = numpy.where(
+        (164 <= H1) & (H1 <= 345),
+        0.56 + numpy.abs(0.2 * numpy.cos(numpy.radians(H1 + 168.0))),
+        0.36 + numpy.abs(0.4 * numpy.cos(numpy.radians(H1 + 35))),
+    )
+    SH = SC * (F * T + 1 - F)
+    dLw, dCw, dHw = dL / (l * SL), dC / (c * SC), dH / SH
+    dE = numpy.sqrt(dLw**2 + dCw**2 + dHw**2)
+    return terms.result(dE, dL, dC, dH, dLw, dCw, dHw)
+
+
+def _hue_angle(a, b):
+    """Hue angle in degrees like in colormath.delta (0 for a = b = 0)"""
+    h = numpy.degrees(numpy.arctan2(b, a)) + numpy.where(b >= 0, 0, 360.0)
+    return numpy.where((a == 0) & (b == 0), 0, h)
+
+
+def _delta_2000(terms, p1, p2, p3, cie94_use_symmetric_chrominance):
+    pow25_7 = 25.0**7
+    k_L = p1 if isinstance(p1, (float, int)) else 1.0
+    k_C = p2 if isinstance(p2, (float, int)) else 1.0
+    k_H = p3 if isinstance(p3, (float, int)) else 1.0
+    C1, C2 = terms.C
+    C_avg = (C1 + C2) / 2.0
+    G = 0.5 * (1 - numpy.sqrt(C_avg**7 / (C_avg**7 + pow25_7)))
+    a1_ = (1 + G) * terms.a1
+    a2_ = (1 + G) * terms.a2
+    b1_, b2_ = terms.b1, terms.b2
+    C1_ = numpy.hypot(a1_, b1_)
+    C2_ = numpy.hypot(a2_, b2_)
+    h1_ = _hue_angle(a1_, b1_)
+    h2_ = _hue_angle(a2_, b2_)
+    dh = h2_ - h1_
+    dh_ = numpy.where(dh > 180, dh - 360.0, numpy.where(dh < -180, dh + 360.0, dh))
+    dL_ = terms.dL
+    dC_ = C2_ - C1_
+    dH_ = 2 * numpy.sqrt(C1_ * C2_) * numpy.sin(numpy.radians(dh_ / 2.0))
+    L__avg = (terms.L1 + terms.L2) / 2.0
+    C__avg = (C1_ + C2_) / 2.0
+    h_sum = h1_ + h2_
+    h__avg = numpy.where(
+        C1_ * C2_ == 0,
+        h_sum,
+        numpy.where(
+            numpy.abs(dh) <= 180,
+            h_sum / 2.0,
+            numpy.where(h_sum < 360, h_sum / 2.0 + 180.0, h_sum / 2.0 - 180.0),
+        ),
+    )
+    AB = (L__avg - 50.0) ** 2  # (L'_ave-50)^2
+    S_L = 1 + 0.015 * AB / numpy.sqrt(20.0 + AB)
+    S_C = 1 + 0.045 * C__avg
+    T = (
+        1
+        - 0.17 * numpy.cos(numpy.radians(h__avg - 30.0))
+        + 0.24 * numpy.cos(numpy.radians(2.0 * h__avg))
+        + 0.32 * numpy.cos(numpy.radians(3.0 * h__avg + 6.0))
+        - 0.2 * numpy.cos(numpy.radians(4 * h__avg - 63.0))
+    )
+    S_H = 1 + 0.015 * C__avg * T
+    dTheta = 30.0 * numpy.exp(-1 * ((h__avg - 275.0) / 25.0) ** 2)
+    R_C = 2.0 * numpy.sqrt(C__avg**7 / (C__avg**7 + pow25_7))
+    R_T = -numpy.sin(numpy.radians(2.0 * dTheta)) * R_C
+    AJ = dL_ / S_L / k_L  # dL' / k_L / S_L
+    AK = dC_ / S_C / k_C  # dC' / k_C / S_C
+    AL = dH_ / S_H / k_H  # dH' / k_H / S_H
+    dE = numpy.sqrt(AJ**2 + AK**2 + AL**2 + R_T * AK * AL)
+    return terms.result(dE, dL_, dC_, dH_, AJ, AK, AL)
+
+
+def _delta_itp(terms, p1, p2, p3, cie94_use_symmetric_chrominance):
+    # Recommendation ITU-R BT.2124, the samples are ICtCp instead of Lab
+    dI = terms.L2 - terms.L1
+    dT = 0.5 * (terms.a2 - terms.a1)
+    dP = terms.b2 - terms.b1
+    return {
+        "E": 720 * numpy.sqrt(dI**2 + dT**2 + dP**2),
+        "I": dI,
+        "T": dT,
+        "P": dP,
+    }
+
+
+_delta_functions = {
+    "1976": _delta_1976,
+    "1994": _delta_1994,
+    "cmc": _delta_cmc,
+    "2000": _delta_2000,
+    "itp": _delta_itp,
+}
+
+
+def delta(
+    Lab1,
+    Lab2,
+    method="1976",
+    p1=None,
+    p2=None,
+    p3=None,
+    cie94_use_symmetric_chrominance=True,
+):
+    """Compute the deltas between two arrays of samples
+
+    Array version of colormath.delta. Returns a dict with the same keys,
+    with arrays of the deltas of each pair of samples as values.
+
+    method can also be a list or tuple of methods. A dict of results keyed
+    by method is returned in that case, and terms like chroma are computed
+    once for all methods. p1, p2 and p3 are passed to every method.
+
+    Additionally to the methods of colormath.delta, "ITP" (or "ICtCp")
+    computes ΔE ITP according to Recommendation ITU-R BT.2124 from two arrays
+    of ICtCp samples. Its results have the keys "E", "I", "T" and "P".
+
+    """
+    if isinstance(method, (list, tuple)):
+        methods = method
+    else:
+        methods = (method,)
+    Lab1, Lab2 = numpy.broadcast_arrays(asarray(Lab1), asarray(Lab2))
+    terms = _DeltaTerms(Lab1, Lab2)
+    results = {}
+    for name in methods:
+        normalized_name = get_delta_method(name)
+        q1 = p1
+        if str(name).lower() in ("cmc(2:1)", "cmc21"):
+            q1 = 2.0
+        results[name] = _delta_functions[normalized_name](
+            terms, q1, p2, p3, cie94_use_symmetric_chrominance
+        )
+    if isinstance(method, (list, tuple)):
+        return results
+    return results[method]
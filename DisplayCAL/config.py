@@ -1056,6 +1056,9 @@ valid_ranges = {
     "whitepoint.visual_editor.b": [0, 255],
     "whitepoint.visual_editor.g": [0, 255],
     "whitepoint.visual_editor.r": [0, 255],
+    "xicclu.pool.idle_timeout": [1, 3600],
+    "xicclu.pool.max_processes": [1, 64],
+    "xicclu.pool.timeout": [1, 3600],
 }
 
 valid_values = {
@@ -1581,6 +1584,13 @@ defaults = {
     "whitepoint.y.backup": 0.3290,
     "x3dom.cache": 1,
     "x3dom.embed": 0,
+    "xicclu.cache": 0,
+    "xicclu.cache.disk": 0,
+    "xicclu.native": 0,
+    "xicclu.pool": 0,
+    "xicclu.pool.idle_timeout": 60,
+    "xicclu.pool.max_processes": 8,
+    "xicclu.pool.timeout": 60,
 }
 lcode, lenc = locale.getlocale()
 if lcode:
@@ -1804,6 +1814,7 @@ standard_profiles = []
 def get_standard_profiles(paths_only=False):
     if not standard_profiles:
         from DisplayCAL.icc_profile import ICCProfile
+        from DisplayCAL.profile_index import get_profile_index
 
         # Reference profiles (Argyll + DisplayCAL)
         ref_icc = get_data_path("ref", r"\.ic[cm]$") or []
@@ -1852,20 +1863,24 @@ def get_standard_profiles(paths_only=False):
         if not isinstance(ref_icc, list):
             ref_icc = [ref_icc]
 
-        for path in ref_icc + other_icc:
-            try:
-                profile = ICCProfile(path, load=False, use_cache=True)
-            except EnvironmentError:
-                pass
-            except Exception as exception:
-                print(exception)
-            else:
-                if (
-                    profile.version < 4
-                    and profile.profileClass != b"nmcl"
-                    and profile.colorSpace != b"GRAY"
-                    and profile.connectionColorSpace in (b"Lab", b"XYZ")
-                ):
+        # Only open profiles which match according to the profile index.
+        # Don't memory-map them: They are kept in the profile cache for the
+        # whole session, and an open mapping prevents replacing or deleting
+        # the files on Windows
+        for info in get_profile_index().update(ref_icc + other_icc):
+            if (
+                info["version"] < 4
+                and info["profile_class"] != "nmcl"
+                and info["color_space"] != "GRAY"
+                and info["connection_color_space"] in ("Lab", "XYZ")
+            ):
+                try:
+                    profile = ICCProfile(info["path"], load=False, use_cache=True)
+                except EnvironmentError:
+                    pass
+                except Exception as exception:
+                    print(exception)
+                else:
                     standard_profiles.append(profile)
     if paths_only:
         return [profile.fileName for profile in standard_profiles]
@@ -48,6 +48,7 @@ from DisplayCAL import (
     ccmx,
     colord,
     colormath,
+    colormath_array,
     config,
     floatspin,
     localization as lang,
@@ -13974,8 +13975,9 @@ class MainFrame(ReportFrame, BaseFrame, LUT3DMixin):
                 grid.BeginBatch()
                 ref_data = reference_ti3.queryv1("DATA")
                 tgt_data = colorimeter_ti3.queryv1("DATA")
-                deltaE_94 = []
-                deltaE_00 = []
+                rows = []
+                Lab_refs = []
+                Lab_tgts = []
                 print("")
                 print(
                     "      Reference xyY         |"
@@ -14032,18 +14034,17 @@ class MainFrame(ReportFrame, BaseFrame, LUT3DMixin):
                             "ref Lab {:.6f} {:.6f} {:.6f}, ".format(*Lab_ref),
                             "col Lab {:.6f} {:.6f} {:.6f}".format(*Lab_tgt),
                         )
-                    # For comparison to Argyll DE94 values
-                    deltaE = colormath.delta(*Lab_ref + Lab_tgt + ("94",))["E"]
-                    deltaE_94.append(deltaE)
-                    deltaE = colormath.delta(*Lab_ref + Lab_tgt + ("00",))["E"]
-                    deltaE_00.append(deltaE)
+                    rows.append((row, xyYabs))
+                    Lab_refs.append(Lab_ref)
+                    Lab_tgts.append(Lab_tgt)
+                # For comparison to Argyll DE94 values
+                deltas = colormath_array.delta(Lab_refs, Lab_tgts, ("94", "00"))
+                deltaE_94 = deltas["94"]["E"].tolist()
+                deltaE_00 = deltas["00"]["E"].tolist()
+                for (row, xyYabs), deltaE94, deltaE in zip(rows, deltaE_94, deltaE_00):
                     print(
                         " {:.6f} {:.6f} {:8.4f} | {:.6f} {:.6f} {:8.4f} | {:.6f} | {:.6f} ".format(
-                            *(
-                                tuple(xyYabs[0])
-                                + tuple(xyYabs[1])
-                                + (deltaE_94[-1], deltaE_00[-1])
-                            )
+                            *(tuple(xyYabs[0]) + tuple(xyYabs[1]) + (deltaE94, deltaE))
                         )
                     )
                     grid.SetCellValue(row, 8, f"{deltaE:.4f}")
@@ -16084,8 +16085,7 @@ class MainFrame(ReportFrame, BaseFrame, LUT3DMixin):
                         self,
                     )
                     return
-                profile.calculateID()
-                profile.write(profile_save_path)
+                profile.write(profile_save_path, calculate_id=True)
                 if profile_save_path == get_current_profile_path():
                     self.lut3d_update_b2a_controls()
                 self.install_profile_handler(
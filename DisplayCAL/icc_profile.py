@@ -4,17 +4,21 @@ import ctypes
 import datetime
 import json
 import math
+import mmap
 import os
 import pathlib
 import re
 import struct
 import subprocess as sp
 import sys
+import threading
+import time
 import warnings
-from collections import UserString
+from collections import OrderedDict, UserString
 from copy import copy
 from hashlib import md5
-from weakref import WeakValueDictionary
+
+import numpy
 
 from DisplayCAL.util_dict import dict_sort
 
@@ -41,6 +45,7 @@ except ImportError:
 
     colord = Colord()
 from DisplayCAL import colormath
+from DisplayCAL import colormath_array
 from DisplayCAL import edid
 from DisplayCAL import imfile
 from DisplayCAL.defaultpaths import iccprofiles, iccprofiles_home
@@ -765,7 +770,6 @@ def create_synthetic_hdr_clut_profile(
     cat="Bradford",
 ):
     """Create a synthetic HDR cLUT profile from a colorspace definition"""
-
     rgb_space = colormath.get_rgb_space(rgb_space)
     content_rgb_space = colormath.get_rgb_space(content_rgb_space)
 
@@ -788,6 +792,15 @@ def create_synthetic_hdr_clut_profile(
         eotf = lambda v: colormath.specialpow(v, -2084)
         oetf = eotf_inverse = lambda v: colormath.specialpow(v, 1.0 / -2084)
         eetf = bt2390.apply
+        # Array versions for the curves
+        transfer_function = colormath_array.get_transfer_function("PQ")
+        eetf_array = colormath_array.BT2390(
+            black_cdm2,
+            white_cdm2,
+            master_black_cdm2,
+            master_white_cdm2,
+            use_alternate_master_white_clip,
+        ).apply
 
         # Apply a slight power to the segments to optimize encoding
         encpow = min(max(bt2390.omaxi * (5 / 3.0), 1.0), 1.5)
@@ -832,6 +845,11 @@ def create_synthetic_hdr_clut_profile(
         eotf_inverse = lambda v: hlg.eotf(v, True)
         oetf = hlg.oetf
         eetf = lambda v: v
+        # Array versions for the curves
+        transfer_function = colormath_array.HLGTransferFunction(
+            0, hlg.white_cdm2, system_gamma, ambient_cdm2
+        )
+        eetf_array = eetf
 
         encf = lambda v: v
     else:
@@ -910,8 +928,6 @@ def create_synthetic_hdr_clut_profile(
     pprevpow = [0]
     clipped = False
     xp = []
-    if generate_B2A:
-        oxp = []
     for j in range(steps):
         v = j / maxstep
         if v > iv + segment:
@@ -930,21 +946,17 @@ def create_synthetic_hdr_clut_profile(
             clipped = True
             # Linearly interpolate
             vv = colormath.convert_range(v, prevv, 1, prevpow, 1)
-        out = eotf_inverse(vv)
-        xp.append(out)
-        if generate_B2A:
-            oxp.append(eotf(eetf(v)) / maxv)
-    interp = colormath.Interp(xp, list(range(steps)), use_numpy=True)
+        xp.append(vv)
+    xp = transfer_function.encode(xp)
     if generate_B2A:
-        ointerp = colormath.Interp(oxp, list(range(steps)), use_numpy=True)
+        oxp = transfer_function.decode(eetf_array(numpy.arange(steps) / maxstep))
+        oxp /= maxv
 
     # Save interpolation input values for diagnostic purposes
     profile.tags.kTRC = CurveType()
-    interp_inverse = colormath.Interp(list(range(steps)), xp, use_numpy=True)
-    profile.tags.kTRC[:] = [
-        interp_inverse(colormath.convert_range(v, 0, 2048, 0, maxstep)) * 65535
-        for v in range(2049)
-    ]
+    profile.tags.kTRC[:] = (
+        numpy.interp(numpy.arange(2049) * maxstep / 2048.0, range(steps), xp) * 65535
+    ).tolist()
 
     # Create input and output curves
     for _i in range(3):
@@ -973,12 +985,14 @@ def create_synthetic_hdr_clut_profile(
     k = None
     end = eotf_inverse(pprevpow[-1])
     l = entries - 1
+    n = numpy.arange(entries) / (entries - 1.0)
+    eetf_n = eetf_array(n)
+    shaper = (numpy.interp(eetf_n, xp, range(steps)) / maxstep).tolist()
+    eetf_next = eetf_array(n + (1 / (entries - 1.0))).tolist()
     if end > threshold:
-        for j in range(entries):
-            n = j / (entries - 1.0)
-            if eetf(n) > end:
-                l = j - 1
-                break
+        beyond_end = numpy.flatnonzero(eetf_n > end)
+        if len(beyond_end):
+            l = int(beyond_end[0]) - 1
     for j in range(entries):
         if worker and worker.thread_abort:
             if forward_xicclu:
@@ -987,12 +1001,12 @@ def create_synthetic_hdr_clut_profile(
                 backward_xicclu.exit()
             raise Exception("aborted")
         n = j / (entries - 1.0)
-        v = interp(eetf(n)) / maxstep
+        v = shaper[j]
         if hdr_format == "PQ":
             # threshold = 1.0 - segment * math.ceil((1.0 - bt2390.mmaxi) *
             # (clutres - 1.0) + 1)
             # check = n >= threshold
-            check = tonemap and eetf(n + (1 / (entries - 1.0))) > threshold
+            check = tonemap and eetf_next[j] > threshold
         elif hdr_format == "HLG":
             check = maxsignal < 1 and n >= maxsignal
         if check and not test_input_curve_clipping:
@@ -1001,7 +1015,7 @@ def create_synthetic_hdr_clut_profile(
             if k is None:
                 k = j
                 ov = v
-                ev = interp(eetf(l / (entries - 1.0))) / maxstep
+                ev = shaper[l]
             # v = min(ov + (1.0 - ov) * ((j - k) / (entries - k - 1.0)), 1.0)
             v = min(colormath.convert_range(j, k, l, ov, ev), n)
         for i in range(3):
@@ -1017,6 +1031,8 @@ def create_synthetic_hdr_clut_profile(
         if logfile:
             logfile.write("\rGenerating PCS-to-device shaper curves...\n")
             logfile.write(f"\r{perc:.0f}%")
+        oshaper = numpy.interp(numpy.arange(4096) / 4095.0, oxp, range(steps))
+        oshaper = (oshaper / maxstep * 65535).tolist()
         for j in range(4096):
             if worker and worker.thread_abort:
                 if forward_xicclu:
@@ -1025,7 +1041,7 @@ def create_synthetic_hdr_clut_profile(
                     backward_xicclu.exit()
                 raise Exception("aborted")
             n = j / 4095.0
-            v = ointerp(n) / maxstep * 65535
+            v = oshaper[j]
             for i in range(3):
                 otable.input[i].append(v)
             perc = startperc + math.floor(n)
@@ -1267,7 +1283,7 @@ def create_synthetic_hdr_clut_profile(
                     prevperc = perc
 
     if hdr_format == "PQ" and tonemap:
-        from DisplayCAL.multiprocess import cpu_count, pool_slice
+        from DisplayCAL.multiprocess import SharedArray, cpu_count, pool_slice
 
         num_cpus = cpu_count()
         num_workers = num_cpus
@@ -1275,10 +1291,10 @@ def create_synthetic_hdr_clut_profile(
             num_workers -= 1
         num_batches = clutres // 6
 
-        HDR_XYZ = sum(
-            pool_slice(
+        with SharedArray(HDR_XYZ) as HDR_XYZ_shared:
+            results = pool_slice(
                 _mp_hdr_tonemap,
-                HDR_XYZ,
+                HDR_XYZ_shared,
                 (rgb_space, maxv, sat, cat),
                 {},
                 num_workers,
@@ -1286,40 +1302,40 @@ def create_synthetic_hdr_clut_profile(
                 logfile,
                 num_batches,
                 perc,
-            ),
-            [],
-        )
+            )
+            if any(isinstance(result, list) for result in results):
+                # Aborted
+                HDR_XYZ = [False]
+            else:
+                HDR_XYZ = HDR_XYZ_shared.array.tolist()
         prevperc = startperc = perc = 75
     else:
         prevperc = startperc = perc = 50
 
-    for i, item in enumerate(HDR_XYZ):
-        if not item:  # Aborted
-            if worker and worker.thread_abort:
-                if forward_xicclu:
-                    forward_xicclu.exit()
-                if backward_xicclu:
-                    backward_xicclu.exit()
-                raise Exception("aborted")
-        (RGB, (X, Y, Z), RGB_ICtCp_XYZ) = item
-        I, Ct, Cp = colormath.XYZ2ICtCp(X, Y, Z, oetf=eotf_inverse)
-        X, Y, Z = (v / maxv for v in (X, Y, Z))
-        HDR_ICtCp.append((I, Ct, Cp))
-        # Adapt to D50
-        X, Y, Z = colormath.adapt(X, Y, Z, whitepoint_source=rgb_space[1], cat=cat)
+    if not all(HDR_XYZ):  # Aborted
+        if worker and worker.thread_abort:
+            if forward_xicclu:
+                forward_xicclu.exit()
+            if backward_xicclu:
+                backward_xicclu.exit()
+            raise Exception("aborted")
+    XYZ = numpy.array([item[1] for item in HDR_XYZ], dtype=numpy.float64)
+    HDR_ICtCp = colormath_array.XYZ2ICtCp(XYZ, oetf=transfer_function.encode)
+    HDR_ICtCp = HDR_ICtCp.tolist()
+    # Adapt to D50
+    XYZ = colormath_array.adapt(XYZ / maxv, rgb_space[1], cat=cat).tolist()
+    for i, (X, Y, Z) in enumerate(XYZ):
         if max(X, Y, Z) * 32768 > 65535 or min(X, Y, Z) < 0 or round(Y, 6) > 1:
             # This should not happen
             print(
                 f"#{i}",
-                "RGB {:.3f} {:.3f} {:.3f}".format(*RGB),
+                "RGB {:.3f} {:.3f} {:.3f}".format(*HDR_XYZ[i][0]),
                 f"XYZ {X:.6f} {Y:.6f} {Z:.6f}",
                 "not in range [0,1]",
             )
-        HDR_XYZ[i] = (X, Y, Z)
-        perc = startperc + math.floor(i / clutres**3.0 * (100 - startperc))
-        if logfile and perc > prevperc:
-            logfile.write(f"\r{perc:.0f}%")
-            prevperc = perc
+    HDR_XYZ = XYZ
+    if logfile and prevperc < 100:
+        logfile.write("\r100%")
     prevperc = startperc = perc = 0
 
     if forward_xicclu and backward_xicclu and logfile:
@@ -2205,6 +2221,9 @@ def _winreg_get_display_profiles(monkey, current_user=False):
     ]
 
 
+_display_profiles = {}
+
+
 def get_display_profile(
     display_no=0,
     x_hostname=None,
@@ -2217,15 +2236,24 @@ def get_display_profile(
 ):
     """Return ICC Profile for display n or None."""
     if sys.platform == "win32":
-        return get_display_profile_windows(
+        profile = get_display_profile_windows(
             display_no, path_only, devicekey, use_active_display_device, use_registry
         )
     elif sys.platform == "darwin":
-        return get_display_profile_macos(display_no, path_only)
+        profile = get_display_profile_macos(display_no, path_only)
     else:
-        return get_display_profile_linux(
+        profile = get_display_profile_linux(
             display_no, x_hostname, x_display, x_screen, path_only
         )
+    if isinstance(profile, ICCProfile) and not devicekey:
+        # Keep the current display profile cached
+        pinned = _display_profiles.get(display_no)
+        if profile is not pinned:
+            _iccprofilecache.pin(profile)
+            if pinned:
+                _iccprofilecache.unpin(pinned)
+            _display_profiles[display_no] = profile
+    return profile
 
 
 def get_display_profile_windows(
@@ -2585,6 +2613,159 @@ def _blend_blackpoint(row, bp_in, bp_out, wp=None, use_bpc=False, weight=False):
     return X, Y, Z
 
 
+def _apply_bpc_array(XYZ, bp_in, bp_out, wp_out, weight=False):
+    """Vectorized colormath.apply_bpc for XYZ arrays of shape (..., 3)."""
+    if not bp_in:
+        bp_in = (0, 0, 0)
+    if not bp_out:
+        bp_out = (0, 0, 0)
+    wp_out = numpy.asarray(colormath.get_whitepoint(wp_out), dtype=numpy.float64)
+    bp_in = numpy.asarray(bp_in, dtype=numpy.float64)
+    bp_out = numpy.asarray(bp_out, dtype=numpy.float64)
+    if weight:
+        D50_100 = colormath.get_whitepoint(None, 100)
+        L = colormath_array.XYZ2Lab(XYZ * 100, D50_100)[..., 0]
+        bp_in_Lab = colormath.XYZ2Lab(*[v * 100 for v in bp_in])
+        bp_out_Lab = colormath.XYZ2Lab(*[v * 100 for v in bp_out])
+        vv = (L - bp_in_Lab[0]) / (100.0 - bp_in_Lab[0])  # 0 at bp, 1 at wp
+        vv = numpy.clip(1.0 - vv, 0.0, 1.0)
+        vv = numpy.power(
+            vv, min(40.0, 40.0 / (max(bp_in_Lab[0], bp_out_Lab[0]) or 1.0))
+        )[..., numpy.newaxis]
+        D50 = colormath.get_whitepoint()
+        bp_in = colormath_array.Lab2XYZ(numpy.asarray(bp_in_Lab) * vv, D50)
+        bp_out = colormath_array.Lab2XYZ(numpy.asarray(bp_out_Lab) * vv, D50)
+    return ((wp_out - bp_out) * XYZ - wp_out * (bp_in - bp_out)) / (wp_out - bp_in)
+
+
+def _xyY2XYZ_array(x, y, Y):
+    """Vectorized colormath.xyY2XYZ for constant x, y and an array of Y."""
+    Y = numpy.asarray(Y, dtype=numpy.float64)
+    if y == 0:
+        return numpy.zeros(Y.shape + (3,))
+    return numpy.stack((x * Y / y, Y, (1 - x - y) * Y / y), axis=-1)
+
+
+def _get_gammas_array(x, y, scale=1.0, vmin=0.0, vmax=1.0):
+    """Vectorized colormath.get_gamma(..., average=False) for arrays x and y.
+
+    Unlike get_gamma, one value is returned per input value, with NaN where
+    get_gamma would have skipped the value.
+
+    """
+    x = numpy.asarray(x, dtype=numpy.float64) / scale
+    vmin /= scale
+    vmax /= scale
+    y = (numpy.asarray(y, dtype=numpy.float64) / scale - vmin) * (vmax + vmin)
+    valid = (0 < x) & (x < 1) & (y > 0)
+    gammas = numpy.full(x.shape, numpy.nan)
+    gammas[valid] = numpy.log(y[valid]) / numpy.log(x[valid])
+    return gammas
+
+
+def _bt1886_apply_array(bt1886, XYZ):
+    """Vectorized colormath.BT1886.apply for XYZ arrays of shape (..., 3)."""
+    vv = _matrix_apply_array(bt1886.bwd_matrix, XYZ)
+    with numpy.errstate(invalid="ignore"):
+        if bt1886.apply_trc:
+            # Convert linear light to Rec709 transfer curve
+            vv = numpy.where(
+                vv < 0.018, 4.5 * vv, 1.099 * numpy.power(vv, 0.45) - 0.099
+            )
+        # Apply input offset
+        vv = vv + bt1886.ingo
+        # Apply power and scale
+        if bt1886.apply_trc:
+            vv = numpy.where(vv > 0, bt1886.outsc * numpy.power(vv, bt1886.gamma), vv)
+        else:
+            vv = numpy.where(vv > 0, vv * bt1886.outsc, vv)
+    # Apply output portion of offset
+    vv = vv + bt1886.outo
+    out = _matrix_apply_array(bt1886.fwd_matrix, vv)
+    Lab = colormath_array.XYZ2Lab(out * 100, colormath.get_whitepoint(None, 100))
+    # Blend ab to required black point offset as L approaches black
+    vv = 1.0 - (Lab[..., 0] - bt1886.outL) / (100.0 - bt1886.outL)
+    vv = numpy.power(numpy.clip(vv, 0.0, 1.0), 40.0)[..., numpy.newaxis]
+    Lab = Lab + vv * numpy.asarray(bt1886.tab, dtype=numpy.float64)
+    return colormath_array.Lab2XYZ(Lab, colormath.get_whitepoint())
+
+
+def _blend_ab_array(XYZ, bp, wp, power=40.0, signscale=1):
+    """Vectorized colormath.blend_ab for XYZ arrays of shape (..., 3)."""
+    Lab = colormath_array.XYZ2Lab(XYZ, wp)
+    bpL, bpa, bpb = colormath.XYZ2Lab(*bp, whitepoint=wp)
+    if bpL == 100:
+        raise ValueError("Black L* is 100!")
+    vv = (Lab[..., 0] - bpL) / (100.0 - bpL)  # 0 at bp, 1 at wp
+    vv = numpy.clip(1.0 - vv, 0.0, 1.0)  # 1 at bp, 0 at wp
+    vv = numpy.power(vv, power) * signscale
+    Lab[..., 1] += vv * bpa
+    Lab[..., 2] += vv * bpb
+    return numpy.where(XYZ[..., 1:2] < 0, 0.0, colormath_array.Lab2XYZ(Lab, wp))
+
+
+def _blend_blackpoint_array(XYZ, bp_in=None, bp_out=None, wp=None, power=40.0):
+    """Vectorized colormath.blend_blackpoint for XYZ arrays of shape (..., 3)."""
+    wp = colormath.get_whitepoint(wp)
+    for i, bp in enumerate((bp_in, bp_out)):
+        if not bp or tuple(bp) == (0, 0, 0):
+            continue
+        bp_wp = tuple(v / wp[1] * bp[1] for v in wp)
+        if i == 0:
+            XYZ = _blend_ab_array(XYZ, bp, wp, power, -1)
+            XYZ = _apply_bpc_array(XYZ, bp_wp, None, wp)
+        else:
+            XYZ = _apply_bpc_array(XYZ, None, bp_wp, wp)
+            XYZ = _blend_ab_array(XYZ, bp, wp, power, 1)
+    return XYZ
+
+
+def _apply_black_array(
+    clut,
+    pcs,
+    bp_in,
+    bp_out,
+    wp=None,
+    use_bpc=False,
+    weight=False,
+    D50=None,
+    interp=None,
+    rinterp=None,
+):
+    """Apply black point compensation or offset to a whole cLUT at once.
+
+    Vectorized equivalent of _mp_apply_black. Returns a new array.
+
+    """
+    rows = numpy.array(clut, dtype=numpy.float64)
+    if interp:
+        for column, ointerp in enumerate(interp):
+            rows[..., column] = numpy.interp(
+                rows[..., column], ointerp.xp, ointerp.fp, ointerp.left, ointerp.right
+            )
+    if pcs == "Lab":
+        Lab = (rows - (0, 32768, 32768)) / (65280.0, 32768.0, 32768.0) * (100, 128, 128)
+        XYZ = colormath_array.Lab2XYZ(Lab, D50)
+    else:
+        XYZ = rows / 32768.0
+    if use_bpc:
+        XYZ = _apply_bpc_array(XYZ, bp_in, bp_out, wp, weight)
+    else:
+        XYZ = _blend_blackpoint_array(XYZ, bp_in, bp_out)
+    if pcs == "Lab":
+        rows = colormath_array.XYZ2Lab(XYZ, D50) * (652.80, 256, 256)
+        rows += (0, 32768, 32768)
+        rows = numpy.fmin(numpy.fmax(0, rows), 65535)
+    else:
+        rows = numpy.fmin(numpy.fmax(0, XYZ) * 32768.0, 65535)
+    if rinterp:
+        for column, ointerp in enumerate(rinterp):
+            rows[..., column] = numpy.interp(
+                rows[..., column], ointerp.xp, ointerp.fp, ointerp.left, ointerp.right
+            )
+    return rows
+
+
 def _mp_apply(
     blocks,
     thread_abort_event,
@@ -2686,14 +2867,206 @@ def _mp_apply_black(
     )
 
 
-def _mp_hdr_tonemap(
+def _matrix_apply_array(matrix, v):
+    """Apply a 3x3 matrix to an array of shape (..., 3) like Matrix3x3 * v."""
+    x, y, z = v[..., 0], v[..., 1], v[..., 2]
+    return numpy.stack([x * row[0] + y * row[1] + z * row[2] for row in matrix], -1)
+
+
+def _XYZ2ICtCp_array(XYZ):
+    """Vectorized colormath.XYZ2ICtCp for arrays of shape (..., 3)."""
+    matrix = colormath.get_rgb_space("Rec. 2020")[-1].inverted()
+    LMS = _matrix_apply_array(
+        colormath.LinearRGB2LMS_matrix, _matrix_apply_array(matrix, XYZ)
+    )
+    return _matrix_apply_array(
+        colormath.L_M_S_2ICtCp_matrix, colormath_array.pq_encode(LMS)
+    )
+
+
+def _ICtCp2XYZ_array(ICtCp):
+    """Vectorized colormath.ICtCp2XYZ for arrays of shape (..., 3)."""
+    matrix = colormath.get_rgb_space("Rec. 2020")[-1]
+    LMS = colormath_array.pq_decode(
+        _matrix_apply_array(colormath.ICtCp2L_M_S__matrix, ICtCp)
+    )
+    return _matrix_apply_array(
+        matrix, _matrix_apply_array(colormath.LMS2LinearRGB_matrix, LMS)
+    )
+
+
+def _hdr_in_gamut_array(XYZ, adaption_matrix, maxv):
+    """Return which colors (array of shape (N, 3)) are inside the D50 PCS range."""
+    X, Y, Z = numpy.moveaxis(_matrix_apply_array(adaption_matrix, XYZ / maxv), -1, 0)
+    negative_clip = numpy.minimum(numpy.minimum(X, Y), Z) < 0
+    positive_clip = (
+        (numpy.round(X, 4) > 0.9642) | (Y > 1) | (numpy.round(Z, 4) > 0.8249)
+    )
+    return ~(negative_clip | positive_clip)
+
+
+def _hdr_gamut_map_array(XYZ, adaption_matrix, maxv, max_its=10000):
+    """Desaturate colors in ICtCp at constant intensity until they are in gamut.
+
+    Batched equivalent of the iterative desaturation in _mp_hdr_tonemap,
+    which scales Ct and Cp by 0.99 per iteration (restoring the initial
+    luminance if it increased, which also lowers intensity). Instead of
+    stepping each color, the number of iterations up to the next luminance
+    restore or gamut boundary is found by exponential search and bisection
+    for all colors at once.
+
+    Returns mapped XYZ, initial and final intensity, initial and final
+    chroma, and the number of iterations per color (0 if already in gamut).
+
+    """
+    XYZ = numpy.array(XYZ, dtype=numpy.float64)
+    count = len(XYZ)
+    Y_in = XYZ[:, 1].copy()
+    its = numpy.zeros(count, dtype=numpy.int64)
+    ICtCp = numpy.zeros((count, 3))
+    active = ~_hdr_in_gamut_array(XYZ, adaption_matrix, maxv)
+    ICtCp[active] = _XYZ2ICtCp_array(XYZ[active])
+    I_in = ICtCp[:, 0].copy()
+    C_in = numpy.hypot(ICtCp[:, 1], ICtCp[:, 2])
+
+    while active.any():
+        indexes = numpy.flatnonzero(active)
+        I, Ct, Cp = ICtCp[indexes].T
+        Y_init = Y_in[indexes]
+        remaining = max_its - its[indexes]
+
+        def step(n):
+            # Desaturate n times
+            factor = 0.99**n
+            XYZ_n = _ICtCp2XYZ_array(numpy.stack((I, Ct * factor, Cp * factor), -1))
+            exceeded = XYZ_n[:, 1] > Y_init
+            done = exceeded | _hdr_in_gamut_array(XYZ_n, adaption_matrix, maxv)
+            return XYZ_n, done, exceeded
+
+        # Exponential search for the first iteration that either needs the
+        # luminance restored or reaches the gamut boundary
+        lo = numpy.zeros_like(remaining)
+        hi = numpy.ones_like(remaining)
+        found = step(hi)[1]
+        search = ~found & (hi < remaining)
+        while search.any():
+            lo = numpy.where(search, hi, lo)
+            hi = numpy.where(search, numpy.minimum(hi * 2, remaining), hi)
+            found = step(hi)[1]
+            search = ~found & (hi < remaining)
+        # Bisection
+        search = found & (hi - lo > 1)
+        while search.any():
+            mid = (lo + hi) // 2
+            done = step(mid)[1]
+            hi = numpy.where(search & done, mid, hi)
+            lo = numpy.where(search & ~done, mid, lo)
+            search = found & (hi - lo > 1)
+
+        XYZ_n, done, exceeded = step(hi)
+        factor = 0.99**hi
+        ICtCp_n = numpy.stack((I, Ct * factor, Cp * factor), -1)
+        if exceeded.any():
+            # Desaturating CtCp increased Y, restore initial Y
+            XYZ_n[exceeded] = (
+                XYZ_n[exceeded] / XYZ_n[exceeded, 1:2] * Y_init[exceeded, None]
+            )
+            ICtCp_n[exceeded] = _XYZ2ICtCp_array(XYZ_n[exceeded])
+        XYZ[indexes] = XYZ_n
+        ICtCp[indexes] = ICtCp_n
+        its[indexes] += hi
+        active[indexes] = (its[indexes] < max_its) & ~_hdr_in_gamut_array(
+            XYZ_n, adaption_matrix, maxv
+        )
+
+    C = numpy.hypot(ICtCp[:, 1], ICtCp[:, 2])
+    return XYZ, I_in, ICtCp[:, 0], C_in, C, its
+
+
+def _hdr_tonemap_array(
     HDR_XYZ, thread_abort_event, progress_queue, rgb_space, maxv, sat, cat="Bradford"
+):
+    """Batched implementation of _mp_hdr_tonemap"""
+    if thread_abort_event and thread_abort_event.is_set():
+        return [False]
+    RGB_in, ICtCp_XYZ, RGB_ICtCp_XYZ = (
+        numpy.array([item[i] for item in HDR_XYZ], dtype=numpy.float64).reshape(-1, 3)
+        for i in range(3)
+    )
+    is_neutral = (RGB_in == RGB_in[:, :1]).all(axis=1)
+    separate = (ICtCp_XYZ != RGB_ICtCp_XYZ).any(axis=1) & (sat != 1)
+    mask1 = separate & ~is_neutral
+    mask2 = ~is_neutral
+    adaption_matrix = colormath.wp_adaption_matrix(rgb_space[1], None, cat)
+    XYZ_in = numpy.concatenate((ICtCp_XYZ[mask1], RGB_ICtCp_XYZ[mask2]))
+    XYZ, Io, I, Co, C, its = _hdr_gamut_map_array(XYZ_in, adaption_matrix, maxv)
+    ICtCp_XYZ[mask1] = XYZ[: mask1.sum()]
+    RGB_ICtCp_XYZ[mask2] = XYZ[mask1.sum() :]
+    ICtCp_XYZ[~separate] = RGB_ICtCp_XYZ[~separate]
+
+    for i in numpy.flatnonzero(its == 10000):
+        # Max iterations exceeded, print diagnostics
+        # XXX: This should not happen (testing OK)
+        oX_D50, oY_D50, oZ_D50 = colormath.adapt(
+            *(v / maxv for v in XYZ_in[i]), whitepoint_source=rgb_space[1], cat=cat
+        )
+        X_D50, Y_D50, Z_D50 = colormath.adapt(
+            *(v / maxv for v in XYZ[i]), whitepoint_source=rgb_space[1], cat=cat
+        )
+        print(
+            "Reached iteration limit, XYZ "
+            f"{oX_D50:.4f} {oY_D50:.4f} {oZ_D50:.4f} -> "
+            f"{X_D50:.4f} {Y_D50:.4f} {Z_D50:.4f}"
+        )
+    reduced = (its > 0) & (numpy.round(Io - I, 4) != 0)
+    I_reduced_count = int(reduced.sum())
+    its_hi = int(its.max()) if len(its) else 0
+    if I_reduced_count:
+        # Intensity was reduced, print informational statistics
+        dI = Io[reduced] - I[reduced]
+        dC = Co[reduced] - C[reduced]
+        print(
+            f"Max iterations {its_hi:d} "
+            f"dI avg {dI.sum() / I_reduced_count:.4f} "
+            f"max {dI.max():.4f} "
+            f"dC avg {dC.sum() / I_reduced_count:.4f} "
+            f"max {dC.max():.4f}"
+        )
+    elif its_hi:
+        print("Max iterations", its_hi)
+    if progress_queue:
+        progress_queue.put(50)
+    return numpy.stack((RGB_in, ICtCp_XYZ, RGB_ICtCp_XYZ), axis=1).tolist()
+
+
+def _mp_hdr_tonemap(
+    HDR_XYZ,
+    thread_abort_event,
+    progress_queue,
+    rgb_space,
+    maxv,
+    sat,
+    cat="Bradford",
+    batched=True,
 ):
     """Worker for HDR tonemapping
 
     This should be spawned as a multiprocessing process
 
+    If batched is true, all colors are gamut mapped at once (see
+    _hdr_gamut_map_array). Otherwise, colors are mapped one at a time.
+
     """
+    if batched:
+        return _hdr_tonemap_array(
+            HDR_XYZ,
+            thread_abort_event,
+            progress_queue,
+            rgb_space,
+            maxv,
+            sat,
+            cat,
+        )
     prevperc = 0
     amount = len(HDR_XYZ)
     dI = 0
@@ -2998,6 +3371,9 @@ class LazyLoadTagAODict(AODict):
         # Load and parse tag data
         tagSignature = key
         typeSignature, tagDataOffset, tagDataSize, tagData = tag
+        if isinstance(tagData, memoryview):
+            # Materialize tag data from memory-mapped profile
+            tagData = tagData.tobytes()
         try:
             if tagSignature in tagSignature2Tag:
                 tag = tagSignature2Tag[tagSignature](tagData, tagSignature)
@@ -3019,9 +3395,18 @@ class LazyLoadTagAODict(AODict):
                 f"offset {int(tagDataOffset):d}, "
                 f"size {int(tagDataSize):d}): {repr(exception)}"
             )
+        self.profile._tagsizes[key] = tagDataSize
         self[key] = tag
         return tag
 
+    def __setitem__(self, key, value):
+        AODict.__setitem__(self, key, value)
+        self.profile._invalidate_tag(key)
+
+    def __delitem__(self, key):
+        AODict.__delitem__(self, key)
+        self.profile._invalidate_tag(key)
+
     def __setattr__(self, name, value):
         if name == "profile":
             object.__setattr__(self, name, value)
@@ -3181,6 +3566,247 @@ class Illuminant(ADict):
         self.description = ILLUMINANTS[self.type]
 
 
+def _legacy_PCS_decode(values, pcs):
+    """Decode normalized (0..1) legacy 16-bit PCS encoding to XYZ or L*a*b*."""
+    values = numpy.asarray(values, dtype=numpy.float64) * 65535
+    if pcs == b"Lab":
+        return numpy.stack(
+            (
+                values[..., 0] / 652.80,
+                (values[..., 1] - 32768) / 256.0,
+                (values[..., 2] - 32768) / 256.0,
+            ),
+            axis=-1,
+        )
+    return values / 32768.0
+
+
+def _legacy_PCS_encode(values, pcs):
+    """Encode XYZ or L*a*b* to normalized (0..1) legacy 16-bit PCS encoding."""
+    values = numpy.asarray(values, dtype=numpy.float64)
+    if pcs == b"Lab":
+        values = numpy.stack(
+            (
+                values[..., 0] * 652.80,
+                values[..., 1] * 256 + 32768,
+                values[..., 2] * 256 + 32768,
+            ),
+            axis=-1,
+        )
+    else:
+        values = values * 32768.0
+    return values / 65535.0
+
+
+def _curves_lookup(curves, values, inverse=False):
+    """Apply per-channel 1D tables (uInt16 entries) to normalized values."""
+    values = numpy.asarray(values, dtype=numpy.float64)
+    out = numpy.empty_like(values)
+    for channel, entries in enumerate(curves):
+        fp = numpy.asarray(entries, dtype=numpy.float64) / 65535.0
+        xp = numpy.linspace(0, 1, len(fp))
+        if inverse:
+            xp, fp = fp, xp
+        out[..., channel] = numpy.interp(values[..., channel], xp, fp)
+    return out
+
+
+def _clut_interp(clut, coords, interpolation="tetrahedral"):
+    """Interpolate cLUT array of shape (g, ..., g, o) at normalized coords.
+
+    coords          (N, i) array with values in range 0..1
+    interpolation   "tetrahedral" (simplex) or "trilinear" (n-linear)
+
+    Returns (N, o) array with values in cLUT units.
+
+    """
+    coords = numpy.clip(numpy.asarray(coords, dtype=numpy.float64), 0, 1)
+    num_inputs = coords.shape[-1]
+    g = clut.shape[0]
+    o = clut.shape[-1]
+    table = numpy.asarray(clut, dtype=numpy.float64).reshape(-1, o)
+    if g < 2:
+        return numpy.repeat(table[:1], len(coords), axis=0)
+    # Strides of the flattened grid, slowest changing (first) input first
+    strides = g ** numpy.arange(num_inputs - 1, -1, -1)
+    pos = coords * (g - 1)
+    base = numpy.minimum(numpy.floor(pos).astype(numpy.intp), g - 2)
+    frac = pos - base
+    base_index = base @ strides
+    if interpolation in ("tetrahedral", "simplex"):
+        # Walk the simplex from the base vertex, adding dimensions in order
+        # of decreasing fractional part
+        order = numpy.argsort(-frac, axis=1, kind="stable")
+        frac_sorted = numpy.take_along_axis(frac, order, axis=1)
+        weights = numpy.empty((len(coords), num_inputs + 1))
+        weights[:, 0] = 1 - frac_sorted[:, 0]
+        weights[:, 1:-1] = frac_sorted[:, :-1] - frac_sorted[:, 1:]
+        weights[:, -1] = frac_sorted[:, -1]
+        index = base_index.copy()
+        out = weights[:, :1] * table[index]
+        for k in range(num_inputs):
+            index += strides[order[:, k]]
+            out += weights[:, k + 1 : k + 2] * table[index]
+        return out
+    elif interpolation in ("trilinear", "n-linear"):
+        out = numpy.zeros((len(coords), o))
+        for corner in range(2**num_inputs):
+            bits = numpy.array(
+                [(corner >> (num_inputs - 1 - k)) & 1 for k in range(num_inputs)]
+            )
+            weight = numpy.prod(numpy.where(bits, frac, 1 - frac), axis=1)
+            out += weight[:, None] * table[base_index + bits @ strides]
+        return out
+    raise ValueError(f"Unknown interpolation {repr(interpolation)}")
+
+
+class A2BInverseLookup:
+    """Vectorized inverse lookup through a profile's RGB A2B direction.
+
+    Finds device RGB values for PCS values by damped Gauss-Newton iteration
+    on the in-process forward lookup (ICCProfile.lookup), seeded from the
+    nearest point of a coarse forward grid. Out of gamut values are clipped
+    to the closest in-gamut color, either by plain delta E or (CAM clipping)
+    by a hue and lightness preserving weighted delta E.
+
+    """
+
+    # Weights for lightness, chroma and hue differences with CAM clipping
+    cam_clipping_weights = (1.0, 0.5, 2.0)
+
+    def __init__(self, profile, intent="r", grid=None, grid_steps=17):
+        if profile.colorSpace != b"RGB":
+            raise NotImplementedError(
+                f"A2BInverseLookup: Unsupported color space "
+                f"{repr(profile.colorSpace)}"
+            )
+        self.profile = profile
+        self.intent = intent
+        if grid is None:
+            grid = self.forward_grid(profile, intent, grid_steps)
+        self.grid = grid
+        self.grid_steps = int(round(len(grid) ** (1 / 3.0)))
+        self._tree = None
+
+    @staticmethod
+    def forward_grid(profile, intent="r", grid_steps=17):
+        """Return the (grid_steps ** 3, 3) L*a*b* forward lookup grid."""
+        axis = numpy.linspace(0, 1, grid_steps)
+        device = numpy.stack(
+            numpy.meshgrid(axis, axis, axis, indexing="ij"), axis=-1
+        ).reshape(-1, 3)
+        return profile.lookup(device, intent, "f", "l")
+
+    def _seed(self, Lab):
+        """Return the device values of the nearest forward grid points."""
+        try:
+            from scipy.spatial import cKDTree
+        except ImportError:
+            index = self._nearest(Lab)
+        else:
+            if self._tree is None:
+                self._tree = cKDTree(self.grid)
+            index = self._tree.query(Lab)[1]
+        g = self.grid_steps
+        index = numpy.stack((index // g**2, index // g % g, index % g), axis=-1)
+        return index / (g - 1.0)
+
+    def _nearest(self, Lab, chunksize=256):
+        """Return the indexes of the nearest forward grid points.
+
+        Brute force search in small chunks, used if SciPy is not available.
+        Distances are computed as |grid|^2 - 2 * Lab . grid (the constant
+        |Lab|^2 does not change the order) to avoid (chunksize, grid, 3)
+        temporaries. A chunk needs about chunksize * len(grid) * 8 bytes.
+
+        """
+        grid = self.grid
+        grid_sq = (grid**2).sum(axis=1)
+        index = numpy.empty(len(Lab), dtype=numpy.intp)
+        for start in range(0, len(Lab), chunksize):
+            dist = Lab[start : start + chunksize] @ grid.T
+            dist *= -2
+            dist += grid_sq
+            index[start : start + chunksize] = dist.argmin(axis=1)
+        return index
+
+    def _residual(self, device, Lab, use_cam_clipping):
+        residual = self.profile.lookup(device, self.intent, "f", "l") - Lab
+        if not use_cam_clipping:
+            return residual
+        # Split the difference into lightness, chroma and hue components
+        C1 = numpy.hypot(Lab[:, 1], Lab[:, 2])
+        C2 = numpy.hypot(*(Lab[:, 1:] + residual[:, 1:]).T)
+        dC = C2 - C1
+        dh = numpy.arctan2(*(Lab[:, 1:] + residual[:, 1:])[:, ::-1].T)
+        dh -= numpy.arctan2(Lab[:, 2], Lab[:, 1])
+        dH = 2 * numpy.sqrt(C1 * C2) * numpy.sin(dh / 2.0)
+        return numpy.stack((residual[:, 0], dC, dH), axis=-1) * numpy.asarray(
+            self.cam_clipping_weights
+        )
+
+    def lookup(self, idata, pcs="x", use_cam_clipping=False, iterations=50):
+        """Look up PCS values to device RGB.
+
+        idata               (N, 3) array-like, XYZ (0..1) or L*a*b*
+        pcs                 'x' or 'l'
+        use_cam_clipping    Preserve hue and lightness for out of gamut colors
+        iterations          Maximum number of Gauss-Newton iterations
+
+        Returns a tuple of (N, 3) device values in range 0..1 and a (N, )
+        boolean array indicating which values were clipped.
+
+        """
+        values = numpy.array(idata, dtype=numpy.float64, ndmin=2)
+        D50 = list(self.profile.illuminant.values())
+        Lab = values if pcs == "l" else colormath_array.XYZ2Lab(values, D50)
+        device = self._seed(Lab)
+        residual = self._residual(device, Lab, use_cam_clipping)
+        error = (residual**2).sum(axis=1)
+        damping = numpy.full(len(Lab), 1e-3)
+        jacobian = numpy.empty((len(Lab), 3, 3))
+        h = 1e-4
+        for _ in range(iterations):
+            active = error > 1e-10
+            if not active.any():
+                break
+            x, r, e = device[active], residual[active], error[active]
+            lam = damping[active]
+            Lab_active = Lab[active]
+            jac = jacobian[: len(x)]
+            for k in range(3):
+                # Forward difference, stepping inwards at the upper boundary
+                step = numpy.where(x[:, k] + h > 1, -h, h)
+                x_k = x.copy()
+                x_k[:, k] += step
+                jac[:, :, k] = (
+                    self._residual(x_k, Lab_active, use_cam_clipping) - r
+                ) / step[:, None]
+            JTJ = numpy.einsum("nij,nik->njk", jac, jac)
+            JTr = numpy.einsum("nij,ni->nj", jac, r)
+            diag = numpy.einsum("nii->ni", JTJ) + 1e-12
+            A = JTJ + (lam[:, None] * diag)[:, :, None] * numpy.eye(3)
+            dx = numpy.linalg.solve(A, JTr[..., None])[..., 0]
+            x_new = numpy.clip(x - dx, 0, 1)
+            r_new = self._residual(x_new, Lab_active, use_cam_clipping)
+            e_new = (r_new**2).sum(axis=1)
+            better = e_new < e
+            x[better] = x_new[better]
+            r[better] = r_new[better]
+            e[better] = e_new[better]
+            lam = numpy.where(better, lam * 0.1, lam * 10)
+            # No further improvement possible (e.g. at the gamut boundary)
+            converged = ~better & (lam > 1e8)
+            device[active] = x
+            residual[active] = r
+            error[active] = numpy.where(converged, 0, e)
+            damping[active] = lam
+        # Anything we could not match to within 0.01 delta E is clipped
+        Lab_out = self.profile.lookup(device, self.intent, "f", "l")
+        clipped = numpy.sqrt(((Lab_out - Lab) ** 2).sum(axis=1)) > 0.01
+        return device, clipped
+
+
 class LUT16Type(ICCProfileTag):
     def __init__(self, tagData=None, tagSignature=None, profile=None):
         ICCProfileTag.__init__(self, tagData, tagSignature)
@@ -3188,6 +3814,8 @@ class LUT16Type(ICCProfileTag):
         self._matrix = None
         self._input = None
         self._clut = None
+        self._clut_array = None
+        self._clut_array_is_view = False
         self._output = None
         self._i = (tagData and uInt8Number(tagData[8:9])) or 0  # Input channel count
         self._o = (tagData and uInt8Number(tagData[9:10])) or 0  # Output channel count
@@ -3261,41 +3889,30 @@ class LUT16Type(ICCProfileTag):
         if [round(v * 32768) for v in bp] != [round(v * 32768) for v in bp_out]:
             D50 = colormath.get_whitepoint("D50")
 
-            from DisplayCAL.multiprocess import pool_slice
-
-            if len(self.clut[0]) < 33:
-                num_workers = 1
-            else:
-                num_workers = None
-
             # if pcs != "Lab" and nonzero_bp:
             # bp_out_offset = bp_out
             # bp_out = (0, 0, 0)
 
             if bp != bp_out:
-                self.clut = sum(
-                    pool_slice(
-                        _mp_apply_black,
-                        self.clut,
-                        (
-                            pcs,
-                            bp,
-                            bp_out,
-                            wp,
-                            use_bpc,
-                            weight,
-                            D50,
-                            interp,
-                            rinterp,
-                            abortmessage,
-                        ),
-                        {},
-                        num_workers,
-                        thread_abort,
-                        logfile,
-                    ),
-                    [],
-                )
+                # Process the whole cLUT in one go
+                if thread_abort and thread_abort.event.is_set():
+                    from DisplayCAL.debughelpers import Info
+
+                    raise Info(abortmessage)
+                self.clut = _apply_black_array(
+                    self.clut,
+                    pcs,
+                    bp,
+                    bp_out,
+                    wp if use_bpc else None,
+                    use_bpc,
+                    weight,
+                    D50,
+                    interp,
+                    rinterp,
+                ).tolist()
+                if logfile:
+                    logfile.write("\r100%")
 
         # if pcs != "Lab" and nonzero_bp:
         # # Apply black offset to output curves
@@ -3316,31 +3933,96 @@ class LUT16Type(ICCProfileTag):
 
     @property
     def clut(self):
+        """Return the cLUT as nested lists.
+
+        This is a compatibility adapter around ``clut_array``. The outer list
+        has one entry per grid row (g ** (input channels - 1) rows), each row
+        holds g entries of output channel values.
+
+        """
         if self._clut is None:
-            i, o, g, n = self._i, self._o, self._g, self._n
-            tagData = self._tagData
-            self._clut = [
-                [
-                    [
-                        uInt16Number(
-                            tagData[
-                                52 + n * i * 2 + o * 2 * (g * x + y) + z * 2 : 54
-                                + n * i * 2
-                                + o * 2 * (g * x + y)
-                                + z * 2
-                            ]
-                        )
-                        for z in range(o)
-                    ]
-                    for y in range(g)
-                ]
-                for x in range(int(g**i / g))
-            ]
+            clut_array = self.clut_array
+            if clut_array is None:
+                return None
+            g, o = clut_array.shape[-2:]
+            self._clut = clut_array.reshape(-1, g, o).tolist()
+            # The list is now authoritative
+            self._clut_array = None
+            self._clut_array_is_view = False
         return self._clut
 
     @clut.setter
     def clut(self, value):
+        if hasattr(value, "ndim"):
+            self.clut_array = value
+            return
         self._clut = value
+        self._clut_array = None
+        self._clut_array_is_view = False
+
+    @property
+    def clut_array(self):
+        """Return the cLUT as NumPy array of shape (g, ..., g, o).
+
+        If the cLUT has not been decoded or changed yet, the array is a
+        read-only big-endian uint16 view of the raw tag data (no copy). To
+        change the cLUT, assign a (modified) copy back to ``clut_array``.
+
+        """
+        if self._clut is not None:
+            # Convert from list representation, the array becomes
+            # authoritative
+            clut = self._clut
+            if not clut or not clut[0]:
+                return None
+            g = len(clut[0])
+            i = int(round(math.log(len(clut) * g, g))) if g > 1 else 1
+            clut_array = numpy.array(clut)
+            if clut_array.dtype.kind not in "iuf":
+                clut_array = clut_array.astype(numpy.float64)
+            self._clut_array = clut_array.reshape((g,) * i + (len(clut[0][0]),))
+            self._clut_array_is_view = False
+            self._clut = None
+        elif self._clut_array is None and getattr(self, "_tagData", None):
+            i, o, g, n = self._i, self._o, self._g, self._n
+            self._clut_array = numpy.frombuffer(
+                self._tagData, dtype=">u2", count=g**i * o, offset=52 + n * i * 2
+            ).reshape((g,) * i + (o,))
+            self._clut_array_is_view = True
+        return self._clut_array
+
+    @clut_array.setter
+    def clut_array(self, value):
+        self._clut_array = value
+        self._clut_array_is_view = False
+        self._clut = None
+
+    def _clut_tohex(self):
+        """Return the cLUT encoded as big-endian uint16 bytes."""
+        clut_array = self.clut_array
+        if clut_array is None:
+            return b""
+        if clut_array.dtype.kind == "f":
+            clut_array = numpy.clip(numpy.rint(clut_array), 0, 65535)
+        return clut_array.astype(">u2").tobytes()
+
+    def lookup(self, idata, use_matrix=False, interpolation="tetrahedral"):
+        """Look up normalized values through input curves, cLUT and output
+        curves in one vectorized pass.
+
+        idata           (N, input channels) array-like, values in range 0..1
+        use_matrix      Apply the matrix first (only valid for XYZ input)
+        interpolation   "tetrahedral" or "trilinear"
+
+        Returns a (N, output channels) NumPy array with values in range 0..1.
+
+        """
+        values = numpy.array(idata, dtype=numpy.float64, ndmin=2)
+        if use_matrix:
+            values = values @ numpy.asarray(self.matrix, dtype=numpy.float64).T
+        values = _curves_lookup(self.input, numpy.clip(values, 0, 1))
+        values = _clut_interp(self.clut_array, values, interpolation) / 65535.0
+        return _curves_lookup(self.output, numpy.clip(values, 0, 1))
 
     def clut_writepng(self, stream_or_filename):
         """Write the cLUT as PNG image organized in <grid steps> * <grid steps>
@@ -3406,6 +4088,10 @@ BEGIN_DATA
     @property
     def clut_grid_steps(self):
         """Return number of grid points per dimension."""
+        if self._clut is not None:
+            return len(self._clut and self._clut[0])
+        if self._clut_array is not None:
+            return self._clut_array.shape[0]
         return self._g or len(self.clut[0])
 
     @property
@@ -3818,14 +4504,16 @@ BEGIN_DATA
     def tagData(self):
         """Return raw tag data."""
 
-        if (self._matrix, self._input, self._clut, self._output) == (None,) * 4:
+        if (self._matrix, self._input, self._clut, self._output) == (None,) * 4 and (
+            self._clut_array is None or self._clut_array_is_view
+        ):
             return self._tagData
         tagData = [
             b"mft2",
             b"\0" * 4,
             uInt8Number_tohex(len(self.input)),
             uInt8Number_tohex(len(self.output)),
-            uInt8Number_tohex(len(self.clut and self.clut[0])),
+            uInt8Number_tohex(self.clut_grid_steps),
             b"\0",
             s15Fixed16Number_tohex(self.matrix[0][0]),
             s15Fixed16Number_tohex(self.matrix[0][1]),
@@ -3841,9 +4529,12 @@ BEGIN_DATA
         ]
         for entries in self.input:
             tagData.extend(uInt16Number_tohex(v) for v in entries)
-        for block in self.clut:
-            for entries in block:
-                tagData.extend(uInt16Number_tohex(v) for v in entries)
+        if self._clut is None:
+            tagData.append(self._clut_tohex())
+        else:
+            for block in self._clut:
+                for entries in block:
+                    tagData.extend(uInt16Number_tohex(v) for v in entries)
         for entries in self.output:
             tagData.extend(uInt16Number_tohex(v) for v in entries)
         return b"".join(tagData)
@@ -3851,6 +4542,10 @@ BEGIN_DATA
     @tagData.setter
     def tagData(self, tagData):
         self._tagData = tagData
+        if getattr(self, "_clut_array_is_view", False):
+            # Drop the view of the previous tag data
+            self._clut_array = None
+            self._clut_array_is_view = False
 
 
 class Observer(ADict):
@@ -3944,9 +4639,11 @@ class CurveType(ICCProfileTag, list):
             self.append(u8Fixed8Number(curveEntries[:2]))
         elif curveEntriesCount:
             # Curve
-            for _count in range(curveEntriesCount):
-                self.append(uInt16Number(curveEntries[:2]))
-                curveEntries = curveEntries[2:]
+            self.extend(
+                struct.unpack(
+                    ">%iH" % curveEntriesCount, curveEntries[: curveEntriesCount * 2]
+                )
+            )
         else:
             # Identity
             self.append(1.0)
@@ -3978,6 +4675,7 @@ class CurveType(ICCProfileTag, list):
     def _reset(self):
         self._transfer_function = {}
         self._bt1886 = {}
+        self._array = None
 
     def append(self, object):
         list.append(self, object)
@@ -3990,11 +4688,22 @@ class CurveType(ICCProfileTag, list):
         bp_in = colormath.xyY2XYZ(D50_xyY[0], D50_xyY[1], self[0] / 65535.0)
         bp_out = colormath.xyY2XYZ(D50_xyY[0], D50_xyY[1], black_Y_out)
         wp_out = colormath.xyY2XYZ(D50_xyY[0], D50_xyY[1], self[-1] / 65535.0)
-        for i, v in enumerate(self):
-            X, Y, Z = colormath.xyY2XYZ(D50_xyY[0], D50_xyY[1], v / 65535.0)
-            self[i] = (
-                colormath.apply_bpc(X, Y, Z, bp_in, bp_out, wp_out, weight)[1] * 65535.0
-            )
+        XYZ = _xyY2XYZ_array(D50_xyY[0], D50_xyY[1], self.array / 65535.0)
+        XYZ = _apply_bpc_array(XYZ, bp_in, bp_out, wp_out, weight)
+        self[:] = (XYZ[:, 1] * 65535.0).tolist()
+
+    @property
+    def array(self):
+        """Return the curve entries as read-only float64 NumPy array.
+
+        The array is cached until the curve is modified.
+
+        """
+        if self._array is None:
+            array = numpy.array(self, dtype=numpy.float64)
+            array.flags.writeable = False
+            self._array = array
+        return self._array
 
     def extend(self, iterable):
         list.extend(self, iterable)
@@ -4021,11 +4730,18 @@ class CurveType(ICCProfileTag, list):
         if lstar_slice:
             start = slice[0] * 100
             end = slice[1] * 100
-            values = []
-            for i, y in enumerate(self):
-                n = colormath.XYZ2Lab(0, y / 65535.0 * 100, 0)[0]
-                if start <= n <= end:
-                    values.append((i / (len(self) - 1.0) * 65535.0, y))
+            y = self.array
+            L = colormath_array.XYZ2Lab(
+                numpy.stack((y * 0, y / 65535.0 * 100, y * 0), axis=-1),
+                colormath.get_whitepoint(None, 100),
+            )[:, 0]
+            (indexes,) = numpy.nonzero((start <= L) & (L <= end))
+            values = list(
+                zip(
+                    (indexes / (len(self) - 1.0) * 65535.0).tolist(),
+                    y[indexes].tolist(),
+                )
+            )
         else:
             maxv = len(self) - 1.0
             maxi = int(maxv)
@@ -4105,6 +4821,11 @@ class CurveType(ICCProfileTag, list):
                         i / 100.0,
                     )
                 )
+        # Per-entry gamma of the (black point compensated) curve in the slice
+        starti = max(int(math.ceil(slice[0] * len(self))), 0)
+        endi = int(math.floor(slice[1] * len(self))) + 1
+        x = numpy.arange(starti, min(endi, len(self))) / (len(self) - 1.0) * 65535.0
+        n = _get_gammas_array(x, otrc.array[starti:endi], 65535.0, vmin, vmax)
         for name, exp, outoffset in tfs:
             if name in ("DICOM", "Rec. 1886", "SMPTE 2084", "HLG"):
                 try:
@@ -4128,37 +4849,17 @@ class CurveType(ICCProfileTag, list):
                 match[(name, exp, outoffset)] = 1.0
             else:
                 match[(name, exp, outoffset)] = 0.0
-                count = 0
-                start = slice[0] * len(self)
-                end = slice[1] * len(self)
-                for i, n in enumerate(otrc):
-                    # n = colormath.XYZ2Lab(0, n / 65535.0 * 100, 0)[0]
-                    if start <= i <= end:
-                        n = colormath.get_gamma(
-                            [(i / (len(self) - 1.0) * 65535.0, n)],
-                            65535.0,
-                            vmin,
-                            vmax,
-                            False,
-                        )
-                        if n:
-                            n = n[0]
-                            # n2 = colormath.XYZ2Lab(0, trc[i] / 65535.0 * 100, 0)[0]
-                            n2 = colormath.get_gamma(
-                                [(i / (len(self) - 1.0) * 65535.0, trc[i])],
-                                65535.0,
-                                vmin,
-                                vmax,
-                                False,
-                            )
-                            if n2 and n2[0]:
-                                n2 = n2[0]
-                                match[(name, exp, outoffset)] += 1 - (
-                                    max(n, n2) - min(n, n2)
-                                ) / ((n + n2) / 2.0)
-                                count += 1
+                n2 = _get_gammas_array(x, trc.array[starti:endi], 65535.0, vmin, vmax)
+                valid = ~numpy.isnan(n) & ~numpy.isnan(n2) & (n2 != 0)
+                count = int(numpy.count_nonzero(valid))
                 if count:
-                    match[(name, exp, outoffset)] /= count
+                    n1 = n[valid]
+                    n2 = n2[valid]
+                    # Sequential sum, same result as adding up one by one
+                    match[(name, exp, outoffset)] = (
+                        numpy.cumsum(1 - numpy.abs(n1 - n2) / ((n1 + n2) / 2.0))[-1]
+                        / count
+                    )
         if not best:
             self._transfer_function[(best, slice)] = match
             return match
@@ -4215,9 +4916,8 @@ class CurveType(ICCProfileTag, list):
         bt1886 = colormath.BT1886(mtx, XYZbp, outoffset, gamma)
         self._bt1886[(gamma, black_Y, outoffset)] = bt1886
         self.set_trc(-709, size)
-        for i, v in enumerate(self):
-            X, Y, Z = colormath.xyY2XYZ(x, y, v / 65535.0)
-            self[i] = bt1886.apply(X, Y, Z)[1] * 65535.0
+        XYZ = _xyY2XYZ_array(x, y, self.array / 65535.0)
+        self[:] = (_bt1886_apply_array(bt1886, XYZ)[:, 1] * 65535.0).tolist()
 
     def set_dicom_trc(self, black_cdm2=0.05, white_cdm2=100, size=None):
         """Set the response to the DICOM Grayscale Standard Display Function
@@ -4247,7 +4947,7 @@ class CurveType(ICCProfileTag, list):
             size = len(self)
         if size < 2:
             size = 1024
-        self[:] = []
+        values = []
         for i in range(size):
             v = (
                 math.pow(
@@ -4258,7 +4958,8 @@ class CurveType(ICCProfileTag, list):
                 )
                 / white_dicomY
             )
-            self.append(v * 65535)
+            values.append(v * 65535)
+        self[:] = values
 
     def set_hlg_trc(
         self,
@@ -4285,8 +4986,6 @@ class CurveType(ICCProfileTag, list):
                 f"The black level of {black_cdm2:f} cd/m2 is out of range "
                 "for HLG. Valid range begins at 0 cd/m2."
             )
-        values = []
-
         hlg = colormath.HLG(black_cdm2, white_cdm2, system_gamma, ambient_cdm2)
 
         if maxsignal < 1:
@@ -4306,11 +5005,12 @@ class CurveType(ICCProfileTag, list):
             size = len(self)
         if size < 2:
             size = 1024
-        for i in range(size):
-            n = i / (size - 1.0)
-            v = hlg.eotf(min(n, maxsignal))
-            values.append(min(v / maxv, 1.0))
-        self[:] = [min(v * 65535, 65535) for v in values]
+        transfer_function = colormath_array.HLGTransferFunction(
+            black_cdm2, hlg.white_cdm2, system_gamma, ambient_cdm2
+        )
+        n = numpy.minimum(numpy.arange(size) / (size - 1.0), maxsignal)
+        values = numpy.minimum(transfer_function.decode(n) / maxv, 1.0)
+        self[:] = numpy.minimum(values * 65535, 65535).tolist()
 
     def set_smpte2084_trc(
         self,
@@ -4347,14 +5047,13 @@ class CurveType(ICCProfileTag, list):
                 "cd/m2 is out of range for SMPTE 2084. "
                 "Valid range is up to 10000 cd/m2."
             )
-        values = []
         maxv = white_cdm2 / 10000.0
         maxi = colormath.specialpow(maxv, 1.0 / -2084)
         if rolloff:
             # Rolloff as defined in ITU-R BT.2390
             if not master_white_cdm2:
                 master_white_cdm2 = 10000
-            bt2390 = colormath.BT2390(
+            bt2390 = colormath_array.BT2390(
                 black_cdm2,
                 white_cdm2,
                 master_black_cdm2,
@@ -4370,13 +5069,12 @@ class CurveType(ICCProfileTag, list):
             size = len(self)
         if size < 2:
             size = 1024
-        for i in range(size):
-            n = i / (size - 1.0)
-            if rolloff:
-                n = bt2390.apply(n)
-            v = colormath.specialpow(n * (maxi / maxi_out), -2084)
-            values.append(min(v / maxv, 1.0))
-        self[:] = [min(v * 65535, 65535) for v in values]
+        n = numpy.arange(size) / (size - 1.0)
+        if rolloff:
+            n = bt2390.apply(n)
+        v = colormath_array.specialpow(n * (maxi / maxi_out), -2084)
+        values = numpy.minimum(v / maxv, 1.0)
+        self[:] = numpy.minimum(values * 65535, 65535).tolist()
         if black_cdm2 and not rolloff:
             self.apply_bpc(black_cdm2 / white_cdm2)
 
@@ -4398,15 +5096,15 @@ class CurveType(ICCProfileTag, list):
                 return
             else:
                 size = 1024
-        self[:] = []
         if not callable(power):
             exp = power
 
             def power(a):
                 return colormath.specialpow(a, exp)
 
-        for i in range(0, size):
-            self.append(vmin + power(float(i) / (size - 1)) * (vmax - vmin))
+        self[:] = [
+            vmin + power(float(i) / (size - 1)) * (vmax - vmin) for i in range(0, size)
+        ]
 
     def smooth_cr(self, length=64):
         """Smooth curves (Catmull-Rom)."""
@@ -4442,8 +5140,9 @@ class CurveType(ICCProfileTag, list):
             tagData.append(u8Fixed8Number_tohex(self[0]))
         elif curveEntriesCount:
             # Curve
-            for curveEntry in self:
-                tagData.append(uInt16Number_tohex(curveEntry))
+            tagData.append(
+                struct.pack(">%iH" % curveEntriesCount, *[int(round(v)) for v in self])
+            )
         return b"".join(tagData)
 
     @tagData.setter
@@ -5423,6 +6122,10 @@ class VideoCardGammaFormulaType(VideoCardGammaType):
         return VideoCardGammaTableType(b"".join(tagData), self.tagSignature)
 
 
+# struct formats for VideoCardGammaTableType entry sizes
+_vcgt_entry_formats = {1: "B", 2: "H", 4: "I", 8: "Q"}
+
+
 class VideoCardGammaTableType(VideoCardGammaType):
     def __init__(self, tagData, tagSignature):
         VideoCardGammaType.__init__(self, tagData, tagSignature)
@@ -5441,20 +6144,16 @@ class VideoCardGammaTableType(VideoCardGammaType):
                 "data": [],
             }
         )
-        hex2int = {1: uInt8Number, 2: uInt16Number, 4: uInt32Number, 8: uInt64Number}
-        if entrySize not in hex2int:
+        if entrySize not in _vcgt_entry_formats:
             raise ValueError(
                 f"Invalid VideoCardGammaTableType entry size {int(entrySize):d}"
             )
-        i = 0
-        while i < channels:
-            self.data.append([])
-            j = 0
-            while j < entryCount:
-                index = 6 + i * entryCount * entrySize + j * entrySize
-                self.data[i].append(hex2int[entrySize](data[index : index + entrySize]))
-                j = j + 1
-            i = i + 1
+        fmt = ">%i%s" % (entryCount, _vcgt_entry_formats[entrySize])
+        for i in range(channels):
+            index = 6 + i * entryCount * entrySize
+            self.data.append(
+                list(struct.unpack(fmt, data[index : index + entryCount * entrySize]))
+            )
 
     def getNormalizedValues(self, amount=None):
         if amount is None:
@@ -5507,6 +6206,13 @@ class VideoCardGammaTableType(VideoCardGammaType):
             self.entrySize = int(bits / 8)
         bitv = 2.0**bits
         newmax = math.pow(256, self.entrySize) - 1
+        if quantizer is round:
+            # Python's round() and numpy.rint() both round half to even
+            for channel in self.data:
+                values = numpy.asarray(channel, dtype=numpy.float64)
+                values = numpy.rint(values / oldmax * bitv) / bitv * newmax
+                channel[:] = list(map(int, values.tolist()))
+            return
         for _i, channel in enumerate(self.data):
             for j, value in enumerate(channel):
                 channel[j] = int(quantizer(value / oldmax * bitv) / bitv * newmax)
@@ -5514,18 +6220,15 @@ class VideoCardGammaTableType(VideoCardGammaType):
     def resize(self, length=128):
         data = [[], [], []]
         for i, channel in enumerate(self.data):
-            for j in range(0, length):
-                j *= (len(channel) - 1) / float(length - 1)
-                if int(j) != j:
-                    floor = channel[int(math.floor(j))]
-                    ceil = channel[min(int(math.ceil(j)), len(channel) - 1)]
-                    interpolated = range(floor, ceil + 1)
-                    fraction = j - int(j)
-                    index = int(round(fraction * (ceil - floor)))
-                    v = interpolated[index]
-                else:
-                    v = channel[int(j)]
-                data[i].append(v)
+            channel = numpy.asarray(channel)
+            j = numpy.arange(length) * ((len(channel) - 1) / float(length - 1))
+            jfloor = j.astype(numpy.int64)
+            floor = channel[jfloor]
+            jceil = numpy.minimum(numpy.ceil(j).astype(numpy.int64), len(channel) - 1)
+            ceil = channel[jceil]
+            # Round the fraction between neighbouring entries to a whole step
+            v = floor + numpy.rint((j - jfloor) * (ceil - floor)).astype(channel.dtype)
+            data[i] = v.tolist()
         self.data = data
         self.entryCount = len(data[0])
 
@@ -5567,15 +6270,18 @@ class VideoCardGammaTableType(VideoCardGammaType):
             uInt16Number_tohex(self.entryCount),
             uInt16Number_tohex(self.entrySize),
         ]
-        int2hex = {
-            1: uInt8Number_tohex,
-            2: uInt16Number_tohex,
-            4: uInt32Number_tohex,
-            8: uInt64Number_tohex,
-        }
+        if self.entrySize == 1:
+            # Like uInt8Number_tohex, pack as 16-bit and keep the low byte
+            fmt = ">%iH" % self.entryCount
+        else:
+            fmt = ">%i%s" % (self.entryCount, _vcgt_entry_formats[self.entrySize])
         for channel in self.data:
-            for i in range(0, self.entryCount):
-                tagData.append(int2hex[self.entrySize](channel[i]))
+            values = struct.pack(
+                fmt, *[int(round(v)) for v in channel[: self.entryCount]]
+            )
+            if self.entrySize == 1:
+                values = values[1::2]
+            tagData.append(values)
         return b"".join(tagData)
 
     @tagData.setter
@@ -6157,7 +6863,124 @@ class ICCProfileInvalidError(IOError):
     pass
 
 
-_iccprofilecache = WeakValueDictionary()
+class ICCProfileCache:
+    """Cache for ICCProfile instances.
+
+    Profiles are addressed by (path, device, inode, mtime, size) or by MD5 of
+    the profile data and kept in an LRU which is limited to max_bytes of
+    profile and tag data, as estimated when a profile is cached. Pinned
+    profiles are never evicted.
+
+    """
+
+    def __init__(self, max_bytes=64 * 1024**2):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> [profile, size]
+        self._pinned = {}  # key -> pin count
+        self._size = 0
+        self._lock = threading.RLock()
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return the cached profile for key, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, profile):
+        """Cache a profile, evicting least recently used ones if needed."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._size -= entry[1]
+            size = profile._get_cache_size()
+            self._entries[key] = [profile, size]
+            self._size += size
+            self._evict()
+
+    def discard(self, key, profile=None):
+        """Remove key (only if it refers to profile, if given) from the cache."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (profile is None or entry[0] is profile):
+                del self._entries[key]
+                self._pinned.pop(key, None)
+                self._size -= entry[1]
+
+    def pin(self, profile):
+        """Keep a cached profile from being evicted until it is unpinned."""
+        with self._lock:
+            key = profile._key
+            if not key:
+                return
+            self._pinned[key] = self._pinned.get(key, 0) + 1
+            if key not in self._entries:
+                self.put(key, profile)
+
+    def unpin(self, profile):
+        """Allow a pinned profile to be evicted again."""
+        with self._lock:
+            key = profile._key
+            entry = self._entries.get(key)
+            if entry is None or entry[0] is not profile:
+                return
+            count = self._pinned.get(key, 0) - 1
+            if count > 0:
+                self._pinned[key] = count
+            else:
+                self._pinned.pop(key, None)
+            self._evict()
+
+    def _evict(self):
+        if self._size <= self.max_bytes:
+            return
+        for key in list(self._entries):
+            if key in self._pinned:
+                continue
+            self._size -= self._entries.pop(key)[1]
+            self.evictions += 1
+            if self._size <= self.max_bytes:
+                break
+
+    def clear(self):
+        """Clear the cache (including pins) and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._pinned.clear()
+            self._size = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """Return a dict with cache statistics for diagnostics."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "pinned": len(self._pinned),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+_iccprofilecache = ICCProfileCache()
+
+# Number of ICCProfile.isSame comparisons decided by each tier
+issame_stats = {"id": 0, "fingerprint": 0, "tags": 0, "md5": 0}
 
 
 class ICCProfile:
@@ -6168,11 +6991,20 @@ class ICCProfile:
     is False (default True), only the header will be read initially and
     loading of the tags will be deferred to when they are accessed the
     first time.
-    """
 
-    _recent = []
+    If the 'use_cache' keyword argument is True (default False), profiles
+    are looked up in (and added to) the shared ICCProfileCache.
 
-    def __new__(cls, profile=None, load=True, use_cache=False):
+    If the 'use_mmap' keyword argument is True (default False) and the
+    profile is a file, the file will be memory-mapped instead of read
+    when loading, and tag data will only be copied out of the mapping
+    when a tag is accessed (parsed) the first time. The mapping stays open
+    until close() is called, which on Windows prevents the file from being
+    replaced or deleted, so don't keep such profiles around (e.g. in the
+    profile cache) for longer than needed.
+    """
+
+    def __new__(cls, profile=None, load=True, use_cache=False, use_mmap=False):
         key = None
         # the content of the profile should be passed as bytes in Python 3.
         if isinstance(profile, (str, pathlib.Path)):
@@ -6211,7 +7043,7 @@ class ICCProfile:
 
         if use_cache:
             chk = _iccprofilecache.get(key)
-            if chk:
+            if chk is not None:
                 return chk
 
         if isinstance(key, tuple):
@@ -6220,19 +7052,15 @@ class ICCProfile:
 
         self = super(ICCProfile, cls).__new__(cls)
 
-        if use_cache and key:
-            _iccprofilecache[key] = self
-
-            # Make sure most recent three are not garbage collected
-            if len(ICCProfile._recent) == 3:
-                ICCProfile._recent.pop(0)
-            ICCProfile._recent.append(self)
-
         self._key = key
         self.ID = b"\0" * 16
         self._data = b""
         self._file = None
+        self._mmap = None
+        self._use_mmap = use_mmap
         self._tagoffsets = []  # Original tag offsets
+        self._tagdata_cache = {}  # Encoded tag data and MD5 of padded tag data
+        self._tagsizes = {}  # Original sizes of parsed tags
         self._tags = LazyLoadTagAODict(self)
         self.fileName = None
         self.is_loaded = False
@@ -6357,6 +7185,8 @@ class ICCProfile:
                     if vcgt:
                         self.tags["vcgt"] = vcgt
                 self.size = len(self.data)
+                if use_cache and key:
+                    _iccprofilecache.put(key, self)
                 return self
 
             if data[36:40] != b"acsp":
@@ -6414,6 +7244,9 @@ class ICCProfile:
         else:
             self.set_defaults()
 
+        if use_cache and key:
+            _iccprofilecache.put(key, self)
+
         return self
 
     def set_defaults(self):
@@ -6461,62 +7294,95 @@ class ICCProfile:
         """Get raw binary profile data.
 
         This will re-assemble the various profile parts (header, tag table and data)
-        on-the-fly.
+        on-the-fly. Parsed tags are encoded every time, tags that have not been parsed
+        are not.
+        """
+        tagTableSize, tagsDataSize, chunks = self._layout_tags()
+        return b"".join([self.header(tagTableSize, tagsDataSize)] + chunks)
+
+    def _layout_tags(self):
+        """Lay out tag table and tag data.
+
+        Returns tag table size, tag data size and a list of chunks (tag count and
+        tag table, followed by tag data and padding) which make up the profile
+        after the header.
+
+        Parsed tags can be changed in place through any reference to them (also
+        one obtained under another tag signature), so they are always encoded.
+        Their MD5 is only calculated again if the encoded data changed. Tags that
+        have not been parsed keep their encoded data and MD5 until replaced.
         """
+        tags = self.tags
         # Assemble tag table and tag data
-        tagCount = len(self.tags)
+        tagCount = len(tags)
         tagTable = dict()
         tagTableSize = tagCount * 12
         tagsData = []
-        tagsDataOffset = []
+        tagsDataOffset = {}
         tagDataOffset = 128 + 4 + tagTableSize
-        tags = []
+        order = []
         # Order of tag table and actual tag data may be different.
         # Keep order of tags according to original offsets (if any).
         for _oOffset, tagSignature in sorted(self._tagoffsets):
-            if tagSignature in self.tags:
-                tags.append(tagSignature)
+            if tagSignature in tags:
+                order.append(tagSignature)
+        tagoffsets = set(self._tagoffsets)
 
         # Keep tag table order
-        for tagSignature in self.tags:
+        ordered = set(order)
+        for tagSignature in tags:
             tagTable[tagSignature] = tagSignature.encode()
-            if tagSignature not in tags:
-                tags.append(tagSignature)
+            if tagSignature not in ordered:
+                order.append(tagSignature)
 
-        for tagSignature in tags:
-            tag = AODict.__getitem__(self.tags, tagSignature)
+        for tagSignature in order:
+            tag = AODict.__getitem__(tags, tagSignature)
+            cached = self._tagdata_cache.get(tagSignature)
             if isinstance(tag, ICCProfileTag):
-                tagData = self.tags[tagSignature].tagData
+                tagData = tag.tagData
+                if cached is not None and cached[0] != tagData:
+                    cached = None
+            elif cached is None:
+                tagData = bytes(tag[3])
             else:
-                tagData = tag[3]
+                tagData = cached[0]
             tagDataSize = len(tagData)
             # Pad all data with binary zeros, so it lies on 4-byte boundaries
             padding = int(math.ceil(tagDataSize / 4.0)) * 4 - tagDataSize
-            tagData += b"\0" * padding
+            padded_size = tagDataSize + padding
+            # Look for shared tag data by checksum of the padded data
+            if cached is None:
+                checksum = md5(tagData)
+                if padding:
+                    checksum.update(b"\0" * padding)
+                cached = tagData, checksum.digest()
+                self._tagdata_cache[tagSignature] = cached
+            key = padded_size, cached[1]
+            shared = tagsDataOffset.get(key)
             if (
-                tagDataOffset,
-                tagSignature,
-            ) not in self._tagoffsets and tagData in tagsData:
-                tagTable[tagSignature] += uInt32Number_tohex(
-                    tagsDataOffset[tagsData.index(tagData)]
-                )
+                shared
+                and (tagDataOffset, tagSignature) not in tagoffsets
+                and shared[1].ljust(padded_size, b"\0")
+                == tagData.ljust(padded_size, b"\0")
+            ):
+                tagTable[tagSignature] += uInt32Number_tohex(shared[0])
             else:
                 tagTable[tagSignature] += uInt32Number_tohex(tagDataOffset)
                 tagsData.append(tagData)
-                tagsDataOffset.append(tagDataOffset)
-                tagDataOffset += tagDataSize + padding
+                if padding:
+                    tagsData.append(b"\0" * padding)
+                if not shared:
+                    tagsDataOffset[key] = tagDataOffset, tagData
+                tagDataOffset += padded_size
             tagTable[tagSignature] += uInt32Number_tohex(tagDataSize)
-        tagsData = b"".join(tagsData)
-        header = self.header(tagTableSize, len(tagsData))
-        data = b"".join(
-            [
-                header,
-                uInt32Number_tohex(tagCount),
-                b"".join(list(tagTable.values())),
-                tagsData,
-            ]
-        )
-        return data
+        tagsDataSize = tagDataOffset - (128 + 4 + tagTableSize)
+        chunks = [uInt32Number_tohex(tagCount) + b"".join(tagTable.values())]
+        chunks.extend(tagsData)
+        return tagTableSize, tagsDataSize, chunks
+
+    def _invalidate_tag(self, tagSignature):
+        """Discard cached data of a replaced or removed tag."""
+        self._tagdata_cache.pop(tagSignature, None)
 
     def header(self, tagTableSize, tagDataSize):
         """Profile Header"""
@@ -6601,7 +7467,7 @@ class ICCProfile:
                 if DEBUG:
                     print("tagCount:", tagCount)
 
-                tagTable = self._data[132 : 132 + tagCount * 12]
+                tagTable = bytes(self._data[132 : 132 + tagCount * 12])
                 self._tagoffsets = []
                 discard_len = 0
                 tags = {}
@@ -6652,7 +7518,7 @@ class ICCProfile:
                                     f"actual size {len(tagData):d})"
                                 )
                                 tagDataSize = len(tagData)
-                            typeSignature = tagData[:4]
+                            typeSignature = bytes(tagData[:4])
                             if len(typeSignature) < 4:
                                 print(
                                     "Warning: Tag type signature for tag "
@@ -6672,7 +7538,7 @@ class ICCProfile:
                         self._tags[tagSignature] = tags[(tagDataOffset, tagDataSize)]
                     tagTable = tagTable[12:]
 
-                self._data = self._data[:128]
+                self._data = bytes(self._data[:128])
         return self._tags
 
     def calculateID(self, setID=True):
@@ -6687,28 +7553,80 @@ class ICCProfile:
         Profile ID field (bytes 84 to 99) in the profile header have been
         temporarily replaced with zeros.
         """
-        data = self.data
-        data = (
-            data[:44]
+        tagTableSize, tagsDataSize, chunks = self._layout_tags()
+        checksum = self._id_md5(self.header(tagTableSize, tagsDataSize))
+        for chunk in chunks:
+            checksum.update(chunk)
+        ID = checksum.digest()
+        if setID:
+            self._setID(ID)
+        return ID
+
+    def _id_header(self, header):
+        """Return header with the fields excluded from the profile ID zeroed."""
+        return (
+            header[:44]
             + b"\0\0\0\0"
-            + data[48:64]
+            + header[48:64]
             + b"\0\0\0\0"
-            + data[68:84]
+            + header[68:84]
             + b"\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0"
-            + data[100:]
+            + header[100:]
         )
-        ID = md5(data).digest()
-        if setID:
-            if ID != self.ID:
-                # No longer reflects original profile
-                self._delfromcache()
-            self.ID = ID
-        return ID
+
+    def _id_md5(self, header):
+        """Return MD5 object for profile ID calculation, updated with header."""
+        return md5(self._id_header(header))
+
+    def _fingerprint(self):
+        """Return header and tag table fingerprint (see isSame).
+
+        Profiles with different fingerprints have different IDs. This does
+        not need the tag data, so it is cheap to compute.
+        """
+        # Tag table and data sizes are not known without assembling the tags
+        return self._id_header(self.header(0, 0)), tuple(self.tags)
+
+    def _tag_digests(self):
+        """Return list of (tag signature, MD5 of padded tag data) in table order.
+
+        Digests are cached per tag until the tag is changed.
+        """
+        self._layout_tags()
+        return [
+            (tagSignature, self._tagdata_cache[tagSignature][1])
+            for tagSignature in self.tags
+        ]
+
+    def _setID(self, ID):
+        if ID != self.ID:
+            # No longer reflects original profile
+            self._delfromcache()
+        self.ID = ID
 
     def close(self):
-        """Closes the associated file object (if any)."""
+        """Closes the associated file object and memory map (if any).
+
+        Tag data that has not been accessed yet is copied out of the memory
+        map before it is closed.
+        """
         if self._file and not self._file.closed:
             self._file.close()
+        if self._mmap:
+            for tagSignature, tag in list(AODict.items(self._tags)):
+                if not isinstance(tag, ICCProfileTag) and isinstance(
+                    tag[3], memoryview
+                ):
+                    tag = tag[:3] + (tag[3].tobytes(),)
+                    AODict.__setitem__(self._tags, tagSignature, tag)
+            if isinstance(self._data, memoryview):
+                self._data = self._data.tobytes()
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Still referenced, will be closed when garbage collected
+                pass
+            self._mmap = None
 
     def convert_iccv4_tags_to_iccv2(self, version=2.4, undo_wtpt_chad=False):
         """Convert ICCv4 parametric curve tags to ICCv2-compatible curve tags
@@ -7351,14 +8269,42 @@ class ICCProfile:
         profile can be a ICCProfile instance, a binary string
         containing profile data, a filename or a file object.
 
+        If both profiles have an embedded ID and force_calculation is not
+        set, the embedded IDs are compared. Otherwise, the comparison is done
+        in tiers, cheapest first:
+
+        1. Header and tag table fingerprint (no tag data needed)
+        2. Per-tag MD5 digests (cached until a tag is changed) and the
+           assembled tag table
+        3. Full profile ID calculation
+
+        Each comparison counts the deciding tier in issame_stats.
+
         """
         if not isinstance(profile, self.__class__):
             profile = self.__class__(profile)
-        if force_calculation or self.ID == b"\0" * 16:
+        null_ID = b"\0" * 16
+        if not force_calculation and null_ID not in (self.ID, profile.ID):
+            issame_stats["id"] += 1
+            return self.ID == profile.ID
+        if self._fingerprint() != profile._fingerprint():
+            issame_stats["fingerprint"] += 1
+            return False
+        if force_calculation or null_ID == self.ID == profile.ID:
+            # Compare tags. Equal tag tables (tag offsets and sizes) and tag
+            # data give equal profiles and IDs
+            if self._tag_digests() != profile._tag_digests():
+                issame_stats["tags"] += 1
+                return False
+            if self._layout_tags()[2][0] == profile._layout_tags()[2][0]:
+                issame_stats["tags"] += 1
+                return True
+        issame_stats["md5"] += 1
+        if force_calculation or self.ID == null_ID:
             id1 = self.calculateID(False)
         else:
             id1 = self.ID
-        if force_calculation or profile.ID == b"\0" * 16:
+        if force_calculation or profile.ID == null_ID:
             id2 = profile.calculateID(False)
         else:
             id2 = profile.ID
@@ -7375,9 +8321,20 @@ class ICCProfile:
             if self._file.closed:
                 self._file = open(self._file.name, "rb")
                 self._file.seek(len(self._data))
-            read_size = self.size - len(self._data)
-            if read_size > 0:
-                self._data += self._file.read(read_size)
+            if self._use_mmap:
+                try:
+                    self._mmap = mmap.mmap(
+                        self._file.fileno(), 0, access=mmap.ACCESS_READ
+                    )
+                except (OSError, ValueError):
+                    # Not a regular file or empty
+                    self._mmap = None
+                else:
+                    self._data = memoryview(self._mmap)[: self.size]
+            if not self._mmap:
+                read_size = self.size - len(self._data)
+                if read_size > 0:
+                    self._data += self._file.read(read_size)
             self._file.close()
             self.is_loaded = True
 
@@ -7972,6 +8929,138 @@ class ICCProfile:
                         )
                     return XYZbp
 
+    def lookup(self, idata, intent="r", direction="f", pcs=None, interpolation=None):
+        """Look up colors through the profile in-process.
+
+        Evaluates LUT16Type ('mft2') tables or matrix/TRC tags on a batch of
+        colors with NumPy, mirroring Argyll's xicclu for table lookups.
+
+        idata           (N, channels) array-like. Device values in range 0..1
+                        for forward lookups, PCS values for backward lookups.
+        intent          'p', 'r', 's' or 'a' (absolute colorimetric)
+        direction       'f' (forward, A2B) or 'b' (backward, B2A)
+        pcs             'x' (XYZ 0..1) or 'l' (L*a*b*). Defaults to the
+                        profile connection space.
+        interpolation   'tetrahedral' or 'trilinear'. Defaults to
+                        tetrahedral for device and trilinear for PCS input,
+                        like Argyll does.
+
+        Returns a (N, channels) NumPy array.
+        Raises NotImplementedError for lookups that need Argyll.
+
+        """
+        if direction not in ("f", "b") or self.profileClass in (b"link", b"abst"):
+            raise NotImplementedError(
+                f"ICCProfile.lookup: Unsupported direction {repr(direction)} "
+                f"for profile class {repr(self.profileClass)}"
+            )
+        native_pcs = self.connectionColorSpace
+        if native_pcs not in (b"XYZ", b"Lab"):
+            raise NotImplementedError(
+                f"ICCProfile.lookup: Unsupported PCS {repr(native_pcs)}"
+            )
+        if not pcs:
+            pcs = "l" if native_pcs == b"Lab" else "x"
+        D50 = list(self.illuminant.values())
+        values = numpy.array(idata, dtype=numpy.float64, ndmin=2)
+        tablename = ("A2B", "B2A")[direction == "b"]
+        table = self.tags.get(tablename + {"p": "0", "s": "2"}.get(intent, "1"))
+        if table is None:
+            table = self.tags.get(tablename + "0")
+        if table is not None and not isinstance(table, LUT16Type):
+            raise NotImplementedError(
+                f"ICCProfile.lookup: Unsupported tag type {table.__class__.__name__}"
+            )
+        if direction == "b":
+            # PCS -> device
+            if pcs == "l":
+                values = colormath_array.Lab2XYZ(values, D50)
+            if intent == "a":
+                values = values @ numpy.linalg.inv(self._absolute_matrix()).T
+            if table is not None:
+                if native_pcs == b"Lab":
+                    values = colormath_array.XYZ2Lab(values, D50)
+                return table.lookup(
+                    _legacy_PCS_encode(values, native_pcs),
+                    native_pcs == b"XYZ",
+                    interpolation or "trilinear",
+                )
+            if self.colorSpace == b"RGB":
+                values = numpy.linalg.solve(self._colorant_matrix(), values.T).T
+            else:
+                values = values[:, 1:2] / D50[1]
+            return self._trc_lookup(numpy.clip(values, 0, 1), True)
+        # Device -> PCS
+        if table is not None:
+            values = _legacy_PCS_decode(
+                table.lookup(values, False, interpolation or "tetrahedral"), native_pcs
+            )
+            if native_pcs == b"Lab":
+                if intent != "a" and pcs == "l":
+                    return values
+                values = colormath_array.Lab2XYZ(values, D50)
+        else:
+            trc = self._trc_lookup(numpy.clip(values, 0, 1))
+            if self.colorSpace == b"RGB":
+                values = trc @ self._colorant_matrix().T
+            else:
+                values = trc[:, :1] * numpy.asarray(D50)
+        if intent == "a":
+            values = values @ self._absolute_matrix().T
+        if pcs == "l":
+            values = colormath_array.XYZ2Lab(values, D50)
+        return values
+
+    def _absolute_matrix(self):
+        """Return matrix from PCS-relative to absolute XYZ."""
+        # Same convention as XYZType.ir: Apple profiles have a bug where they
+        # contain a 'chad' tag, but the media white is not under PCS
+        # illuminant, so 'chad' does not map the PCS white to the media white.
+        # Scale to the stored media white instead
+        if isinstance(self.tags.get("chad"), chromaticAdaptionTag) and (
+            self.creator != b"appl"
+        ):
+            matrix = self.tags.chad.inverted()
+        else:
+            # ICC v2 absolute colorimetric: XYZ scaling to the media white
+            matrix = colormath.wp_adaption_matrix(
+                list(self.illuminant.values()),
+                list(self.tags.wtpt.ir.values()),
+                "XYZ scaling",
+            )
+        return numpy.array(matrix, dtype=numpy.float64)
+
+    def _colorant_matrix(self):
+        """Return RGB to PCS XYZ matrix from colorant tags."""
+        try:
+            columns = [list(self.tags[f"{c}XYZ"].values()) for c in "rgb"]
+        except KeyError:
+            raise NotImplementedError(
+                "ICCProfile.lookup: Profile has neither LUT nor matrix/TRC tags"
+            )
+        return numpy.array(columns, dtype=numpy.float64).T
+
+    def _trc_lookup(self, values, inverse=False):
+        """Apply (inverse) TRC tags to normalized device values."""
+        channels = "rgb" if self.colorSpace == b"RGB" else "k"
+        out = numpy.empty((len(values), len(channels)))
+        for i, channel in enumerate(channels):
+            trc = self.tags.get(f"{channel}TRC")
+            if isinstance(trc, ParametricCurveType):
+                trc = trc.get_trc(4096)
+            elif not isinstance(trc, CurveType):
+                raise NotImplementedError(
+                    "ICCProfile.lookup: Profile has neither LUT nor matrix/TRC tags"
+                )
+            if len(trc) < 2:
+                gamma = trc[0] if len(trc) else 1.0
+                if inverse:
+                    gamma = 1.0 / gamma
+                out[:, i] = values[:, i] ** gamma
+            else:
+                out[:, i] = _curves_lookup([trc], values[:, i : i + 1], inverse)[:, 0]
+        return out
+
     def optimize(self, return_bytes_saved=False, update_ID=True):
         """Optimize the tag data so that shared tags are only recorded once.
 
@@ -8096,26 +9185,61 @@ class ICCProfile:
                     factor = gamut_coverage[key]
                     self.tags.meta[f"GAMUT_coverage({key})"] = factor
 
-    def write(self, stream_or_filename=None):
+    def write(self, stream_or_filename=None, calculate_id=False):
         """Write profile to stream.
 
         This will re-assemble the various profile parts (header,
-        tag table and data) on-the-fly.
+        tag table and data) on-the-fly, writing each tag's data to the
+        stream directly instead of joining the whole profile in memory.
+
+        If calculate_id is True, the profile ID is calculated while writing
+        (see calculateID).
         """
         if not stream_or_filename:
             if self._file:
                 if not self._file.closed:
                     self.close()
             stream_or_filename = self.fileName
+        if self._mmap:
+            # Writing to the mapped file would truncate it from under us
+            self.close()
         if isinstance(stream_or_filename, str):
             stream = open(stream_or_filename, "wb")
             if not self.fileName:
                 self.fileName = stream_or_filename
         else:
             stream = stream_or_filename
-        stream.write(self.data)
-        if isinstance(stream_or_filename, str):
-            stream.close()
+        try:
+            self._write(stream, calculate_id)
+        finally:
+            if isinstance(stream_or_filename, str):
+                stream.close()
+
+    def _write(self, stream, calculate_id=False):
+        tagTableSize, tagsDataSize, chunks = self._layout_tags()
+        seekable = getattr(stream, "seekable", lambda: False)()
+        if calculate_id and not seekable:
+            # Can't update the header after the fact
+            self.calculateID()
+            calculate_id = False
+        if seekable:
+            start = stream.tell()
+        header = self.header(tagTableSize, tagsDataSize)
+        stream.write(header)
+        if calculate_id:
+            checksum = self._id_md5(header)
+        for chunk in chunks:
+            stream.write(chunk)
+            if calculate_id:
+                checksum.update(chunk)
+        if calculate_id:
+            self._setID(checksum.digest())
+            id_header = self.header(tagTableSize, tagsDataSize)
+            if id_header != header:
+                end = stream.tell()
+                stream.seek(start)
+                stream.write(id_header)
+                stream.seek(end)
 
     def __getattribute__(self, name):
         if name == "write" or name.startswith("set") or name.startswith("apply"):
@@ -8126,8 +9250,158 @@ class ICCProfile:
     def _delfromcache(self):
         # Make double sure to remove ourselves from the cache
         if self._key and self._key in _iccprofilecache:
-            try:
-                del _iccprofilecache[self._key]
-            except KeyError:
-                # GC was faster
-                pass
+            _iccprofilecache.discard(self._key, self)
+
+    def _get_cache_size(self):
+        """Return estimated size of profile and tag data in bytes."""
+        if not self._tags:
+            # Tag table not read yet, use the profile size from the header
+            return max(self.size, 128)
+        size = 128
+        for tagSignature, tag in dict.items(self._tags):
+            if isinstance(tag, ICCProfileTag):
+                size += self._tagsizes.get(tagSignature, 0)
+            else:
+                size += tag[2]
+            # Encoded tag data kept for assembling the profile, unless it is
+            # the (unparsed) tag data itself
+            cached = self._tagdata_cache.get(tagSignature)
+            if cached is not None and (
+                isinstance(tag, ICCProfileTag) or cached[0] is not tag[3]
+            ):
+                size += len(cached[0])
+        return size
+
+
+def get_profile_info(path, tags=("desc", "wtpt")):
+    """Read header fields and selected tags of the ICC profile at path.
+
+    Only the header, tag table and the selected tags are read. Returns a dict
+    of plain (picklable) values. XYZ tags are returned as lists, text tags as
+    strings and other tags as raw tag data.
+    """
+    profile = ICCProfile(path, load=False, use_mmap=True)
+    info = {
+        "path": path,
+        "version": profile.version,
+        "profileClass": profile.profileClass,
+        "colorSpace": profile.colorSpace,
+        "connectionColorSpace": profile.connectionColorSpace,
+        "creator": profile.creator,
+        "device": profile.device,
+        "ID": profile.ID,
+        "tagSignatures": list(profile.tags),
+        "tags": {},
+    }
+    for tagSignature in tags:
+        tag = profile.tags.get(tagSignature)
+        if tag is None:
+            continue
+        if isinstance(tag, XYZType):
+            tag = list(tag.values())
+        elif isinstance(tag, (Text, TextDescriptionType, MultiLocalizedUnicodeType)):
+            tag = str(tag)
+        else:
+            tag = tag.tagData
+        info["tags"][tagSignature] = tag
+    profile.close()
+    return info
+
+
+def _scan_profile(func, path, args):
+    try:
+        return path, func(path, *args), None
+    except Exception as exception:
+        if not isinstance(exception, EnvironmentError):
+            # Make sure the exception can be passed back from a worker process
+            exception = ICCProfileInvalidError(repr(exception))
+        return path, None, exception
+
+
+def _scan_profile_star(args):
+    return _scan_profile(*args)
+
+
+class ProfileScanner:
+    """Parse ICC profiles in parallel.
+
+    Each path is passed to func (default get_profile_info) together with
+    args, in a pool of threads or (if use_processes is True) processes.
+    func and its results need to be picklable when using processes.
+    """
+
+    def __init__(
+        self,
+        func=get_profile_info,
+        args=(),
+        num_workers=None,
+        use_processes=False,
+        chunksize=8,
+    ):
+        self.func = func
+        self.args = args
+        self.num_workers = num_workers
+        self.use_processes = use_processes
+        self.chunksize = chunksize
+        self.files = 0
+        self.errors = 0
+        self.elapsed = 0.0
+
+    @property
+    def files_per_second(self):
+        if not self.elapsed:
+            return 0.0
+        return self.files / self.elapsed
+
+    def scan(self, paths):
+        """Yield (path, result, exception) tuples as profiles are parsed.
+
+        Results are yielded in order of completion. If parsing a profile
+        fails, result is None and exception is set, and scanning continues.
+        """
+        from multiprocessing.pool import ThreadPool
+
+        from DisplayCAL.multiprocess import cpu_count, mp
+
+        paths = list(paths)
+        self.files = self.errors = 0
+        self.elapsed = 0.0
+        num_workers = self.num_workers
+        if num_workers is None:
+            num_workers = cpu_count()
+            if not self.use_processes:
+                # Reading profiles is mostly waiting for I/O
+                num_workers *= 4
+        num_workers = max(min(num_workers, len(paths)), 1)
+        start = time.time()
+        jobs = ((self.func, path, self.args) for path in paths)
+        if num_workers == 1:
+            pool = None
+            results = map(_scan_profile_star, jobs)
+        else:
+            if self.use_processes:
+                pool = mp.Pool(num_workers)
+            else:
+                pool = ThreadPool(num_workers)
+            results = pool.imap_unordered(_scan_profile_star, jobs, self.chunksize)
+        try:
+            for result in results:
+                self.files += 1
+                if result[2] is not None:
+                    self.errors += 1
+                self.elapsed = time.time() - start
+                yield result
+        finally:
+            if pool:
+                pool.terminate()
+                pool.join()
+            self.elapsed = time.time() - start
+
+    def stats(self):
+        """Return a dict with scan statistics for diagnostics."""
+        return {
+            "files": self.files,
+            "errors": self.errors,
+            "elapsed": self.elapsed,
+            "files_per_second": self.files_per_second,
+        }
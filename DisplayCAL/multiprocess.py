@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 
-from queue import Empty
+from queue import Empty, Queue
 import atexit
 import errno
 import logging
@@ -9,6 +9,7 @@ import multiprocessing as mp
 import multiprocessing.pool
 import sys
 import threading
+import time
 
 
 def cpu_count(limit_by_total_vmem=True):
@@ -43,6 +44,79 @@ def cpu_count(limit_by_total_vmem=True):
         return 1
 
 
+# Persistent pool used by pool_slice, started on first use
+_pool = None
+_pool_size = 0
+_pool_config = None
+_pool_lock = threading.RLock()
+
+# Configuration read by the pool worker processes (to find Argyll utilities)
+POOL_CONFIG_NAMES = ("argyll.dir", "argyll.version")
+
+# Shared memory progress counter and abort flag of the persistent pool. Set in
+# the parent process when starting the pool, and in the pool worker processes
+# by the pool initializer.
+_shared = None
+
+
+def _init_worker(shared):
+    global _shared
+    _shared = shared
+    if sys.platform == "win32":
+        # Exit handlers registered with atexit will not normally run when a
+        # multiprocessing subprocess exits, so shutdown logging explicitly
+        # when the persistent worker process ends.
+        mp.util.Finalize(None, logging.shutdown, exitpriority=0)
+
+
+def _get_config_state():
+    """Return the configuration read by pool workers as comparable tuple."""
+    from DisplayCAL.config import getcfg
+
+    return tuple(getcfg(name) for name in POOL_CONFIG_NAMES)
+
+
+def get_pool(num_workers):
+    """Return the persistent pool with num_workers worker processes.
+
+    The pool is started on first use, and restarted if a different number of
+    workers is requested or the configuration the workers read (see
+    POOL_CONFIG_NAMES) changed since it was started. Worker processes only
+    see the configuration and the Argyll utility paths at the time they were
+    started, like the fresh worker processes of every call did before the
+    pool was persistent.
+
+    """
+    global _pool, _pool_size, _pool_config, _shared
+    with _pool_lock:
+        config_state = _get_config_state()
+        if _pool is not None and (
+            _pool_size != num_workers or _pool_config != config_state
+        ):
+            shutdown()
+        if _pool is None:
+            _shared = (mp.Value("d", 0.0), mp.Value("b", 0))
+            _pool = NonDaemonicPool(num_workers, _init_worker, (_shared,))
+            _pool_size = num_workers
+            _pool_config = config_state
+        return _pool
+
+
+def shutdown():
+    """Shut down the persistent pool (if started)."""
+    global _pool, _pool_size, _pool_config
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool.join()
+            _pool = None
+            _pool_size = 0
+            _pool_config = None
+
+
+atexit.register(shutdown)
+
+
 def pool_slice(
     func,
     data_in,
@@ -53,6 +127,7 @@ def pool_slice(
     logfile=None,
     num_batches=1,
     progress=0,
+    data_out=None,
 ):
     """Process data in slices using a pool of workers and return the results.
 
@@ -60,12 +135,30 @@ def pool_slice(
     original input data, irrespective of the order in which the workers
     finished (FIFO).
 
+    If num_batches is "auto", the data is handed out in small chunks on
+    demand, sized according to the measured throughput (see
+    AdaptiveChunkScheduler). Otherwise, the data is split into
+    num_workers * num_batches equal slices up front.
+
+    If data_in is a SharedArray, workers only receive (offset, length)
+    descriptors of their slice instead of a pickled copy, and 'func' is
+    called with the slice as list. Its result is written to the SharedArray
+    data_out (or back to data_in if not given) at the same offset if it has
+    matching shape, in which case the result returned for the slice is a
+    copy of that part of the shared array instead of a pickled copy. It is
+    a copy and not a view, so it stays valid after the SharedArray is closed.
+
     Progress percentage is written to optional logfile using a background
-    thread that monitors a queue.
+    thread that monitors the progress counters.
     Note that 'func' is supposed to periodically check thread_abort.event
     which is passed as the first argument to 'func', and put its progress
     percentage into the queue which is passed as the second argument to 'func'.
 
+    With more than one worker, the persistent pool (see get_pool) is used.
+    Its progress counter and abort flag are shared by all of its workers, so
+    only one pool_slice call can use the pool at a time: Concurrent calls
+    from other threads wait until the running call has finished.
+
     """
     if args is None:
         args = ()
@@ -87,121 +180,311 @@ def pool_slice(
         # multiple workers
         num_batches = 1
 
-    chunksize = float(len(data_in)) / (num_workers * num_batches)
-    if chunksize < 1:
-        num_batches = 1
-        chunksize = float(len(data_in)) / num_workers
+    if num_batches == "auto":
+        scheduler = AdaptiveChunkScheduler(len(data_in), num_workers)
+    else:
+        scheduler = ChunkScheduler(len(data_in), num_workers, num_batches)
 
     if num_workers > 1:
-        Pool = NonDaemonicPool
-        manager = mp.Manager()
-        if thread_abort is not None and not isinstance(
-            thread_abort.event, mp.managers.EventProxy
-        ):
-            # Replace the event with a managed instance that is compatible
-            # with pool
-            event = thread_abort.event
-            thread_abort.event = manager.Event()
-            if event.is_set():
-                thread_abort.event.set()
-        else:
-            event = None
-        Queue = manager.Queue
+        # The persistent pool's shared counters can only serve one caller
+        # at a time, concurrent callers are serialized (see docstring)
+        with _pool_lock:
+            return _pool_slice(
+                get_pool(num_workers),
+                scheduler,
+                func,
+                data_in,
+                args,
+                kwds,
+                thread_abort,
+                logfile,
+                progress,
+                data_out,
+            )
+    # Do it all in in the main thread of the current instance
+    return _pool_slice(
+        FakePool(),
+        scheduler,
+        func,
+        data_in,
+        args,
+        kwds,
+        thread_abort,
+        logfile,
+        progress,
+        data_out,
+    )
+
+
+def _pool_slice(
+    pool,
+    scheduler,
+    func,
+    data_in,
+    args,
+    kwds,
+    thread_abort,
+    logfile,
+    progress,
+    data_out,
+):
+    size = len(data_in)
+    shared = not isinstance(pool, FakePool)
+    progress_counter = ProgressCounter(shared)
+    if thread_abort is None:
+        thread_abort_event = None
+    elif shared:
+        thread_abort_event = SharedEvent()
+        thread_abort_event.clear()
+        if thread_abort.event.is_set():
+            thread_abort_event.set()
     else:
-        # Do it all in in the main thread of the current instance
-        Pool = FakePool
-        manager = None
-        Queue = FakeQueue
-
-    if thread_abort is not None:
         thread_abort_event = thread_abort.event
-    else:
-        thread_abort_event = None
 
-    progress_queue = Queue()
-
-    if logfile:
-
-        def progress_logger(num_workers, progress=0.0):
-            eof_count = 0
-            prevperc = -1
-            while progress < 100 * num_workers:
-                try:
-                    inc = progress_queue.get(True, 0.1)
-                    if isinstance(inc, Exception):
-                        raise inc
-                    progress += inc
-                except Empty:
-                    continue
-                except IOError:
-                    break
-                except EOFError:
-                    eof_count += 1
-                    if eof_count == num_workers:
-                        break
-                perc = round(progress / num_workers)
+    done = threading.Event()
+
+    def progress_monitor():
+        prevperc = -1
+        while True:
+            finished = done.is_set()
+            if shared and thread_abort is not None and thread_abort.event.is_set():
+                # Forward abort to the workers
+                thread_abort_event.set()
+            if logfile:
+                perc = round(progress + progress_counter.progress)
                 if perc > prevperc:
                     logfile.write("\r%i%%" % perc)
                     prevperc = perc
+            if finished:
+                break
+            done.wait(0.1)
 
-        threading.Thread(
-            target=progress_logger,
-            args=(num_workers * num_batches, progress * num_workers * num_batches),
-            name="ProcessProgressLogger",
-            group=None,
-        ).start()
-
-    pool = Pool(num_workers)
-    results = []
-    start = 0
-    for batch in range(num_batches):
-        for i in range(batch * num_workers, (batch + 1) * num_workers):
-            end = int(math.ceil(chunksize * (i + 1)))
-            results.append(
-                pool.apply_async(
-                    WorkerFunc(func, batch == num_batches - 1),
-                    (data_in[start:end], thread_abort_event, progress_queue) + args,
-                    kwds,
-                )
-            )
-            start = end
+    monitor = None
+    if logfile or shared:
+        monitor = threading.Thread(
+            target=progress_monitor, name="ProcessProgressLogger", group=None
+        )
+        monitor.start()
 
-    # Get results
     exception = None
-    data_out = []
-    for result in results:
-        result = result.get()
-        if isinstance(result, Exception):
-            exception = result
-            continue
-        data_out.append(result)
-
-    pool.close()
-    pool.join()
-
-    if manager:
-        # Need to shutdown manager so it doesn't hold files in use
-        if event:
-            # Restore original event
-            if thread_abort.event.is_set():
-                event.set()
-            thread_abort.event = event
-        manager.shutdown()
+    output = []
+    try:
+        # Keep at most scheduler.max_pending chunks queued, and hand out the
+        # next chunk whenever a worker finishes one
+        completed = Queue()
+        results = []
+        pending = 0
+        start = 0
+        while True:
+            while start < size and pending < scheduler.max_pending:
+                if thread_abort_event and thread_abort_event.is_set():
+                    # Hand out the remaining data at once, the worker will
+                    # return its abort result right away
+                    end = size
+                else:
+                    end = start + scheduler.next_chunksize(start)
+                count = end - start
+                if isinstance(data_in, SharedArray):
+                    chunk = SharedSlice(data_in, start, end, data_out)
+                else:
+                    chunk = data_in[start:end]
+                results.append(
+                    pool.apply_async(
+                        WorkerFunc(func, timed=True),
+                        (
+                            chunk,
+                            thread_abort_event,
+                            progress_counter.chunk(count / size),
+                        )
+                        + args,
+                        kwds,
+                        lambda result, count=count: completed.put((count, result)),
+                        lambda result, count=count: completed.put((count, result)),
+                    )
+                )
+                pending += 1
+                start = end
+            if not pending:
+                break
+            count, result = completed.get()
+            pending -= 1
+            if isinstance(result, tuple):
+                scheduler.update(count, result[1])
+
+        # Get results
+        for result in results:
+            result = result.get()[0]
+            if isinstance(result, Exception):
+                exception = result
+                continue
+            if isinstance(result, slice):
+                # Result was written to shared memory
+                shared_out = data_in if data_out is None else data_out
+                result = shared_out.array[result].copy()
+            output.append(result)
+    finally:
+        done.set()
+        if monitor:
+            monitor.join()
+
+    if shared and thread_abort is not None and thread_abort_event.is_set():
+        # A worker aborted (e.g. on SIGBREAK)
+        thread_abort.event.set()
 
     if exception:
         raise exception
 
-    return data_out
+    return output
+
+
+class ChunkScheduler:
+    """Split the data into num_workers * num_batches equal slices up front."""
+
+    def __init__(self, size, num_workers, num_batches=1):
+        self.size = size
+        self.chunksize = float(size) / (num_workers * num_batches)
+        if self.chunksize < 1:
+            self.chunksize = float(size) / num_workers
+        self.max_pending = sys.maxsize
+        self.num_chunks = 0
+
+    def next_chunksize(self, start):
+        self.num_chunks += 1
+        end = min(int(math.ceil(self.chunksize * self.num_chunks)), self.size)
+        return end - start
+
+    def update(self, count, elapsed):
+        pass
+
+
+class AdaptiveChunkScheduler:
+    """Hand out chunks on demand, sized by measured throughput.
+
+    Each chunk is sized to take about target_time seconds at the throughput
+    measured for the previous chunks (exponential moving average), but no
+    more than a fraction of the remaining work, so chunks get smaller towards
+    the end and all workers finish at about the same time even if parts of
+    the data (e.g. out of gamut colors) are more expensive to process.
+
+    """
+
+    def __init__(self, size, num_workers, target_time=1.0, min_chunksize=1):
+        self.size = size
+        self.num_workers = num_workers
+        self.target_time = target_time
+        self.min_chunksize = min_chunksize
+        # Two chunks per worker, so the next chunk is already queued when a
+        # worker becomes idle
+        self.max_pending = num_workers * 2
+        self.chunksize = max(int(math.ceil(size / (num_workers * 4.0))), 1)
+        self.throughput = None
+        self.num_chunks = 0
+
+    def next_chunksize(self, start):
+        remaining = self.size - start
+        chunksize = self.chunksize
+        if self.throughput:
+            chunksize = int(self.throughput * self.target_time)
+        # Don't hand out more than a share of the remaining work, but keep
+        # chunks large enough that the per-chunk overhead stays small
+        limit = max(
+            int(math.ceil(remaining / (self.num_workers * 2.0))), chunksize // 4
+        )
+        chunksize = min(chunksize, limit)
+        self.num_chunks += 1
+        return min(max(chunksize, self.min_chunksize, 1), remaining)
+
+    def update(self, count, elapsed):
+        """Update throughput (items per second and worker) from a chunk."""
+        if elapsed <= 0:
+            return
+        throughput = count / elapsed
+        if self.throughput is None:
+            self.throughput = throughput
+        else:
+            self.throughput = self.throughput * 0.5 + throughput * 0.5
+
+
+class ProgressCounter:
+    """Progress channel passed to pool workers in place of a queue.
+
+    Workers put() their progress percentage increments. Instead of queueing
+    the items, they are scaled by weight (the fraction of the data the worker
+    is processing) and summed up, in shared memory if 'shared' is true (only
+    valid for the persistent pool).
+
+    """
+
+    def __init__(self, shared=False, weight=1.0, total=None):
+        self.shared = shared
+        self.weight = weight
+        if total is None:
+            total = [0.0]
+            if shared:
+                _shared[0].value = 0.0
+        self._total = total
+
+    def chunk(self, weight):
+        """Return a counter for a chunk that adds to this counter's total."""
+        return ProgressCounter(self.shared, weight, self._total)
+
+    @property
+    def progress(self):
+        if self.shared:
+            return _shared[0].value
+        return self._total[0]
+
+    def put(self, item, block=True, timeout=None):
+        if isinstance(item, EOFError):
+            pass
+        elif isinstance(item, Exception):
+            print(item)
+        elif self.shared:
+            with _shared[0].get_lock():
+                _shared[0].value += item * self.weight
+        else:
+            self._total[0] += item * self.weight
+
+
+class SharedEvent:
+    """Abort flag of the persistent pool in shared memory.
+
+    Has the same interface as threading.Event (minus wait).
+
+    """
+
+    def is_set(self):
+        return bool(_shared[1].value)
+
+    def set(self):
+        _shared[1].value = 1
+
+    def clear(self):
+        _shared[1].value = 0
 
 
 class WorkerFunc:
-    def __init__(self, func, exit=False):
+    """Call func and return its result or exception.
+
+    If timed is true, a (result, elapsed seconds) tuple is returned.
+
+    """
+
+    def __init__(self, func, exit=False, timed=False):
         self.func = func
         self.exit = exit
+        self.timed = timed
 
     def __call__(self, data, thread_abort_event, progress_queue, *args, **kwds):
+        ts = time.perf_counter()
+        shared_slice = None
         try:
-            return self.func(data, thread_abort_event, progress_queue, *args, **kwds)
+            if isinstance(data, SharedSlice):
+                shared_slice = data
+                data = shared_slice.get()
+            result = self.func(data, thread_abort_event, progress_queue, *args, **kwds)
+            if shared_slice and not isinstance(result, Exception):
+                result = shared_slice.put(result)
         except Exception as exception:
             if (
                 not getattr(sys, "_sigbreak", False)
@@ -211,12 +494,14 @@ class WorkerFunc:
                 import traceback
 
                 print(traceback.format_exc())
-            return exception
+            result = exception
         finally:
+            if shared_slice:
+                shared_slice.close()
             progress_queue.put(EOFError())
-            if mp.current_process().name != "MainProcess":
+            if mp.current_process().name != "MainProcess" and self.exit:
                 print("Exiting worker process", mp.current_process().name)
-                if sys.platform == "win32" and self.exit:
+                if sys.platform == "win32":
                     # Exit handlers registered with atexit will not normally
                     # run when a multiprocessing subprocess exits. We are only
                     # interested in our own exit handler though.
@@ -241,6 +526,134 @@ class WorkerFunc:
                     # Logging is normally shutdown by atexit, as well. Do
                     # it explicitly instead.
                     logging.shutdown()
+        if self.timed:
+            return result, time.perf_counter() - ts
+        return result
+
+
+class SharedArray:
+    """NumPy array in a shared memory block.
+
+    Instances can be passed to pool workers, which attach to the same shared
+    memory block (only its name, shape and dtype are pickled). The creating
+    process is responsible for calling close() and unlink() when done, which
+    can be done by using the instance as context manager.
+
+    Views of the array must not be used after close(). close() raises
+    BufferError while views still exist, instead of unmapping the memory
+    they point to.
+
+    """
+
+    def __init__(self, data=None, shape=None, dtype="float64", name=None):
+        import numpy
+        from multiprocessing import shared_memory
+
+        if data is not None:
+            data = numpy.asarray(data, dtype=dtype)
+            shape = data.shape
+        self.shape = tuple(shape)
+        self.dtype = numpy.dtype(dtype).str
+        size = int(numpy.prod(self.shape)) * numpy.dtype(dtype).itemsize
+        self.owner = name is None
+        self._shm = shared_memory.SharedMemory(name, self.owner, max(size, 1))
+        # Unlike numpy.ndarray(buffer=...), numpy.frombuffer keeps the buffer
+        # exported while the array or any view of it exists, so the shared
+        # memory block can't be unmapped from under them
+        count = int(numpy.prod(self.shape))
+        self.array = numpy.frombuffer(self._shm.buf, self.dtype, count).reshape(
+            self.shape
+        )
+        if data is not None:
+            self.array[:] = data
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            self.close()
+        finally:
+            if self.owner:
+                self.unlink()
+
+    def __getstate__(self):
+        return self.name, self.shape, self.dtype
+
+    def __del__(self):
+        # Release the array before the shared memory block gets closed
+        self.array = None
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __setstate__(self, state):
+        name, shape, dtype = state
+        self.__init__(shape=shape, dtype=dtype, name=name)
+
+    def close(self):
+        """Close access to the shared memory block from this instance.
+
+        Raises BufferError if views of the array are still in use.
+
+        """
+        self.array = None
+        try:
+            self._shm.close()
+        except BufferError:
+            # The memory stays mapped until the last view is gone
+            raise BufferError(
+                "SharedArray: Can't close shared memory block %r while views "
+                "of the array are in use" % self.name
+            )
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def unlink(self):
+        """Request that the shared memory block be destroyed."""
+        self._shm.unlink()
+
+
+class SharedSlice:
+    """Descriptor of a slice of a SharedArray (see pool_slice)."""
+
+    def __init__(self, data_in, start, stop, data_out=None):
+        self.data_in = data_in
+        self.data_out = data_out
+        self.start = start
+        self.stop = stop
+
+    def close(self):
+        for shared in (self.data_in, self.data_out):
+            if shared is not None and not shared.owner:
+                shared.close()
+
+    def get(self):
+        """Return the input data of the slice as list."""
+        return self.data_in.array[self.start : self.stop].tolist()
+
+    def put(self, result):
+        """Write result to the shared output array if its shape matches.
+
+        Returns the slice of the output array that was written to, or result
+        as-is if it did not fit.
+
+        """
+        import numpy
+
+        out = self.data_in if self.data_out is None else self.data_out
+        view = out.array[self.start : self.stop]
+        try:
+            # Don't let numpy broadcast results of other shapes
+            result_array = numpy.asarray(result, view.dtype)
+        except (TypeError, ValueError):
+            return result
+        if result_array.shape != view.shape:
+            return result
+        view[:] = result_array
+        return slice(self.start, self.stop)
 
 
 class Mapper:
@@ -302,8 +715,16 @@ class FakePool:
     ):
         pass
 
-    def apply_async(self, func, args, kwds):
-        return Result(func(*args, **kwds))
+    def apply_async(self, func, args, kwds, callback=None, error_callback=None):
+        try:
+            result = func(*args, **kwds)
+        except Exception as exception:
+            if error_callback:
+                error_callback(exception)
+            raise
+        if callback:
+            callback(result)
+        return Result(result)
 
     def close(self):
         pass
@@ -0,0 +1,456 @@
+# -*- coding: utf-8 -*-
+"""Persistent index of ICC profile metadata.
+
+The index stores header fields, description, white point, colorants, TRC
+type and profile ID of ICC profiles in a SQLite database, so profiles can
+be found and filtered without opening and parsing every file. Entries are
+revalidated by file modification time and size, and only new or changed
+files are parsed.
+"""
+
+import json
+import mmap
+import os
+import re
+import sqlite3
+import threading
+from contextlib import closing
+from hashlib import md5
+
+from DisplayCAL.icc_profile import (
+    ICCProfile,
+    ICCProfileTag,
+    ProfileScanner,
+    uInt32Number,
+)
+
+SCHEMA_VERSION = 1
+
+PROFILE_EXT_REX = re.compile(r"\.ic[cm]$", re.IGNORECASE)
+
+_FIELDS = (
+    "path",
+    "mtime",
+    "size",
+    "error",
+    "version",
+    "profile_class",
+    "color_space",
+    "connection_color_space",
+    "creator",
+    "manufacturer",
+    "model",
+    "description",
+    "wtpt",
+    "colorants",
+    "trc_type",
+    "profile_id",
+)
+
+_SCHEMA = """
+DROP TABLE IF EXISTS profiles;
+DROP TABLE IF EXISTS tags;
+CREATE TABLE profiles (
+    path TEXT PRIMARY KEY,
+    mtime REAL,
+    size INTEGER,
+    error TEXT,
+    version REAL,
+    profile_class TEXT,
+    color_space TEXT,
+    connection_color_space TEXT,
+    creator TEXT,
+    manufacturer TEXT,
+    model TEXT,
+    description TEXT,
+    wtpt TEXT,
+    colorants TEXT,
+    trc_type TEXT,
+    profile_id TEXT
+);
+CREATE TABLE tags (path TEXT, signature TEXT);
+CREATE INDEX tags_path ON tags (path);
+CREATE INDEX tags_signature ON tags (signature);
+"""
+
+
+def _calculate_file_id(path):
+    """Calculate the profile ID (MD5) from the profile file's bytes."""
+    with open(path, "rb") as f:
+        with closing(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)) as data:
+            size = min(uInt32Number(data[:4]), len(data))
+            checksum = md5(
+                data[:44]
+                + b"\0\0\0\0"
+                + data[48:64]
+                + b"\0\0\0\0"
+                + data[68:84]
+                + b"\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0"
+                + data[100:128]
+            )
+            checksum.update(memoryview(data)[128:size])
+            return checksum.hexdigest()
+
+
+def _tostr(signature):
+    return signature.rstrip(b"\0").decode("ascii", "replace")
+
+
+def _get_trc_type(tags):
+    """Return TRC type from the raw (unparsed) TRC tag, if any."""
+    for tagSignature in ("rTRC", "kTRC"):
+        if tagSignature not in tags:
+            continue
+        tag = dict.__getitem__(tags, tagSignature)
+        if isinstance(tag, ICCProfileTag):
+            tagData = tag.tagData
+        else:
+            tagData = bytes(tag[3])
+        if tagData[:4] == b"para":
+            return "parametric"
+        if tagData[:4] == b"curv" and len(tagData) >= 12:
+            count = uInt32Number(tagData[8:12])
+            if count == 0:
+                return "identity"
+            elif count == 1:
+                return "gamma"
+            return "table"
+        return tagData[:4].decode("ascii", "replace")
+    if "A2B0" in tags:
+        return "lut"
+
+
+def get_index_info(path, stat=None):
+    """Read metadata of the ICC profile at path.
+
+    Returns a dict with the fields stored in the index. Profiles that cannot
+    be parsed have the 'error' field set.
+    """
+    if stat is None:
+        stat = os.stat(path)
+    info = dict.fromkeys(_FIELDS)
+    info.update(path=path, mtime=stat.st_mtime, size=stat.st_size, tags=[])
+    try:
+        profile = ICCProfile(path, load=False, use_mmap=True)
+        tags = profile.tags
+        info.update(
+            version=profile.version,
+            profile_class=_tostr(profile.profileClass),
+            color_space=_tostr(profile.colorSpace),
+            connection_color_space=_tostr(profile.connectionColorSpace),
+            creator=_tostr(profile.creator),
+            manufacturer=_tostr(profile.device["manufacturer"]),
+            model=_tostr(profile.device["model"]),
+            trc_type=_get_trc_type(tags),
+            tags=list(tags),
+        )
+        info["description"] = profile.getDescription()
+        if "wtpt" in tags:
+            info["wtpt"] = list(tags.wtpt.values())
+        colorants = {}
+        for tagSignature in ("rXYZ", "gXYZ", "bXYZ"):
+            if tagSignature in tags:
+                colorants[tagSignature[0]] = list(tags[tagSignature].values())
+        info["colorants"] = colorants or None
+        profile.close()
+        if profile.ID != b"\0" * 16:
+            info["profile_id"] = profile.ID.hex()
+        else:
+            info["profile_id"] = _calculate_file_id(path)
+    except Exception as exception:
+        info["error"] = str(exception) or exception.__class__.__name__
+    return info
+
+
+class ProfileIndex:
+    """Persistent index of ICC profile metadata backed by SQLite.
+
+    Use update() or scan() to add or revalidate entries, and query() to look
+    up profiles by header fields or tag presence.
+
+    timeout is the number of seconds to wait for another connection (e.g. in
+    another process) to release its lock on the database before giving up.
+    """
+
+    def __init__(self, filename=":memory:", timeout=30):
+        self.filename = filename
+        self.timeout = timeout
+        self._lock = threading.RLock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            if self.filename != ":memory:":
+                dirname = os.path.dirname(self.filename)
+                if dirname and not os.path.isdir(dirname):
+                    os.makedirs(dirname)
+            conn = sqlite3.connect(
+                self.filename, timeout=self.timeout, check_same_thread=False
+            )
+            (version,) = conn.execute("PRAGMA user_version").fetchone()
+            if version != SCHEMA_VERSION:
+                conn.executescript(_SCHEMA)
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self._conn = conn
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def get(self, path):
+        """Return up-to-date metadata for the profile at path, or None."""
+        infos = self.update([path])
+        return infos[0] if infos else None
+
+    def update(self, paths, num_workers=None, use_processes=False):
+        """Revalidate the entries for the given profile paths.
+
+        New and changed files (by modification time and size) are parsed in
+        parallel (see icc_profile.ProfileScanner), entries of files that no
+        longer exist are removed. Parsing happens outside of any transaction,
+        the changes are written afterwards in one transaction.
+        Returns a list of metadata dicts of valid profiles, in order.
+        """
+        paths = [os.path.abspath(path) for path in paths]
+        infos = {}
+        removed = []
+        stale = []
+        with self._lock:
+            conn = self._connect()
+            known = {}
+            for i in range(0, len(paths), 500):
+                chunk = paths[i : i + 500]
+                rows = conn.execute(
+                    "SELECT * FROM profiles WHERE path IN (%s)"
+                    % ",".join("?" * len(chunk)),
+                    chunk,
+                )
+                for row in rows:
+                    known[row[0]] = row
+            for path in paths:
+                row = known.get(path)
+                try:
+                    stat = os.stat(path)
+                except EnvironmentError:
+                    if row:
+                        removed.append(path)
+                    continue
+                if row and row[1] == stat.st_mtime and row[2] == stat.st_size:
+                    infos[path] = self._row2info(row)
+                else:
+                    stale.append(path)
+        stored = []
+        scanner = ProfileScanner(
+            get_index_info, num_workers=num_workers, use_processes=use_processes
+        )
+        for path, info, _exception in scanner.scan(stale):
+            if info is None:
+                # File went away while scanning
+                removed.append(path)
+            else:
+                stored.append(info)
+                infos[path] = info
+        self._commit(removed, stored)
+        return [
+            infos[path] for path in paths if path in infos and not infos[path]["error"]
+        ]
+
+    def scan(self, dirs, recursive=True):
+        """Revalidate all profiles in the given directories.
+
+        Entries for files below these directories which are no longer
+        present are removed.
+        Returns a list of metadata dicts of valid profiles.
+        """
+        paths = []
+        for icc_dir in dirs:
+            icc_dir = os.path.abspath(icc_dir)
+            for dirpath, dirnames, basenames in os.walk(icc_dir):
+                for basename in filter(PROFILE_EXT_REX.search, basenames):
+                    paths.append(os.path.join(dirpath, basename))
+                if not recursive:
+                    del dirnames[:]
+        infos = self.update(paths)
+        present = set(paths)
+        removed = []
+        with self._lock:
+            conn = self._connect()
+            for icc_dir in dirs:
+                icc_dir = os.path.join(os.path.abspath(icc_dir), "")
+                rows = conn.execute(
+                    "SELECT path FROM profiles WHERE substr(path, 1, ?) = ?",
+                    (len(icc_dir), icc_dir),
+                ).fetchall()
+                for (path,) in rows:
+                    if path not in present and (
+                        recursive or os.path.dirname(path) == icc_dir[:-1]
+                    ):
+                        removed.append(path)
+        self._commit(removed)
+        return infos
+
+    def query(
+        self,
+        profile_class=None,
+        color_space=None,
+        connection_color_space=None,
+        min_version=None,
+        max_version=None,
+        tags=None,
+        paths=None,
+    ):
+        """Return metadata dicts of indexed profiles matching all criteria.
+
+        profile_class, color_space and connection_color_space can be a
+        single value or a sequence of values (e.g. "mntr" or ("mntr",
+        "scnr")). max_version is exclusive. tags is a sequence of tag
+        signatures which must all be present. If paths is given, only
+        entries for these paths are considered.
+        Entries are not revalidated, use update() or scan() first.
+        """
+        where = ["error IS NULL"]
+        args = []
+        for name, value in (
+            ("profile_class", profile_class),
+            ("color_space", color_space),
+            ("connection_color_space", connection_color_space),
+        ):
+            if value is None:
+                continue
+            if isinstance(value, (str, bytes)):
+                value = [value]
+            value = [v.decode() if isinstance(v, bytes) else v for v in value]
+            where.append("%s IN (%s)" % (name, ",".join("?" * len(value))))
+            args.extend(value)
+        if min_version is not None:
+            where.append("version >= ?")
+            args.append(min_version)
+        if max_version is not None:
+            where.append("version < ?")
+            args.append(max_version)
+        for tagSignature in tags or ():
+            where.append(
+                "EXISTS (SELECT 1 FROM tags WHERE tags.path = profiles.path "
+                "AND signature = ?)"
+            )
+            args.append(tagSignature)
+        with self._lock:
+            rows = (
+                self._connect()
+                .execute(
+                    "SELECT * FROM profiles WHERE %s ORDER BY path"
+                    % " AND ".join(where),
+                    args,
+                )
+                .fetchall()
+            )
+            infos = [self._row2info(row) for row in rows]
+        if paths is not None:
+            paths = set(os.path.abspath(path) for path in paths)
+            infos = [info for info in infos if info["path"] in paths]
+        return infos
+
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM profiles")
+                conn.execute("DELETE FROM tags")
+
+    def _row2info(self, row):
+        info = dict(zip(_FIELDS, row))
+        for name in ("wtpt", "colorants"):
+            if info[name] is not None:
+                info[name] = json.loads(info[name])
+        info["tags"] = [
+            signature
+            for (signature,) in self._conn.execute(
+                "SELECT signature FROM tags WHERE path = ? ORDER BY rowid",
+                (info["path"],),
+            )
+        ]
+        return info
+
+    def _commit(self, removed=(), stored=()):
+        """Remove and store entries in one transaction.
+
+        If another connection keeps the database locked for longer than the
+        timeout, the changes are dropped. The affected files are parsed again
+        on the next update.
+        """
+        if not removed and not stored:
+            return
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    for path in removed:
+                        self._remove(conn, path)
+                    for info in stored:
+                        self._store(conn, info)
+            except sqlite3.OperationalError as exception:
+                if "locked" not in str(exception):
+                    raise
+                print(f"Warning - could not update profile index: {exception}")
+
+    def _remove(self, conn, path):
+        conn.execute("DELETE FROM profiles WHERE path = ?", (path,))
+        conn.execute("DELETE FROM tags WHERE path = ?", (path,))
+
+    def _store(self, conn, info):
+        self._remove(conn, info["path"])
+        values = dict(info)
+        for name in ("wtpt", "colorants"):
+            if values[name] is not None:
+                values[name] = json.dumps(values[name])
+        conn.execute(
+            "INSERT INTO profiles VALUES (%s)" % ",".join("?" * len(_FIELDS)),
+            [values[name] for name in _FIELDS],
+        )
+        conn.executemany(
+            "INSERT INTO tags VALUES (?, ?)",
+            [(info["path"], tagSignature) for tagSignature in info["tags"]],
+        )
+
+
+_profile_index = None
+
+
+def get_profile_index():
+    """Return the shared ProfileIndex instance, creating it on first use.
+
+    The index is stored in the configuration directory. If it cannot be
+    opened there, an in-memory index is used instead.
+    """
+    global _profile_index
+    if _profile_index is None:
+        from DisplayCAL import config
+
+        index = ProfileIndex(os.path.join(config.confighome, "profiles.sqlite"))
+        try:
+            index._connect()
+        except (EnvironmentError, sqlite3.Error) as exception:
+            print(f"Warning - could not open profile index: {exception}")
+            index = ProfileIndex()
+        _profile_index = index
+    return _profile_index
+
+
+def find_profiles(dirs=None, recursive=False, **criteria):
+    """Return metadata dicts of valid profiles in dirs matching criteria.
+
+    dirs defaults to the user and system ICC profile directories. The
+    profiles in dirs are revalidated in the shared index first, see
+    ProfileIndex.query for the criteria.
+    """
+    if dirs is None:
+        from DisplayCAL.defaultpaths import iccprofiles, iccprofiles_home
+
+        dirs = set(iccprofiles_home + iccprofiles)
+    index = get_profile_index()
+    paths = [info["path"] for info in index.scan(dirs, recursive=recursive)]
+    return index.query(paths=paths, **criteria)
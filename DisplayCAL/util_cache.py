@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""Small in-memory caches with size bounds and statistics."""
+
+import threading
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+def freeze(value):
+    """Return a hashable key for value that compares by value, not identity.
+
+    Lists (and list subclasses like colormath.Matrix3x3) become tuples, NumPy
+    arrays become their dtype, shape and bytes. Hashable values are returned
+    unchanged.
+
+    """
+    if isinstance(value, (list, tuple)):
+        frozen = tuple(value)
+        try:
+            hash(frozen)
+        except TypeError:
+            frozen = tuple(freeze(item) for item in value)
+        return frozen
+    if hasattr(value, "tobytes") and hasattr(value, "dtype"):
+        # NumPy array
+        return (value.dtype.str, value.shape, value.tobytes())
+    hash(value)
+    return value
+
+
+def snapshot(value):
+    """Return a copy of value that compares equal to it until it is changed.
+
+    Lists and tuples (also nested) are copied, other values are returned
+    unchanged.
+
+    """
+    if isinstance(value, tuple):
+        return tuple(snapshot(item) for item in value)
+    if isinstance(value, list):
+        return [snapshot(item) for item in value]
+    return value
+
+
+class LRUCache:
+    """Mapping that keeps at most maxsize entries.
+
+    If the cache is full, adding an entry discards the least recently used
+    one. Lookups with get() and [] are counted as hits or misses.
+
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self):
+        return iter(list(self._entries))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get(self, key, default=None):
+        """Return the value for key if cached, else default."""
+        # Lock-free, single OrderedDict operations are atomic. The counters
+        # are only used for diagnostics
+        value = self._entries.get(key, _MISSING)
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        try:
+            self._entries.move_to_end(key)
+        except KeyError:
+            # Evicted by another thread in the meantime
+            pass
+        self.hits += 1
+        return value
+
+    def items(self):
+        return list(self._entries.items())
+
+    def clear(self):
+        """Remove all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """Return a dict with cache statistics for diagnostics."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class IdentityCache(LRUCache):
+    """LRUCache keyed by the identity of objects instead of their value.
+
+    Building the key costs one id() per object, regardless of its size (e.g.
+    a TRC with thousands of entries). Entries keep a reference to the objects,
+    so their ids cannot be reused while cached, and a snapshot that is
+    compared on lookup, so objects changed in place miss the cache.
+
+    """
+
+    def lookup(self, objs, *args, default=None):
+        """Return the value cached for the tuple objs and args, else default.
+
+        args must be hashable and are compared by value.
+
+        """
+        entry = self.get((tuple(map(id, objs)),) + args)
+        if entry is None:
+            return default
+        if entry[1] != objs:
+            # Changed in place
+            self.hits -= 1
+            self.misses += 1
+            return default
+        return entry[2]
+
+    def store(self, objs, *args, value):
+        """Cache value for the tuple objs and args."""
+        self[(tuple(map(id, objs)),) + args] = objs, snapshot(objs), value
@@ -158,6 +158,7 @@ from DisplayCAL.defaultpaths import (
 from DisplayCAL.edid import WMIError, get_edid
 from DisplayCAL.icc_profile import (
     _mp_apply,
+    A2BInverseLookup,
     chromaticAdaptionTag,
     ChromaticityType,
     create_RGB_A2B_XYZ,
@@ -186,7 +187,7 @@ from DisplayCAL.icc_profile import (
 from DisplayCAL.log import DummyLogger, LogFile, get_file_logger, log
 from DisplayCAL import madvr
 from DisplayCAL.meta import VERSION, VERSION_BASE, DOMAIN, name as appname, version
-from DisplayCAL.multiprocess import cpu_count, pool_slice
+from DisplayCAL.multiprocess import SharedArray, cpu_count, pool_slice
 from DisplayCAL.options import (
     always_fail_download,
     debug,
@@ -4492,9 +4493,9 @@ END_DATA
                 num_cpus = cpu_count()
                 num_workers = min(max(num_cpus, 1), size)
                 if "A2B0" in profile_out.tags and not use_b2a:
-                    if num_cpus > 2:
-                        num_workers = int(num_workers * 0.75)
-                    num_batches = size // 9
+                    # Hand out work on demand, CAM clipping of out of gamut
+                    # colors makes the lookup cost uneven across the input
+                    num_batches = "auto"
                 else:
                     if num_cpus > 2:
                         num_workers = 2
@@ -4508,24 +4509,50 @@ END_DATA
                         direction, num_workers
                     )
                 )
-                RGB_dst_out = []
-                for slices in pool_slice(
-                    _mp_xicclu,
-                    XYZ_src_out,
-                    (profile_out.fileName, intent[0], "b" if use_b2a else "if"),
-                    {
-                        "pcs": "x",
-                        "use_cam_clipping": True,
-                        "abortmessage": lang.getstr("aborted"),
-                    },
-                    num_workers,
-                    self.thread_abort,
-                    logfiles,
-                    num_batches=num_batches,
-                ):
-                    RGB_dst_out.extend(slices)
+                if num_workers == 1:
+                    # Stream the lookup results, so the cLUT is filled while
+                    # xicclu is still running
+                    xicclu = Xicclu(
+                        profile_out,
+                        intent[0],
+                        "b" if use_b2a else "if",
+                        pcs="x",
+                        use_cam_clipping=True,
+                        logfile=logfiles,
+                        worker=self,
+                        streaming=True,
+                    )
+                    RGB_dst_out = xicclu.lookup_iter(XYZ_src_out)
+                else:
+                    xicclu = None
+                    RGB_dst_out = []
+                    # The device RGB output is written back in-place to the
+                    # shared memory input array
+                    with SharedArray(XYZ_src_out) as XYZ_src_out_shared:
+                        for slices in pool_slice(
+                            _mp_xicclu,
+                            XYZ_src_out_shared,
+                            (
+                                profile_out.fileName,
+                                intent[0],
+                                "b" if use_b2a else "if",
+                            ),
+                            {
+                                "pcs": "x",
+                                "use_cam_clipping": True,
+                                "abortmessage": lang.getstr("aborted"),
+                            },
+                            num_workers,
+                            self.thread_abort,
+                            logfiles,
+                            num_batches=num_batches,
+                        ):
+                            if not isinstance(slices, list):
+                                slices = slices.tolist()
+                            RGB_dst_out.extend(slices)
+                    RGB_dst_out = iter(RGB_dst_out)
+                    logfiles.write("\n")
                 del XYZ_src_out
-                logfiles.write("\n")
                 logfiles.write("Filling cLUT...\n")
                 profile_link = ICCProfile()
                 profile_link.profileClass = b"link"
@@ -4550,7 +4577,6 @@ END_DATA
                 A2B0.output = [[0, 65535]] * 3
                 A2B0.clut = []
                 clut = {}
-                n = 0
                 for a in range(size):
                     for b in range(size):
                         for c in range(size):
@@ -4571,6 +4597,7 @@ END_DATA
                             if seenkey in seen and seen[seenkey] is not True:
                                 RGB = seen[seenkey]
                             else:
+                                RGB = next(RGB_dst_out)
                                 if input_encoding in ("t", "T"):
                                     cond = min(abc) <= level_16 and min(abc) == max(abc)
                                 else:
@@ -4586,11 +4613,13 @@ END_DATA
                                         )
                                     )
                                     RGB = [0] * 3
-                                else:
-                                    RGB = RGB_dst_out[n]
                                 seen[seenkey] = RGB
-                                n += 1
                             clut[abc] = RGB
+                if xicclu:
+                    # Make sure the xicclu process has ended
+                    for RGB in RGB_dst_out:
+                        pass
+                    xicclu.exit()
                 del seen
                 del seenkeys
                 del RGB_dst_out
@@ -4753,8 +4782,7 @@ END_DATA
                         ("encoding.output", output_encoding),
                     ]
                 )
-                profile_link.calculateID()
-                profile_link.write(f"{filename}{profile_ext}")
+                profile_link.write(f"{filename}{profile_ext}", calculate_id=True)
                 profile_link.tags.A2B0.clut_writepng(f"{filename}.A2B0.CLUT.png")
                 del profile_link
 
@@ -5958,11 +5986,11 @@ END_DATA
                     }
                 )
                 srgb.setDescription(f"{appname} Linear Calibration sRGB Profile")
-                srgb.calculateID()
                 srgb.write(
                     os.path.join(
                         self.tempdir, f"{appname} Linear Calibration sRGB Profile.icc"
-                    )
+                    ),
+                    calculate_id=True,
                 )
                 cdinstall = self._attempt_install_profile_colord(srgb)
                 if not cdinstall:
@@ -8305,35 +8333,59 @@ BEGIN_DATA
             threshold = int((clutres - 1) * 0.75)
             threshold2 = int((clutres - 1) / 3)
 
-            for slices in pool_slice(
-                _mp_generate_B2A_clut,
-                list(range(clutres)),
-                (
-                    profile.fileName,
-                    intent,
-                    direction,
-                    pcs,
-                    use_cam_clipping,
-                    clutres,
-                    step,
-                    threshold,
-                    threshold2,
-                    interp,
-                    Linterp,
-                    m2,
-                    XYZbp,
-                    XYZwp,
-                    bpc,
-                    lang.getstr("aborted"),
-                ),
-                {},
-                num_workers,
-                self.thread_abort,
-                logfile,
-                num_batches=clutres // 9,
+            # Optionally invert the A2B table in-process. The coarse forward
+            # grid used to seed the inverse search is computed once and shared
+            # with the workers.
+            native_grid = None
+            if (
+                direction == "if"
+                and profile.colorSpace == b"RGB"
+                and getcfg("xicclu.native")
             ):
-                for i, data in enumerate((idata, odata1, odata2)):
-                    data.extend(slices[i])
+                try:
+                    grid = A2BInverseLookup.forward_grid(profile, intent)
+                except NotImplementedError as exception:
+                    if logfile:
+                        logfile.write(f"Not using native inverse lookup: {exception}\n")
+                else:
+                    native_grid = SharedArray(grid)
+                    if logfile:
+                        logfile.write("Using native inverse lookup\n")
+
+            try:
+                for slices in pool_slice(
+                    _mp_generate_B2A_clut,
+                    list(range(clutres)),
+                    (
+                        profile.fileName,
+                        intent,
+                        direction,
+                        pcs,
+                        use_cam_clipping,
+                        clutres,
+                        step,
+                        threshold,
+                        threshold2,
+                        interp,
+                        Linterp,
+                        m2,
+                        XYZbp,
+                        XYZwp,
+                        bpc,
+                        lang.getstr("aborted"),
+                    ),
+                    {"native_grid": native_grid},
+                    num_workers,
+                    self.thread_abort,
+                    logfile,
+                    num_batches="auto",
+                ):
+                    for i, data in enumerate((idata, odata1, odata2)):
+                        data.extend(slices[i])
+            finally:
+                if native_grid is not None:
+                    native_grid.close()
+                    native_grid.unlink()
 
             if logfile:
                 logfile.write("\n")
@@ -11201,11 +11253,7 @@ usage: spotread [-options] [logfile]
                             for curves in ("input", "output"):
                                 for channel in getattr(A2B1, curves):
                                     getattr(table, curves).append(list(channel))
-                            table.clut = []
-                            for block in A2B1.clut:
-                                table.clut.append([])
-                                for row in block:
-                                    table.clut[-1].append(list(row))
+                            table.clut_array = A2B1.clut_array.copy()
                             profile.tags[tablename] = table
                         else:
                             table = profile.tags[tablename]
@@ -11265,10 +11313,11 @@ usage: spotread [-options] [logfile]
                                 num_workers = 1
                             else:
                                 num_workers = None
-                            table.clut = sum(
-                                pool_slice(
+                            clut = []
+                            with SharedArray(table.clut) as clut_shared:
+                                for slices in pool_slice(
                                     _mp_apply,
-                                    table.clut,
+                                    clut_shared,
                                     (
                                         profile.connectionColorSpace,
                                         colormath.matmul,
@@ -11281,9 +11330,11 @@ usage: spotread [-options] [logfile]
                                     {},
                                     num_workers,
                                     self.thread_abort,
-                                ),
-                                [],
-                            )
+                                ):
+                                    if not isinstance(slices, list):
+                                        slices = slices.tolist()
+                                    clut.extend(slices)
+                            table.clut = clut
 
                 # A2B processing
                 process_A2B = (
@@ -15418,8 +15469,7 @@ BEGIN_DATA
             profile.setDescription(outname)
             profile.tags.vcgt = cal_to_fake_profile(cal).tags.vcgt
             profile.tags.wtpt.X, profile.tags.wtpt.Y, profile.tags.wtpt.Z = XYZw
-            profile.calculateID()
-            profile.write(outfilename)
+            profile.write(outfilename, calculate_id=True)
             self.wrapup(False)
             return True
         else:
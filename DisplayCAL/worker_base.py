@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 
 import atexit
-import math
+import json
 import os
 import shlex
 import shutil
@@ -10,9 +10,13 @@ import subprocess as sp
 import sys
 import tempfile
 import textwrap
+import threading
+import time
 import traceback
 
 from binascii import hexlify
+from collections import OrderedDict
+from hashlib import sha256
 
 if sys.platform == "win32":
     import win32api
@@ -46,12 +50,13 @@ from DisplayCAL.debughelpers import (
     # Warn,
 )
 from DisplayCAL.icc_profile import (
+    A2BInverseLookup,
     ICCProfile,
     LUT16Type,
 )
 from DisplayCAL.log import LogFile
 from DisplayCAL.meta import name as appname
-from DisplayCAL.multiprocess import mp, pool_slice
+from DisplayCAL.multiprocess import SharedArray, mp, pool_slice
 from DisplayCAL.options import debug, verbose
 from DisplayCAL.util_os import quote_args
 from DisplayCAL.util_str import make_filename_safe, safe_basestring, safe_str
@@ -80,7 +85,14 @@ def _mp_xicclu(
     reverse=False,
     convert_video_rgb_to_clut65=False,
     verbose=1,
+    packed=False,
 ):
+    """Xicclu worker
+
+    Returns the parsed output rows. If packed is true, returns a list with
+    a single bytes object of all rows packed according to output_format.
+
+    """
     if not config.cfg.items(config.configparser.DEFAULTSECT):
         config.initcfg()
     profile = ICCProfile(profile_filename)
@@ -102,31 +114,45 @@ def _mp_xicclu(
         output_encoding,
         convert_video_rgb_to_clut65,
         verbose,
+        streaming=True,
     )
+    # Results are parsed while xicclu is still running, unless they are
+    # packed in bulk at the end
+    odata = []
     prevperc = 0
-    start = 0
-    num_subchunks = 50
-    subchunksize = float(len(chunk)) / num_subchunks
-    for i in range(num_subchunks):
-        if (
-            thread_abort_event is not None
-            and getattr(sys, "_sigbreak", False)
-            and not thread_abort_event.is_set()
-        ):
-            thread_abort_event.set()
-            print("Got SIGBREAK, aborting thread...")
-        if thread_abort_event is not None and thread_abort_event.is_set():
-            xicclu.exit(raise_exception=False)
-            return Info(abortmessage)
-        end = int(math.ceil(subchunksize * (i + 1)))
-        xicclu(chunk[start:end])
-        start = end
-        perc = round((i + 1.0) / num_subchunks * 100)
-        if progress_queue and perc > prevperc:
-            progress_queue.put(perc - prevperc)
+    numrows = float(len(chunk))
+    if packed:
+        rows = xicclu.lookup_iter(chunk, raw=True)
+    else:
+        rows = xicclu.lookup_iter(chunk, output_format=output_format, reverse=reverse)
+    count = 0
+    for row in rows:
+        odata.append(row)
+        if packed and verbose and b"->" not in row:
+            continue
+        count += 1
+        perc = round(count / numrows * 100)
+        if perc > prevperc:
+            if (
+                thread_abort_event is not None
+                and getattr(sys, "_sigbreak", False)
+                and not thread_abort_event.is_set()
+            ):
+                thread_abort_event.set()
+                print("Got SIGBREAK, aborting thread...")
+            if thread_abort_event is not None and thread_abort_event.is_set():
+                # Ends the xicclu process
+                rows.close()
+                xicclu.exit(raise_exception=False)
+                return Info(abortmessage)
+            if progress_queue:
+                progress_queue.put(perc - prevperc)
             prevperc = perc
     xicclu.exit()
-    return xicclu.get(output_format=output_format, reverse=reverse)
+    if packed:
+        xicclu.output = odata
+        return [xicclu.get_packed(output_format, reverse)]
+    return odata
 
 
 def _mp_generate_B2A_clut(
@@ -149,11 +175,15 @@ def _mp_generate_B2A_clut(
     XYZwp,
     bpc,
     abortmessage="Aborted",
+    native_grid=None,
 ):
     """B2A cLUT generation worker
 
     This should be spawned as a multiprocessing process
 
+    If native_grid is given (a SharedArray with the forward L*a*b* grid), use
+    the in-process inverse lookup engine instead of xicclu.
+
     """
     if debug:
         print("comtypes?", "comtypes" in str(list(sys.modules.keys())))
@@ -165,9 +195,16 @@ def _mp_generate_B2A_clut(
     idata = []
     abmaxval = 255 + (255 / 256.0)
     profile = ICCProfile(profile_filename)
-    xicclu1 = Xicclu(profile, intent, direction, "n", pcs, 100)
-    xicclu2 = xicclu1
-    if use_cam_clipping:
+    if native_grid is not None:
+        inverse = A2BInverseLookup(profile, intent, native_grid.array.copy())
+        xicclu1 = NativeInverseXicclu(inverse, pcs, 100)
+        xicclu2 = xicclu1
+        if use_cam_clipping:
+            xicclu2 = NativeInverseXicclu(inverse, pcs, 100, use_cam_clipping=True)
+    else:
+        xicclu1 = Xicclu(profile, intent, direction, "n", pcs, 100)
+        xicclu2 = xicclu1
+    if use_cam_clipping and native_grid is None:
         # Use CAM Jab for clipping for cLUT grid points after a given
         # threshold
         xicclu2 = Xicclu(
@@ -247,6 +284,55 @@ def _mp_generate_B2A_clut(
     return idata, data1, data2
 
 
+def xicclu_native(
+    profile,
+    idata,
+    intent="r",
+    pcs=None,
+    scale=1,
+    get_clip=False,
+    show_actual_if_clipped=False,
+):
+    """Forward lookup through profile in-process, returning the same output
+    as Xicclu.get would for the equivalent xicclu call.
+
+    Raises NotImplementedError if the lookup can't be done without xicclu.
+
+    """
+    import numpy
+
+    if pcs not in (None, "x", "X", "l"):
+        raise NotImplementedError(f"xicclu_native: Unsupported PCS {repr(pcs)}")
+    if not isinstance(profile, ICCProfile):
+        if isinstance(profile, CGATS) or str(profile).lower().endswith(".cal"):
+            raise NotImplementedError("xicclu_native: Calibration files unsupported")
+        profile = ICCProfile(profile)
+    if isinstance(idata, str):
+        idata = idata.splitlines()
+    else:
+        idata = list(idata)
+        if idata and isinstance(idata[0], (float, int)):
+            idata = [idata]
+    idata = [
+        [float(v) for v in row.split()] if isinstance(row, str) else row
+        for row in idata
+    ]
+    if not idata:
+        return []
+    idata = numpy.asarray(idata, dtype=numpy.float64) / float(scale)
+    if pcs == "X":
+        # Like xicclu -pX, return XYZ scaled to 0..100
+        parsed = (profile.lookup(idata, intent, "f", "x") * 100).tolist()
+    else:
+        parsed = profile.lookup(idata, intent, "f", pcs).tolist()
+    if get_clip and not (
+        show_actual_if_clipped and "A2B0" in profile.tags and "B2A0" in profile.tags
+    ):
+        for row in parsed:
+            row.append(False)
+    return parsed
+
+
 def printcmdline(cmd, args=None, fn=None, cwd=None):
     """Pretty-print a command line."""
     if fn is None:
@@ -383,6 +469,9 @@ class WorkerBase:
         show_actual_if_clipped=False,
         input_encoding=None,
         output_encoding=None,
+        use_native=None,
+        use_pool=None,
+        use_cache=None,
     ):
         """Call xicclu, feed input floats into stdin, return output floats.
 
@@ -391,26 +480,118 @@ class WorkerBase:
         output data will be returned in same format, or as list of strings
         if 'raw' is true.
 
+        If use_native is true (defaults to the 'xicclu.native' setting),
+        forward relative and absolute colorimetric lookups are evaluated
+        in-process by ICCProfile.lookup instead of spawning xicclu.
+
+        If use_pool is true (defaults to the 'xicclu.pool' setting), ICC
+        profile lookups are sent to a warm xicclu process from the shared
+        XiccluPool instead of spawning a new one.
+
+        If use_cache is true (defaults to the 'xicclu.cache' setting), results
+        of ICC profile lookups are cached by profile file (or contents),
+        lookup parameters and input values (see XiccluCache).
+
         """
-        with Xicclu(
-            profile,
-            intent,
-            direction,
-            order,
-            pcs,
-            scale,
-            cwd,
-            startupinfo,
-            use_icclu,
-            use_cam_clipping,
-            logfile,
-            self,
-            show_actual_if_clipped,
-            input_encoding,
-            output_encoding,
-        ) as xicclu:
-            xicclu(idata)
-        return xicclu.get(raw, get_clip)
+        is_cal = isinstance(profile, CGATS) or (
+            not isinstance(profile, ICCProfile)
+            and str(profile).lower().endswith(".cal")
+        )
+        if use_native is None:
+            use_native = config.getcfg("xicclu.native")
+        if use_pool is None:
+            use_pool = config.getcfg("xicclu.pool")
+        if use_cache is None:
+            use_cache = config.getcfg("xicclu.cache")
+        cache_key = None
+        if use_cache and not raw and not is_cal:
+            cache_key = XiccluCache.get_key(
+                XiccluCache.get_profile_key(profile, use_native),
+                idata,
+                intent,
+                direction,
+                order,
+                pcs,
+                scale,
+                use_icclu,
+                use_cam_clipping,
+                get_clip,
+                show_actual_if_clipped,
+                input_encoding,
+                output_encoding,
+                bool(use_native),
+                config.getcfg("argyll.version"),
+            )
+            odata = get_xicclu_cache().get(cache_key)
+            if odata is not None:
+                return odata
+        odata = None
+        if (
+            use_native
+            and not raw
+            and direction == "f"
+            and intent in ("r", "a")
+            and order == "n"
+            and input_encoding in (None, "n")
+            and output_encoding in (None, "n")
+        ):
+            try:
+                odata = xicclu_native(
+                    profile,
+                    idata,
+                    intent,
+                    pcs,
+                    scale,
+                    get_clip,
+                    show_actual_if_clipped and not use_icclu,
+                )
+            except NotImplementedError as exception:
+                if debug or verbose > 1:
+                    self.log(exception)
+        if odata is None and use_pool and not (debug or verbose > 1) and not is_cal:
+            odata = get_xicclu_pool().lookup(
+                profile,
+                idata,
+                intent,
+                direction,
+                order,
+                pcs,
+                scale,
+                cwd,
+                startupinfo,
+                raw,
+                logfile,
+                use_icclu,
+                use_cam_clipping,
+                get_clip,
+                show_actual_if_clipped,
+                input_encoding,
+                output_encoding,
+                self,
+            )
+        if odata is None:
+            with Xicclu(
+                profile,
+                intent,
+                direction,
+                order,
+                pcs,
+                scale,
+                cwd,
+                startupinfo,
+                use_icclu,
+                use_cam_clipping,
+                logfile,
+                self,
+                show_actual_if_clipped,
+                input_encoding,
+                output_encoding,
+            ) as xicclu:
+                xicclu(idata)
+            odata = xicclu.get(raw, get_clip)
+        if cache_key:
+            get_xicclu_cache().set(cache_key, odata)
+        return odata
 
 
 class Xicclu(WorkerBase):
@@ -433,11 +614,13 @@ class Xicclu(WorkerBase):
         output_encoding=None,
         convert_video_rgb_to_clut65=False,
         verbose=1,
+        streaming=False,
     ):
         if not profile:
             raise Error("Xicclu: Profile is %r" % profile)
         WorkerBase.__init__(self)
         self.scale = scale
+        self.streaming = streaming
         self.convert_video_rgb_to_clut65 = convert_video_rgb_to_clut65
         self.logfile = logfile
         self.worker = worker
@@ -579,7 +762,11 @@ class Xicclu(WorkerBase):
         self.closed = False
         self.output = []
         self.errors = []
-        self.stdout = tempfile.SpooledTemporaryFile()
+        if self.streaming:
+            # Output is read from the pipe as it arrives (see lookup_iter)
+            self.stdout = sp.PIPE
+        else:
+            self.stdout = tempfile.SpooledTemporaryFile()
         self.stderr = tempfile.SpooledTemporaryFile()
         self.subprocess = sp.Popen(
             self.args,
@@ -669,13 +856,17 @@ class Xicclu(WorkerBase):
         if p.poll() is None:
             try:
                 p.stdin.write(b"\n")
-            except IOError:
+            except (IOError, ValueError):
                 pass
             p.stdin.close()
+        if self.streaming:
+            self.output = p.stdout.readlines()
+            p.stdout.close()
         p.wait()
-        self.stdout.seek(0)
-        self.output = self.stdout.readlines()
-        self.stdout.close()
+        if not self.streaming:
+            self.stdout.seek(0)
+            self.output = self.stdout.readlines()
+            self.stdout.close()
         self.stderr.seek(0)
         self.errors = self.stderr.readlines()
         self.stderr.close()
@@ -707,7 +898,65 @@ class Xicclu(WorkerBase):
                 self.sessionlogfile.write("\n".join(self.output))
                 self.sessionlogfile.close()
             return self.output
-        parsed = []
+        parsed = list(self._parse(self.output, get_clip, output_format, reverse))
+        if self.sessionlogfile:
+            self.sessionlogfile.close()
+        return parsed
+
+    def lookup_iter(
+        self, idata, get_clip=False, output_format=None, reverse=False, raw=False
+    ):
+        """Feed input data to xicclu and yield parsed rows as they arrive.
+
+        Requires streaming mode. Input is written by a background thread, so
+        output can be consumed while xicclu is still busy, and nothing is
+        buffered to a temporary file. The process has ended when the generator
+        is exhausted.
+
+        If raw is true, yield unparsed output lines.
+
+        """
+        if not self.streaming:
+            raise ValueError("Xicclu.lookup_iter requires streaming mode")
+        p = self.subprocess
+        exceptions = []
+
+        def writer():
+            try:
+                self(idata)
+            except Exception as exception:
+                exceptions.append(exception)
+            finally:
+                if p.poll() is None:
+                    try:
+                        p.stdin.write(b"\n")
+                        p.stdin.close()
+                    except (IOError, ValueError):
+                        pass
+
+        thread = threading.Thread(target=writer, name="XiccluWriter")
+        thread.start()
+        lines = iter(p.stdout.readline, b"")
+        done = False
+        try:
+            if raw:
+                yield from lines
+            else:
+                yield from self._parse(lines, get_clip, output_format, reverse)
+            done = True
+        finally:
+            if not done and p.poll() is None:
+                # Consumer went away early
+                p.kill()
+            thread.join()
+            self.close(raise_exception=done and not exceptions)
+            if self.sessionlogfile:
+                self.sessionlogfile.close()
+        if exceptions:
+            raise exceptions[0]
+
+    def _parse(self, lines, get_clip=False, output_format=None, reverse=False):
+        """Parse xicclu output lines, yielding one row per input row."""
         j = 0
         verbose = self.verbose
         scale = float(self.scale)
@@ -726,15 +975,18 @@ class Xicclu(WorkerBase):
         # than testing for 'if x'. (EOY: Yeah I measured it is ~3% faster)
         # Also, struct.pack is faster if the second argument is passed as an integer.
         clip = None
-        for i, line in enumerate(self.output):
+        # A row is only complete once the next row arrives, because it may be
+        # followed by a line with the actual CIE values if it was clipped
+        row = None
+        for line in lines:
             if verbose:
                 line = line.strip()
                 if line.startswith(b"["):
-                    if parsed and get_clip and self.show_actual_if_clipped:
+                    if row is not None and get_clip and self.show_actual_if_clipped:
                         parts = line.strip(b"[]").split(b",")
                         actual = [float(v) for v in parts[0].split()[1:4]]  # Actual CIE
                         actual.append(float(parts[1].split()[-1]))  # deltaE
-                        parsed[-1].append(actual)
+                        row.append(actual)
                     elif self.sessionlogfile:
                         self.sessionlogfile.write(line)
                     continue
@@ -762,10 +1014,135 @@ class Xicclu(WorkerBase):
                     struct.pack(fmt, int(round(devop_devo(float(v) / scale) * maxv)))
                     for v in parts
                 )
-            parsed.append(out)
-        if self.sessionlogfile:
-            self.sessionlogfile.close()
-        return parsed
+            if row is not None:
+                yield row
+            row = out
+        if row is not None:
+            yield row
+
+    def get_array(self, get_clip=False, reverse=False):
+        """Parse the output in one pass and return it as NumPy array.
+
+        Returns a (N, channels) array with the same values get() returns.
+        If get_clip is true, returns a tuple of the values, a (N, ) boolean
+        array that is true for clipped values, and (if actual CIE values are
+        shown for clipped values) a (N, 4) array with the actual CIE values
+        and delta E of clipped values (NaN if not clipped), otherwise None.
+
+        """
+        values, clip, actual = self._parse_array(self.output)
+        values = values / float(self.output_scale)
+        if self.convert_video_rgb_to_clut65:
+            values = VidRGB_to_eeColor(values)
+        if reverse:
+            values = values[:, ::-1]
+        if get_clip:
+            return values, clip, actual
+        return values
+
+    def get_packed(self, output_format, reverse=False):
+        """Parse the output in one pass and return it packed as bytes.
+
+        output_format   Tuple of struct format and maximum value, e.g.
+                        ("<H", 65535)
+
+        Returns the same as b"".join(self.get(output_format=output_format)).
+
+        """
+        import numpy
+
+        fmt, maxv = output_format
+        values = self._parse_array(self.output)[0] / float(self.scale)
+        if self.convert_video_rgb_to_clut65:
+            values = VidRGB_to_eeColor(values)
+        if reverse:
+            values = values[:, ::-1]
+        values = numpy.clip(numpy.rint(values * maxv), 0, maxv)
+        return values.astype(numpy.dtype(fmt)).tobytes()
+
+    def _parse_array(self, lines):
+        """Parse xicclu output lines into NumPy arrays.
+
+        Instead of parsing line by line, the color space markers and clip
+        flags of the joined output values are replaced with numbers, so that
+        everything can be converted in one go.
+
+        Returns a tuple of the (N, channels) array of unscaled output values,
+        a (N, ) boolean clip mask and the (N, 4) array of actual CIE values and
+        delta E of clipped values (None unless actual values are shown).
+
+        """
+        import numpy
+
+        if not self.verbose:
+            rows = [line for line in lines if line.strip()]
+            if not rows:
+                return numpy.empty((0, 0)), numpy.zeros(0, dtype=bool), None
+            channels = len(rows[0].split())
+            try:
+                values = self._parse_values(rows, channels)
+            except ValueError:
+                # Unexpected formatting, fall back to parsing line by line
+                values = numpy.array([[float(v) for v in row.split()] for row in rows])
+            return values, numpy.zeros(len(rows), dtype=bool), None
+        # Output part of each line ("<input> [<space>] -> <output> [<space>]")
+        outs = [line.partition(b"->")[2] for line in lines]
+        tokens = next((out.split() for out in outs if out), None)
+        if not tokens:
+            return numpy.empty((0, 0)), numpy.zeros(0, dtype=bool), None
+        if tokens[-1] == b"(clip)":
+            tokens.pop()
+        marker = tokens.pop()
+        channels = len(tokens)
+        rows = [
+            out.replace(marker + b" (clip)", b" 1 ").replace(marker, b" 0 ")
+            for out in outs
+            if out
+        ]
+        try:
+            values = self._parse_values(rows, channels + 1)
+        except ValueError:
+            # Unexpected formatting, fall back to parsing line by line
+            values = numpy.array(
+                [
+                    [float(v) for v in out.split()[:channels]] + [b"(clip)" in out]
+                    for out in outs
+                    if out
+                ]
+            )
+        clip = values[:, -1] > 0
+        values = values[:, :-1]
+        actual = None
+        if self.show_actual_if_clipped:
+            actual = numpy.full((len(values), 4), numpy.nan)
+            i = -1
+            for line in lines:
+                line = line.strip()
+                if b"->" in line:
+                    i += 1
+                elif i > -1 and line.startswith(b"["):
+                    parts = line.strip(b"[]").split(b",")
+                    actual[i, :3] = [float(v) for v in parts[0].split()[1:4]]
+                    actual[i, 3] = float(parts[1].split()[-1])
+        return values, clip, actual
+
+    @staticmethod
+    def _parse_values(rows, channels):
+        """Convert rows of whitespace separated numbers to a (N, channels) array.
+
+        Raises ValueError if a token is not a number or if the number of
+        values does not match the number of rows, so that rows can never be
+        silently dropped.
+
+        """
+        import numpy
+
+        values = numpy.array(b" ".join(rows).split(), dtype=numpy.float64)
+        if len(values) != len(rows) * channels:
+            raise ValueError(
+                "Expected %i values, got %i" % (len(rows) * channels, len(values))
+            )
+        return values.reshape(len(rows), channels)
 
     @property
     def subprocess_abort(self):
@@ -816,6 +1193,8 @@ class MP_Xicclu(Xicclu):
         self.logfile = logfile
         self.worker = worker
         self.output_stream = output_stream
+        # Rows written to a stream can be packed in bulk
+        self.packed = bool(output_format and output_stream)
         self._in = []
         self._args = (
             profile.fileName,
@@ -843,9 +1222,9 @@ class MP_Xicclu(Xicclu):
         if isinstance(profile.tags.get("A2B0"), LUT16Type):
             size = profile.tags.A2B0.clut_grid_steps
             self.num_workers = min(max(num_cpus, 1), size)
-            if num_cpus > 2:
-                self.num_workers = int(self.num_workers * 0.75)
-            self.num_batches = size // 9
+            # Hand out work on demand, CAM clipping of out of gamut colors
+            # makes the lookup cost uneven across the input
+            self.num_batches = "auto"
         else:
             if num_cpus > 2:
                 self.num_workers = 2
@@ -866,19 +1245,536 @@ class MP_Xicclu(Xicclu):
         pass
 
     def get(self, raw=False, get_clip=False, output_format=None, reverse=False):
-        for slices in pool_slice(
-            _mp_xicclu,
-            self._in,
-            self._args,
-            {},
-            self.num_workers,
-            self.thread_abort,
-            self.logfile,
-            num_batches=self.num_batches,
-        ):
-            if self.output_stream:
-                for row in slices:
-                    self.output_stream.write(row)
-            else:
-                self._out.extend(slices)
+        data_in = self._in
+        shared = None
+        if isinstance(data_in, list) and not self.packed:
+            # Pass input rows to the workers in shared memory. Output rows
+            # matching the input shape are written back in-place.
+            try:
+                shared = data_in = SharedArray(data_in)
+            except (TypeError, ValueError):
+                # Not uniform numeric rows
+                pass
+        try:
+            for slices in pool_slice(
+                _mp_xicclu,
+                data_in,
+                self._args,
+                {"packed": self.packed},
+                self.num_workers,
+                self.thread_abort,
+                self.logfile,
+                num_batches=self.num_batches,
+            ):
+                if self.output_stream:
+                    for row in slices:
+                        self.output_stream.write(row)
+                else:
+                    if not isinstance(slices, list):
+                        slices = slices.tolist()
+                    self._out.extend(slices)
+        finally:
+            if shared is not None:
+                shared.close()
+                shared.unlink()
         return self._out
+
+
+class XiccluProcess(Xicclu):
+    """Long-lived xicclu process answering framed lookup requests.
+
+    Unlike Xicclu, stdout is a pipe that is read back after each request, so
+    the same process can serve any number of lookups.
+
+    If the process does not produce output for timeout seconds during a
+    lookup, it is considered stuck and killed.
+
+    """
+
+    timeout = 60
+    # Seconds without output after which padding rows are written, and their
+    # number. Padding makes xicclu flush results held back in its stdout
+    # buffer if stdout is block buffered (as it may be when it is a pipe)
+    pad_delay = 0.1
+    pad_rows = 256
+
+    def spawn(self):
+        self.closed = False
+        self.output = []
+        self.errors = []
+        self.stdout = None
+        self.stderr = tempfile.SpooledTemporaryFile()
+        self.subprocess = sp.Popen(
+            self.args,
+            stdin=sp.PIPE,
+            stdout=sp.PIPE,
+            stderr=self.stderr,
+            cwd=self.cwd,
+            startupinfo=self.startupinfo,
+        )
+        self.last_used = time.monotonic()
+        # Number of padding rows written whose output has not been read yet
+        self._pending = 0
+
+    def lookup(self, idata):
+        """Look up input rows and store the raw output lines in self.output.
+
+        The request is terminated by repeating its first row. Results are
+        complete once the output line for that extra row has been read. If no
+        output arrives for pad_delay seconds, padding rows (also repeating the
+        first row) are written until it does. Their output is skipped at the
+        start of the next request.
+
+        """
+        if isinstance(idata, str):
+            rows = idata.splitlines()
+        elif idata and isinstance(idata[0], (float, int)):
+            rows = [idata]
+        else:
+            rows = list(idata)
+        self.output = []
+        if not rows:
+            return
+        exceptions = []
+        done = threading.Event()
+        progress = [0]
+        timed_out = []
+        written = [len(rows) + 1]
+
+        def writer():
+            try:
+                Xicclu.__call__(self, rows + rows[:1])
+                seen = 0
+                while not done.wait(self.pad_delay):
+                    if progress[0] == seen:
+                        Xicclu.__call__(self, rows[:1] * self.pad_rows)
+                        written[0] += self.pad_rows
+                    seen = progress[0]
+            except Exception as exception:
+                if not done.is_set():
+                    exceptions.append(exception)
+
+        def watchdog():
+            seen = 0
+            while not done.wait(self.timeout):
+                if progress[0] == seen:
+                    # No output for timeout seconds. Kill the process, which
+                    # ends the blocking readline() below
+                    timed_out.append(True)
+                    self.subprocess.kill()
+                    return
+                seen = progress[0]
+
+        thread = threading.Thread(target=writer, name="XiccluWriter")
+        thread.start()
+        watchdog_thread = threading.Thread(target=watchdog, name="XiccluWatchdog")
+        watchdog_thread.daemon = True
+        watchdog_thread.start()
+        remaining = len(rows) + 1
+        skip = self._pending
+        stdout = self.subprocess.stdout
+        try:
+            while remaining:
+                line = stdout.readline()
+                if not line:
+                    break
+                progress[0] += 1
+                if not self.output and line.startswith(b"["):
+                    # Belongs to the terminating row of the previous request
+                    continue
+                is_result = b"->" in line or (not self.verbose and line.strip())
+                if skip:
+                    # Output of padding rows of the previous request
+                    if is_result:
+                        skip -= 1
+                    continue
+                if is_result:
+                    remaining -= 1
+                if remaining:
+                    self.output.append(line)
+        finally:
+            done.set()
+        thread.join()
+        watchdog_thread.join()
+        self._pending = written[0] - (len(rows) + 1)
+        self.last_used = time.monotonic()
+        if timed_out:
+            self.close(False)
+            raise IOError(
+                "xicclu did not respond within %s seconds: %s"
+                % (self.timeout, " ".join(self.args))
+            )
+        if exceptions:
+            raise exceptions[0]
+        if remaining:
+            self.close(False)
+            raise IOError(b"\n".join(self.errors))
+
+    def close(self, raise_exception=True):
+        if self.closed:
+            return
+        p = self.subprocess
+        if p.poll() is None:
+            try:
+                p.stdin.write(b"\n")
+                p.stdin.close()
+            except (IOError, ValueError):
+                pass
+        # Discard unread output (e.g. of padding rows), so the process does
+        # not block on a full pipe while exiting
+        p.stdout.read()
+        p.wait()
+        p.stdout.close()
+        self.stderr.seek(0)
+        self.errors = self.stderr.readlines()
+        self.stderr.close()
+        self.closed = True
+        if p.returncode and raise_exception:
+            raise IOError(b"\n".join(self.errors))
+
+
+class XiccluPool:
+    """Pool of warm xicclu processes.
+
+    Idle processes are kept around keyed by profile file (see
+    XiccluCache.get_profile_key) and lookup parameters, so that repeated lookups through the same profile
+    do not pay process startup cost. Processes idle for longer than
+    idle_timeout seconds are ended, and at most max_idle idle processes are
+    kept (least recently used ones are ended first). A process that does not
+    respond within timeout seconds during a lookup is killed.
+
+    """
+
+    def __init__(self, max_idle=8, idle_timeout=60, timeout=60):
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self._idle = []  # (key, XiccluProcess) in least recently used order
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def __len__(self):
+        return len(self._idle)
+
+    def lookup(
+        self,
+        profile,
+        idata,
+        intent="r",
+        direction="f",
+        order="n",
+        pcs=None,
+        scale=1,
+        cwd=None,
+        startupinfo=None,
+        raw=False,
+        logfile=None,
+        use_icclu=False,
+        use_cam_clipping=False,
+        get_clip=False,
+        show_actual_if_clipped=False,
+        input_encoding=None,
+        output_encoding=None,
+        worker=None,
+    ):
+        """Look up input data through a warm xicclu process.
+
+        Takes the same arguments as WorkerBase.xicclu and returns the same
+        output.
+
+        """
+        if not isinstance(profile, ICCProfile):
+            profile = str(profile)
+        # A warm process keeps reading the file it was started with, so key
+        # on the file (path, modification time and size) like the lookup
+        # cache does. Only profiles without a file are keyed on their contents
+        key = (
+            XiccluCache.get_profile_key(profile),
+            intent,
+            direction,
+            order,
+            pcs,
+            use_cam_clipping,
+            scale,
+            use_icclu,
+            show_actual_if_clipped,
+            input_encoding,
+            output_encoding,
+        )
+        xicclu = self._acquire(key)
+        if xicclu is None:
+            xicclu = XiccluProcess(
+                profile,
+                intent,
+                direction,
+                order,
+                pcs,
+                scale,
+                cwd,
+                startupinfo,
+                use_icclu,
+                use_cam_clipping,
+                None,
+                None,
+                show_actual_if_clipped,
+                input_encoding,
+                output_encoding,
+            )
+        xicclu.logfile = logfile
+        xicclu.worker = worker
+        xicclu.timeout = self.timeout
+        try:
+            xicclu.lookup(idata)
+            odata = xicclu.get(raw, get_clip)
+        except BaseException:
+            xicclu.exit(False)
+            raise
+        xicclu.logfile = None
+        xicclu.worker = None
+        self._release(key, xicclu)
+        return odata
+
+    def _acquire(self, key):
+        with self._lock:
+            for i in range(len(self._idle) - 1, -1, -1):
+                if self._idle[i][0] == key:
+                    xicclu = self._idle.pop(i)[1]
+                    if xicclu.isalive():
+                        return xicclu
+                    xicclu.exit(False)
+
+    def _release(self, key, xicclu):
+        with self._lock:
+            self._idle.append((key, xicclu))
+            while len(self._idle) > self.max_idle:
+                self._idle.pop(0)[1].exit(False)
+            if not self._timer:
+                self._timer = threading.Timer(self.idle_timeout, self.expire)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def expire(self):
+        """End processes that have been idle for longer than the timeout."""
+        with self._lock:
+            self._timer = None
+            now = time.monotonic()
+            expired = [
+                item
+                for item in self._idle
+                if now - item[1].last_used >= self.idle_timeout
+            ]
+            for item in expired:
+                self._idle.remove(item)
+                item[1].exit(False)
+            if self._idle:
+                self._timer = threading.Timer(self.idle_timeout, self.expire)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def shutdown(self):
+        """End all idle processes."""
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+            while self._idle:
+                self._idle.pop()[1].exit(False)
+
+
+_xicclu_pool = None
+
+
+def get_xicclu_pool():
+    """Return the shared XiccluPool instance, creating it on first use."""
+    global _xicclu_pool
+    if _xicclu_pool is None:
+        _xicclu_pool = XiccluPool(
+            config.getcfg("xicclu.pool.max_processes"),
+            config.getcfg("xicclu.pool.idle_timeout"),
+            config.getcfg("xicclu.pool.timeout"),
+        )
+        atexit.register(_xicclu_pool.shutdown)
+    return _xicclu_pool
+
+
+class XiccluCache:
+    """Cache for lookup results.
+
+    Results are addressed by profile (see get_profile_key), lookup parameters
+    and a hash of the input values. They are kept as JSON in a size-limited
+    in-memory LRU and, if a cache directory is given, also as files in that
+    directory so they survive restarts.
+
+    """
+
+    def __init__(self, max_bytes=64 * 1024**2, cachedir=None):
+        self.max_bytes = max_bytes
+        self.cachedir = cachedir
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def get_profile_key(profile, in_memory=False):
+        """Return bytes identifying a profile as it is used for lookups.
+
+        xicclu reads the profile file, so profiles with a file are identified
+        by path, modification time and size. Profiles without a file are
+        written to a temporary file first, and are identified by their
+        contents. If in_memory is true (in-process lookups), the contents are
+        always included.
+
+        """
+        if isinstance(profile, ICCProfile):
+            file_name = profile.fileName
+        else:
+            file_name = profile
+        key = []
+        if file_name and os.path.isfile(file_name):
+            stat = os.stat(file_name)
+            key.append(
+                repr(
+                    (os.path.realpath(file_name), stat.st_mtime_ns, stat.st_size)
+                ).encode()
+            )
+        else:
+            in_memory = True
+        if in_memory:
+            if not isinstance(profile, ICCProfile):
+                profile = ICCProfile(profile)
+            key.append(profile.calculateID(False))
+        return b"".join(key)
+
+    @staticmethod
+    def get_key(profile_id, idata, *params):
+        """Return the cache key for a lookup."""
+        key = sha256(profile_id)
+        key.update(repr(params).encode())
+        if hasattr(idata, "tobytes"):
+            # NumPy array
+            key.update(repr((idata.dtype.str, idata.shape)).encode())
+            key.update(idata.tobytes())
+        else:
+            key.update(repr(idata).encode())
+        return key.hexdigest()
+
+    def get(self, key):
+        """Return a copy of the cached result for key, or None."""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if data is None and self.cachedir:
+            try:
+                with open(os.path.join(self.cachedir, key + ".json"), "rb") as f:
+                    data = f.read()
+            except EnvironmentError:
+                pass
+            else:
+                with self._lock:
+                    self.disk_hits += 1
+                self._store(key, data)
+        if data is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        return json.loads(data)
+
+    def set(self, key, odata):
+        """Cache a lookup result."""
+        data = json.dumps(odata).encode()
+        self._store(key, data)
+        if self.cachedir:
+            try:
+                if not os.path.isdir(self.cachedir):
+                    os.makedirs(self.cachedir)
+                with open(os.path.join(self.cachedir, key + ".json"), "wb") as f:
+                    f.write(data)
+            except EnvironmentError as exception:
+                print(f"Warning - could not write lookup cache: {exception}")
+
+    def _store(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._size -= len(self._entries.pop(key))
+            self._entries[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                self._size -= len(self._entries.popitem(last=False)[1])
+
+    def clear(self):
+        """Clear the in-memory cache and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self.hits = self.disk_hits = self.misses = 0
+
+    def stats(self):
+        """Return a dict with cache statistics for diagnostics."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+            }
+
+
+_xicclu_cache = None
+
+
+def get_xicclu_cache():
+    """Return the shared XiccluCache instance, creating it on first use."""
+    global _xicclu_cache
+    if _xicclu_cache is None:
+        cachedir = None
+        if config.getcfg("xicclu.cache.disk"):
+            cachedir = os.path.join(config.confighome, "cache", "xicclu")
+        _xicclu_cache = XiccluCache(cachedir=cachedir)
+    return _xicclu_cache
+
+
+class NativeInverseXicclu:
+    """Inverse forward ('if') lookup through A2BInverseLookup with the
+    same calling convention as Xicclu.
+
+    Input values are collected and looked up in one vectorized batch when
+    calling get().
+
+    """
+
+    def __init__(self, inverse, pcs="x", scale=1, use_cam_clipping=False):
+        self.inverse = inverse
+        self.pcs = pcs
+        self.scale = scale
+        self.use_cam_clipping = use_cam_clipping
+        self._in = []
+
+    def __call__(self, idata):
+        if isinstance(idata[0], (list, tuple)):
+            self._in.extend(idata)
+        else:
+            self._in.append(idata)
+
+    def exit(self, raise_exception=True):
+        pass
+
+    def get(self, get_clip=False):
+        if not self._in:
+            return []
+        device, clipped = self.inverse.lookup(self._in, self.pcs, self.use_cam_clipping)
+        odata = (device * self.scale).tolist()
+        if get_clip:
+            for values, is_clipped in zip(odata, clipped):
+                values.append(bool(is_clipped))
+        return odata
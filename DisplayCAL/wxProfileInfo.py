@@ -453,7 +453,7 @@ class GamutCanvas(LUTCanvas):
             if (
                 check
                 and check.fileName == profile.fileName
-                and check.ID == profile.calculateID(False)
+                and check.isSame(profile, force_calculation=True)
                 and intent == self.intent
                 and direction == self.direction
                 and order == self.order
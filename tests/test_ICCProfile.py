@@ -2,12 +2,18 @@
 """Tests for the DisplayCAL.icc_profile module."""
 import binascii
 import datetime
+from io import BytesIO
 import sys
 from time import strftime
 
+import pytest
+
 from DisplayCAL import colormath
 from DisplayCAL.icc_profile import (
+    A2BInverseLookup,
+    chromaticAdaptionTag,
     CMMS,
+    CurveType,
     dateTimeNumber,
     DictType,
     GAMUT_VOLUME_SRGB,
@@ -15,13 +21,21 @@ from DisplayCAL.icc_profile import (
     GAMUT_VOLUME_SMPTE431_P3,
     hexrepr,
     ICCProfile,
+    ICCProfileCache,
+    ICCProfileInvalidError,
     ICCProfileTag,
+    issame_stats,
     MultiLocalizedUnicodeType,
+    ProfileScanner,
     s15Fixed16Number_tohex,
     Text,
     uInt8Number_tohex,
     uInt16Number_tohex,
     uInt32Number_tohex,
+    VideoCardGammaTableType,
+    _apply_black_array,
+    _mp_apply_black,
+    _mp_hdr_tonemap,
 )
 from DisplayCAL.util_os import which
 
@@ -866,3 +880,469 @@ def test_issue_185_parsing_of_ref_srgb_profile_from_argyllcms(setup_argyll):
     icc_profile = ICCProfile(srgb_profile_path)
     # the following should not raise an error
     _ = icc_profile.get_info()
+
+
+def test_lut16type_clut_array_is_zero_copy_view(data_files):
+    """Test LUT16Type.clut_array is a read-only view of the raw tag data."""
+    icc_profile_path = data_files[
+        "UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"
+    ]
+    iccp = ICCProfile(icc_profile_path)
+    a2b0 = iccp.tags.A2B0
+    tag_data = a2b0.tagData
+    clut_array = a2b0.clut_array
+    assert clut_array.shape == (33, 33, 33, 3)
+    assert not clut_array.flags.writeable
+    assert clut_array.base is not None
+    # the list API is kept as compatibility adapter
+    assert a2b0.clut[33 * 2 + 5][7] == clut_array[2, 5, 7].tolist()
+    assert a2b0.tagData == tag_data
+
+
+def test_lut16type_clut_array_roundtrip(data_files):
+    """Test editing LUT16Type.clut_array is reflected in the tag data."""
+    icc_profile_path = data_files[
+        "UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"
+    ]
+    iccp = ICCProfile(icc_profile_path)
+    a2b0 = iccp.tags.A2B0
+    tag_data = a2b0.tagData
+    clut_array = a2b0.clut_array.copy()
+    clut_array[0, 0, 0] = (1, 2, 3)
+    a2b0.clut_array = clut_array
+    assert a2b0.clut_grid_steps == 33
+    assert a2b0.tagData != tag_data
+    assert a2b0.clut[0][0] == [1, 2, 3]
+    a2b0.clut[0][0] = [0, 0, 0]
+    assert a2b0.clut_array[0, 0, 0].tolist() == [0, 0, 0]
+
+
+def test_iccprofile_lookup_matrix_trc():
+    """Test ICCProfile.lookup() for matrix/TRC profiles."""
+    srgb = ICCProfile.from_rgb_space(list(colormath.get_rgb_space("sRGB")), b"sRGB")
+    XYZ = srgb.lookup([[1, 1, 1], [1, 0, 0], [0, 0, 0]])
+    assert XYZ.shape == (3, 3)
+    assert XYZ[0].tolist() == pytest.approx(list(srgb.illuminant.values()), abs=1e-4)
+    assert XYZ[1].tolist() == pytest.approx(list(srgb.tags.rXYZ.values()), abs=1e-4)
+    assert XYZ[2].tolist() == pytest.approx([0, 0, 0], abs=1e-6)
+    RGB = srgb.lookup(srgb.lookup([[0.2, 0.4, 0.6]]), direction="b")
+    assert RGB[0].tolist() == pytest.approx([0.2, 0.4, 0.6], abs=1e-3)
+
+
+def test_iccprofile_lookup_lut16type(data_files):
+    """Test ICCProfile.lookup() for LUT16Type based profiles."""
+    icc_profile_path = data_files[
+        "UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"
+    ]
+    iccp = ICCProfile(icc_profile_path)
+    XYZ = iccp.lookup([[1, 1, 1], [0.25, 0.5, 0.75]])
+    assert XYZ[0].tolist() == pytest.approx([0.9642, 1.0, 0.8249], abs=1e-4)
+    for interpolation in ("tetrahedral", "trilinear"):
+        result = iccp.lookup([[0.25, 0.5, 0.75]], interpolation=interpolation)
+        assert result[0].tolist() == pytest.approx(XYZ[1].tolist(), abs=1e-3)
+    # absolute colorimetric white is the illuminant-relative media white
+    XYZ_abs = iccp.lookup([[1, 1, 1]], "a")
+    assert XYZ_abs[0].tolist() == pytest.approx(
+        list(iccp.tags.wtpt.ir.values()), abs=1e-4
+    )
+    Lab = iccp.lookup([[1, 1, 1]], pcs="l")
+    assert Lab[0].tolist() == pytest.approx([100, 0, 0], abs=1e-2)
+    RGB = iccp.lookup(XYZ[1:], direction="b")
+    assert RGB[0].tolist() == pytest.approx([0.25, 0.5, 0.75], abs=0.01)
+
+
+def test_iccprofile_lookup_absolute_with_chad():
+    """Test absolute colorimetric ICCProfile.lookup() with a 'chad' tag.
+
+    'chad' maps the PCS white to the media white, except for Apple profiles,
+    which contain a 'chad' tag but do not store the media white under PCS
+    illuminant.
+    """
+    D50 = colormath.get_whitepoint("D50")
+    D65 = colormath.get_whitepoint("D65")
+    iccp = ICCProfile.from_rgb_space(list(colormath.get_rgb_space("sRGB")), b"sRGB")
+    iccp.tags.chad = chromaticAdaptionTag()
+    iccp.tags.chad.update(colormath.wp_adaption_matrix(D65, D50))
+    iccp.tags.wtpt.X, iccp.tags.wtpt.Y, iccp.tags.wtpt.Z = D50
+    XYZ = iccp.lookup([[1, 1, 1]], "a")
+    assert XYZ[0].tolist() == pytest.approx(list(D65), abs=1e-4)
+    # Apple: 'chad' adapts from D65, but the media white is stored as is
+    iccp.creator = b"appl"
+    D60 = colormath.CIEDCCT2XYZ(6000)
+    iccp.tags.wtpt.X, iccp.tags.wtpt.Y, iccp.tags.wtpt.Z = D60
+    XYZ = iccp.lookup([[1, 1, 1]], "a")
+    assert XYZ[0].tolist() == pytest.approx(list(D60), abs=1e-4)
+    assert XYZ[0].tolist() == pytest.approx(list(iccp.tags.wtpt.ir.values()), abs=1e-4)
+
+
+def test_iccprofile_lookup_matches_xicclu(data_files, setup_argyll):
+    """Test ICCProfile.lookup() against ArgyllCMS xicclu."""
+    from DisplayCAL.argyll import get_argyll_util
+    from DisplayCAL.worker_base import WorkerBase
+
+    if not get_argyll_util("xicclu"):
+        pytest.skip("ArgyllCMS xicclu not available")
+    icc_profile_path = data_files[
+        "UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"
+    ]
+    iccp = ICCProfile(icc_profile_path)
+    RGB = [
+        [0, 0, 0],
+        [1, 1, 1],
+        [0.25, 0.5, 0.75],
+        [0.9, 0.1, 0.3],
+        [0.05, 0.02, 0.01],
+        [0.5, 0.5, 0.5],
+    ]
+    worker = WorkerBase()
+    for intent in ("r", "a"):
+        for pcs, tolerance in (("x", 1e-3), ("l", 0.05)):
+            expected = worker.xicclu(
+                iccp,
+                RGB,
+                intent,
+                pcs=pcs,
+                use_native=False,
+                use_pool=False,
+                use_cache=False,
+            )
+            result = iccp.lookup(RGB, intent, pcs=pcs)
+            for values, expected_values in zip(result.tolist(), expected):
+                assert values == pytest.approx(expected_values, abs=tolerance)
+    XYZ = iccp.lookup(RGB).tolist()
+    expected = worker.xicclu(
+        iccp, XYZ, "r", "b", pcs="x", use_native=False, use_pool=False, use_cache=False
+    )
+    result = iccp.lookup(XYZ, "r", "b", pcs="x")
+    for values, expected_values in zip(result.tolist(), expected):
+        assert values == pytest.approx(expected_values, abs=1e-3)
+
+
+def test_a2binverselookup(data_files):
+    """Test A2BInverseLookup inverts the forward lookup."""
+    icc_profile_path = data_files[
+        "UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"
+    ]
+    iccp = ICCProfile(icc_profile_path)
+    RGB = [[0.25, 0.5, 0.75], [1, 1, 1], [0.9, 0.1, 0.3], [0.05, 0.05, 0.05]]
+    XYZ = iccp.lookup(RGB)
+    inverse = A2BInverseLookup(iccp, "r", grid_steps=9)
+    result, clipped = inverse.lookup(XYZ)
+    assert not clipped.any()
+    assert iccp.lookup(result) == pytest.approx(XYZ, abs=1e-4)
+    # out of gamut values are clipped
+    for use_cam_clipping in (False, True):
+        result, clipped = inverse.lookup([[50, 120, 0]], "l", use_cam_clipping)
+        assert clipped.tolist() == [True]
+        assert 0 <= result.min() and result.max() <= 1
+
+
+def test_a2binverselookup_nearest():
+    """Test A2BInverseLookup._nearest() finds the nearest grid points."""
+    numpy = pytest.importorskip("numpy")
+    srgb = ICCProfile.from_rgb_space(list(colormath.get_rgb_space("sRGB")), b"sRGB")
+    inverse = A2BInverseLookup(srgb, "r", grid_steps=9)
+    Lab = numpy.random.default_rng(0).uniform(
+        (0, -100, -100), (100, 100, 100), (500, 3)
+    )
+    dist = ((Lab[:, None, :] - inverse.grid[None, :, :]) ** 2).sum(axis=-1)
+    assert inverse._nearest(Lab, chunksize=64).tolist() == dist.argmin(axis=1).tolist()
+
+
+@pytest.mark.parametrize("pcs", ["XYZ", "Lab"])
+@pytest.mark.parametrize(
+    "bp_out, use_bpc, weight",
+    [
+        ((0.001, 0.0012, 0.001), True, False),
+        ((0.002, 0.002, 0.0015), True, True),
+        ((0.003, 0.0031, 0.0025), False, False),
+    ],
+)
+def test_apply_black_array(data_files, pcs, bp_out, use_bpc, weight):
+    """Test _apply_black_array() matches the _mp_apply_black() worker."""
+    icc_profile_path = data_files[
+        "UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"
+    ]
+    iccp = ICCProfile(icc_profile_path)
+    clut = iccp.tags.A2B0.clut[:64]
+    bp = (0.0005, 0.0006, 0.0004)
+    wp = colormath.get_whitepoint("D50")
+    D50 = colormath.get_whitepoint("D50")
+    args = (pcs, bp, bp_out, wp if use_bpc else None, use_bpc, weight, D50)
+    expected = _mp_apply_black(
+        [[list(row) for row in block] for block in clut], None, None, *args, [], []
+    )
+    result = _apply_black_array(clut, *args)
+    assert abs(result - expected).max() < 1e-9
+
+
+@pytest.mark.parametrize("sat", [1.0, 0.5])
+def test_mp_hdr_tonemap_batched(sat):
+    """Test batched HDR gamut mapping matches the iterative implementation."""
+    rgb_space = colormath.get_rgb_space("Rec. 2020")
+    maxv = 0.04
+    HDR_XYZ = []
+    for RGB in ([1, 0, 0], [0, 1, 0], [0, 0, 1], [1, 1, 0], [0.2, 0.5, 1], [1, 1, 1]):
+        XYZ = [v * maxv * 1.2 for v in colormath.RGB2XYZ(*RGB, rgb_space=rgb_space)]
+        HDR_XYZ.append((RGB, [v * 0.9 for v in XYZ], XYZ))
+    results = [
+        _mp_hdr_tonemap(
+            [(RGB, list(XYZ1), list(XYZ2)) for RGB, XYZ1, XYZ2 in HDR_XYZ],
+            None,
+            None,
+            rgb_space,
+            maxv,
+            sat,
+            batched=batched,
+        )
+        for batched in (False, True)
+    ]
+    for expected, result in zip(*results):
+        for XYZ1, XYZ2 in zip(expected[1:], result[1:]):
+            I1 = colormath.XYZ2ICtCp(*XYZ1)[0]
+            I2 = colormath.XYZ2ICtCp(*XYZ2)[0]
+            assert abs(I1 - I2) < 0.0001
+            assert XYZ2 == pytest.approx(list(XYZ1), abs=1e-6)
+
+
+def test_iccprofile_use_mmap(data_files, tmp_path):
+    """Test memory-mapped profiles only copy tag data when it is accessed."""
+    icc_profile_path = data_files[
+        "UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"
+    ]
+    iccp = ICCProfile(icc_profile_path)
+    mmap_iccp = ICCProfile(icc_profile_path, load=False, use_mmap=True)
+    assert mmap_iccp.getDescription() == iccp.getDescription()
+    assert isinstance(dict.__getitem__(mmap_iccp.tags, "A2B0")[3], memoryview)
+    assert mmap_iccp.tags.A2B0.tagData == iccp.tags.A2B0.tagData
+    assert mmap_iccp.data == iccp.data
+    # writing back to the mapped file
+    path = str(tmp_path / "test.icc")
+    iccp.write(path)
+    mmap_iccp = ICCProfile(path, load=False, use_mmap=True)
+    mmap_iccp.getDescription()
+    mmap_iccp.write()
+    assert mmap_iccp._mmap is None
+    assert ICCProfile(path).data == iccp.data
+
+
+def test_iccprofile_data_follows_tag_changes(data_files):
+    """Test ICCProfile.data is re-assembled from the current tags."""
+    icc_profile_path = data_files[
+        "UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"
+    ]
+    iccp = ICCProfile(icc_profile_path)
+    data = iccp.data
+    assert iccp.data == data
+    iccp.calculateID()
+    assert iccp.data[128:] == data[128:]
+    data = iccp.data
+    iccp.tags.rXYZ.X = 0.5
+    assert iccp.data != data
+    assert iccp.tags.rXYZ.X == ICCProfile(iccp.data).tags.rXYZ.X
+    # shared tag data is only stored once
+    size = len(iccp.data)
+    iccp.tags.B2A2 = iccp.tags.B2A0
+    assert len(iccp.data) == size + 12
+
+
+def test_iccprofile_data_picks_up_tags_changed_in_place(data_files):
+    """Test ICCProfile.data picks up tags changed through a held reference."""
+    icc_profile_path = data_files[
+        "UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"
+    ]
+    iccp = ICCProfile(icc_profile_path)
+    desc = iccp.tags.desc
+    iccp.tags.A2B1 = iccp.tags.A2B0
+    data = iccp.data
+    desc.ASCII = b"Changed in place"
+    iccp.tags.A2B0.clut[0][0] = [32768, 32768, 32768]
+    assert iccp.data != data
+    changed = ICCProfile(iccp.data)
+    assert changed.tags.desc.ASCII == b"Changed in place"
+    assert changed.tags.A2B1.tagData == iccp.tags.A2B0.tagData
+    assert changed.tags.A2B1.tagData != ICCProfile(data).tags.A2B1.tagData
+
+
+def test_iccprofile_write_calculate_id(data_files):
+    """Test the profile ID is calculated while writing the profile."""
+    icc_profile_path = data_files[
+        "UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"
+    ]
+    iccp = ICCProfile(icc_profile_path)
+    iccp.setDescription("Test")
+    stream = BytesIO(b"\0" * 4)
+    stream.seek(4)
+    iccp.write(stream, calculate_id=True)
+    ID = iccp.ID
+    assert ID == iccp.calculateID()
+    assert stream.getvalue()[4:] == iccp.data
+    assert ICCProfile(stream.getvalue()[4:]).ID == ID
+
+
+def test_iccprofile_write_calculate_id_tags_changed_in_place(data_files):
+    """Test writing and the profile ID pick up tags changed in place."""
+    icc_profile_path = data_files[
+        "UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"
+    ]
+    iccp = ICCProfile(icc_profile_path)
+    desc = iccp.tags.desc
+    iccp.tags.A2B1 = iccp.tags.A2B0
+    ID = iccp.calculateID()
+    desc.ASCII = b"Changed in place"
+    assert iccp.calculateID() != ID
+    ID = iccp.calculateID()
+    iccp.tags.A2B0.clut[0][0] = [32768, 32768, 32768]
+    assert iccp.calculateID() != ID
+    stream = BytesIO()
+    iccp.write(stream, calculate_id=True)
+    written = ICCProfile(stream.getvalue())
+    assert written.ID == iccp.calculateID()
+    assert written.ID == written.calculateID()
+    assert written.tags.desc.ASCII == b"Changed in place"
+    assert written.tags.A2B0.clut[0][0] == [32768, 32768, 32768]
+    assert written.tags.A2B1.tagData == iccp.tags.A2B0.tagData
+
+
+def test_iccprofile_cache(data_files, monkeypatch):
+    """Test the ICC profile cache is bounded and keeps pinned profiles."""
+    from DisplayCAL import icc_profile
+
+    cache = ICCProfileCache(max_bytes=1024**2)
+    monkeypatch.setattr(icc_profile, "_iccprofilecache", cache)
+    path1 = data_files["UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"]
+    path2 = data_files["UP2516D #1 2022-03-23 16-06 D6500 2.2 F-S XYZLUT+MTX.icc"]
+    iccp1 = ICCProfile(str(path1), use_cache=True)
+    assert ICCProfile(str(path1), use_cache=True) is iccp1
+    assert cache.stats()["hits"] == 1
+    cache.pin(iccp1)
+    iccp2 = ICCProfile(str(path2), use_cache=True)
+    # Both profiles don't fit into the cache, but the first one is pinned
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["entries"] == 1
+    assert stats["bytes"] <= stats["max_bytes"] + iccp1._get_cache_size()
+    assert ICCProfile(str(path1), use_cache=True) is iccp1
+    assert ICCProfile(str(path2), use_cache=True) is not iccp2
+    cache.unpin(iccp1)
+    # Changed profiles are removed from the cache
+    iccp1.setDescription("Test")
+    assert iccp1._key not in cache
+
+
+def test_iccprofile_cache_size_counts_encoded_tags(data_files):
+    """Test the cache size estimate counts encoded data of parsed tags."""
+    iccp = ICCProfile(
+        str(data_files["UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"])
+    )
+    size = iccp._get_cache_size()
+    assert size >= iccp.size
+    iccp.tags.A2B0.clut
+    iccp.calculateID()
+    assert iccp._get_cache_size() >= size + len(iccp.tags.A2B0.tagData)
+
+
+def test_iccprofile_cache_size_accounting(data_files, monkeypatch):
+    """Test the ICC profile cache only estimates the size of new entries."""
+    cache = ICCProfileCache()
+    calls = []
+    get_cache_size = ICCProfile._get_cache_size
+
+    def _get_cache_size(self):
+        calls.append(self)
+        return get_cache_size(self)
+
+    monkeypatch.setattr(ICCProfile, "_get_cache_size", _get_cache_size)
+    profiles = [
+        ICCProfile(str(path))
+        for name, path in data_files.items()
+        if name.endswith(".icc")
+    ]
+    for i, profile in enumerate(profiles):
+        cache.put(i, profile)
+    assert calls == profiles
+    sizes = [get_cache_size(profile) for profile in profiles]
+    assert cache.stats()["bytes"] == sum(sizes)
+    cache.put(0, profiles[0])
+    cache.discard(1)
+    assert cache.stats()["bytes"] == sum(sizes) - sizes[1]
+
+
+@pytest.mark.parametrize("use_processes", [False, True])
+def test_profile_scanner(data_files, tmp_path, use_processes):
+    """Test ProfileScanner parses profiles in parallel and skips invalid ones."""
+    invalid_path = tmp_path / "invalid.icc"
+    invalid_path.write_bytes(b"\0" * 256)
+    paths = [str(path) for name, path in data_files.items() if name.endswith(".icc")]
+    paths.append(str(invalid_path))
+    scanner = ProfileScanner(num_workers=2, use_processes=use_processes)
+    results = {path: (info, exception) for path, info, exception in scanner.scan(paths)}
+    assert sorted(results) == sorted(paths)
+    assert results[str(invalid_path)][0] is None
+    assert isinstance(results[str(invalid_path)][1], ICCProfileInvalidError)
+    for path in paths[:-1]:
+        info, exception = results[path]
+        assert exception is None
+        assert info["tags"]["desc"] == ICCProfile(path).getDescription()
+    stats = scanner.stats()
+    assert stats["files"] == len(paths)
+    assert stats["errors"] == 1
+    assert stats["files_per_second"] > 0
+
+
+def test_curve_type_array_and_transfer_function():
+    """Test CurveType NumPy mirror, encoding and transfer function detection."""
+    curve = CurveType()
+    curve.set_trc(-2.4, 1024)
+    assert curve.array.tolist() == list(curve)
+    parsed = CurveType(curve.tagData)
+    assert parsed == [int(round(v)) for v in curve]
+    assert parsed.tagData == curve.tagData
+    (name, exp, outoffset), match = parsed.get_transfer_function()
+    assert name == "sRGB"
+    assert match > 0.999
+    # The array is invalidated when the curve changes
+    parsed[0] = 100
+    assert parsed.array[0] == 100
+
+
+def test_video_card_gamma_table_type_quantize_and_resize(data_files):
+    """Test VideoCardGammaTableType quantize() and resize()."""
+    icc_profile = ICCProfile(
+        data_files["UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"]
+    )
+    vcgt = icc_profile.tags.vcgt
+    assert VideoCardGammaTableType(vcgt.tagData, b"vcgt").data == vcgt.data
+    resized = vcgt.resized(vcgt.entryCount)
+    assert resized.data == vcgt.data
+    resized = vcgt.resized(17)
+    assert resized.entryCount == 17
+    assert [channel[0] for channel in resized.data] == [c[0] for c in vcgt.data]
+    assert [channel[-1] for channel in resized.data] == [c[-1] for c in vcgt.data]
+    vcgt.quantize(8)
+    assert vcgt.entrySize == 1
+    assert max(max(channel) for channel in vcgt.data) <= 255
+    assert VideoCardGammaTableType(vcgt.tagData, b"vcgt").data == vcgt.data
+
+
+def test_iccprofile_is_same(data_files):
+    """Test ICCProfile.isSame decides in tiers, cheapest first."""
+    path = data_files["UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"]
+    iccp1 = ICCProfile(str(path))
+    iccp2 = ICCProfile(str(path))
+    for iccp in (iccp1, iccp2):
+        iccp.ID = b"\0" * 16
+    stats = dict(issame_stats)
+    assert iccp1.isSame(iccp2)
+    assert issame_stats["tags"] == stats["tags"] + 1
+    iccp2.tags.wtpt.X += 0.01
+    assert not iccp1.isSame(iccp2)
+    assert issame_stats["tags"] == stats["tags"] + 2
+    del iccp2.tags["wtpt"]
+    assert not iccp1.isSame(iccp2)
+    assert issame_stats["fingerprint"] == stats["fingerprint"] + 1
+    iccp1.calculateID()
+    assert iccp1.isSame(str(path))
+    assert issame_stats["id"] == stats["id"] + 1
+    assert not iccp1.isSame(iccp2, force_calculation=True)
+    assert issame_stats["md5"] == stats["md5"]
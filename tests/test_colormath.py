@@ -1,7 +1,19 @@
 # -*- coding: utf-8 -*-
 import pytest
 
-from DisplayCAL.colormath import smooth_avg_old, smooth_avg
+from DisplayCAL.colormath import (
+    XYZ2RGB,
+    Matrix3x3,
+    caches,
+    cat_matrices,
+    clear_caches,
+    get_rgb_space,
+    get_whitepoint,
+    rgb_spaces,
+    smooth_avg,
+    smooth_avg_old,
+    wp_adaption_matrix,
+)
 from tests.data.display_data import DisplayData
 
 
@@ -123,3 +135,125 @@ def test_smooth_avg_protetced_values_2():
         0,
     ]
     assert result == expected_result
+
+
+def test_get_rgb_space_cache_is_keyed_by_components():
+    """testing if get_rgb_space returns the same result for the same components"""
+    clear_caches()
+    rgb_space = list(rgb_spaces["Adobe RGB (1998)"])
+    result_1 = get_rgb_space(rgb_space)
+    result_2 = get_rgb_space(list(rgb_space))
+    assert result_1 is result_2
+    # Changing the RGB space in place must not return the previous result
+    rgb_space[0] = 1.8
+    assert get_rgb_space(rgb_space)[0] == 1.8
+    assert get_rgb_space.cache.stats()["hits"] == 1
+
+
+def test_xyz2rgb_trc_changed_in_place():
+    """testing if XYZ2RGB picks up a TRC changed in place"""
+    clear_caches()
+    trc = [v / 1023.0 for v in range(1024)]
+    rgb_space = [[trc, list(trc), list(trc)], "D65"] + list(rgb_spaces["sRGB"][2:5])
+    RGB = XYZ2RGB(0.19, 0.2, 0.22, rgb_space)
+    assert XYZ2RGB(0.19, 0.2, 0.22, rgb_space) == RGB
+    trc[:] = [(v / 1023.0) ** 2.2 for v in range(1024)]
+    RGB_changed = XYZ2RGB(0.19, 0.2, 0.22, rgb_space)
+    assert RGB_changed[0] != pytest.approx(RGB[0])
+    assert RGB_changed[1:] == pytest.approx(RGB[1:])
+
+
+def test_xyz2rgb_trc_cache_is_keyed_by_identity(monkeypatch):
+    """testing if XYZ2RGB does not freeze (copy and hash) the TRC values"""
+    from DisplayCAL import colormath, util_cache
+
+    clear_caches()
+    trc = [[(v / 4095.0) ** 2.2 for v in range(4096)] for _ in range(3)]
+    rgb_space = [trc, "D65"] + list(rgb_spaces["sRGB"][2:5])
+    calls = []
+    _freeze = util_cache.freeze
+
+    def freeze(value):
+        calls.append(value)
+        return _freeze(value)
+
+    monkeypatch.setattr(colormath, "freeze", freeze)
+    monkeypatch.setattr(util_cache, "freeze", freeze)
+    RGB = XYZ2RGB(0.19, 0.2, 0.22, rgb_space)
+    assert XYZ2RGB(0.19, 0.2, 0.22, rgb_space) == RGB
+    assert not any(value is trc or value in trc for value in calls)
+    for key in get_rgb_space.cache:
+        assert key[0] == tuple(map(id, rgb_space))
+    assert get_rgb_space.cache.stats()["hits"] == 1
+    assert caches["XYZ2RGB.interp"].stats()["hits"] == 3
+
+
+def test_wp_adaption_matrix_cache_is_keyed_by_value():
+    """testing if wp_adaption_matrix caches CAT matrices by value"""
+    clear_caches()
+    cat = Matrix3x3(cat_matrices["Bradford"])
+    result_1 = wp_adaption_matrix("D65", "D50", cat)
+    result_2 = wp_adaption_matrix("D65", "D50", Matrix3x3(cat))
+    assert result_1 is result_2
+    cat[0][0] += 0.1
+    assert wp_adaption_matrix("D65", "D50", cat) != result_1
+
+
+def test_clear_caches():
+    """testing if clear_caches clears all registered caches"""
+    get_whitepoint("D65", 100)
+    wp_adaption_matrix("D65", "D50")
+    assert len(caches["get_whitepoint.cache"])
+    clear_caches()
+    for cache in caches.values():
+        assert len(cache) == 0
+        assert cache.stats()["hits"] == 0
+
+
+def test_matrix3x3_is_a_list_of_rows():
+    """testing if Matrix3x3 can be used like a list of lists"""
+    matrix = Matrix3x3([(1, 2, 3), (4, 5, 6), (7, 8, 10)])
+    assert matrix == [[1, 2, 3], [4, 5, 6], [7, 8, 10]]
+    assert matrix[1][2] == 6
+    assert all(isinstance(row, list) for row in matrix)
+    with pytest.raises(ValueError) as cm:
+        matrix.update([(1, 2, 3), (4, 5, 6)])
+    assert str(cm.value) == "Invalid number of rows for 3x3 matrix: 2"
+    with pytest.raises(ValueError) as cm:
+        matrix.update([(1, 2, 3), (4, 5, 6), (7, 8)])
+    assert str(cm.value) == "Invalid number of columns for 3x3 matrix: 2"
+
+
+def test_matrix3x3_mul():
+    """testing if Matrix3x3 applies to vectors and composes with matrices"""
+    matrix = Matrix3x3([(1, 2, 3), (4, 5, 6), (7, 8, 10)])
+    assert matrix * (1, 0, -1) == [-2, -2, -3]
+    result = matrix * Matrix3x3([(0, 1, 0), (1, 0, 0), (0, 0, 2)])
+    assert isinstance(result, Matrix3x3)
+    assert result == [[2, 1, 6], [5, 4, 12], [8, 7, 20]]
+
+
+def test_matrix3x3_mul_array_of_vectors():
+    """testing if Matrix3x3 applies to every vector of a NumPy array"""
+    numpy = pytest.importorskip("numpy")
+    matrix = get_rgb_space("Rec. 2020")[-1]
+    values = numpy.random.default_rng(0).uniform(0, 1, (2, 5, 3))
+    result = matrix * values
+    assert result.shape == values.shape
+    for vector, expected in zip(values.reshape(-1, 3), result.reshape(-1, 3)):
+        assert matrix * vector.tolist() == pytest.approx(expected.tolist())
+
+
+def test_matrix3x3_inverted_is_cached_by_value():
+    """testing if Matrix3x3 inverses are cached by value"""
+    clear_caches()
+    matrix = Matrix3x3(cat_matrices["CAT02"])
+    inverted = matrix.inverted()
+    assert matrix.inverted() is inverted
+    identity = matrix * inverted
+    for i, row in enumerate(identity):
+        assert row == pytest.approx([1 if j == i else 0 for j in range(3)], abs=1e-12)
+    other = Matrix3x3(matrix)
+    assert other.inverted() == inverted
+    assert other.inverted() is not inverted
+    assert caches["Matrix3x3.inverse_cache"].stats()["hits"] == 1
@@ -0,0 +1,342 @@
+# -*- coding: utf-8 -*-
+import numpy
+import pytest
+
+from DisplayCAL import colormath
+from DisplayCAL import colormath_array
+
+
+def random_values(low, high, count=200, seed=0):
+    """Return random (count, 3) values between low and high"""
+    rng = numpy.random.default_rng(seed)
+    return rng.uniform(low, high, (count, 3))
+
+
+def scalar_results(func, values, *args, **kwargs):
+    """Call the scalar function for every row of values"""
+    return numpy.array([func(*row, *args, **kwargs) for row in values.tolist()])
+
+
+@pytest.mark.parametrize(
+    "name, low, high, args",
+    [
+        ("XYZ2Lab", (0, 0, 0), (96, 100, 82), ()),
+        ("XYZ2Lab", (0, 0, 0), (1, 1, 1), ("D65", 1.0)),
+        ("Lab2XYZ", (0, -128, -128), (100, 128, 128), ()),
+        ("Lab2XYZ", (0, -128, -128), (100, 128, 128), ((0.95, 1.0, 1.09), 100)),
+        ("Lab2LCHab", (0, -128, -128), (100, 128, 128), ()),
+        ("LCHab2Lab", (0, 0, 0), (100, 128, 360), ()),
+        ("XYZ2xyY", (0.01, 0.01, 0.01), (1, 1, 1), ()),
+        ("xyY2XYZ", (0.1, 0.1, 0), (0.6, 0.6, 1), ()),
+        ("XYZ2Luv", (1, 1, 1), (96, 100, 82), ()),
+        ("XYZ2Lu_v_", (1, 1, 1), (96, 100, 82), ("D65",)),
+        ("Luv2XYZ", (10, -50, -50), (100, 50, 50), ()),
+        ("adapt", (0, 0, 0), (1, 1, 1), ("D65", "D50")),
+        ("adapt", (0, 0, 0), (1, 1, 1), ("D50", 5000, "CAT02")),
+        ("RGB2XYZ", (0, 0, 0), (1, 1, 1), ()),
+        ("RGB2XYZ", (0, 0, 0), (1, 1, 1), ("Rec. 709",)),
+        ("RGB2XYZ", (0, 0, 0), (1, 1, 1), ("SMPTE 240M",)),
+        ("RGB2XYZ", (0, 0, 0), (1, 1, 1), ("Adobe RGB (1998)", 100)),
+        ("XYZ2RGB", (0, 0, 0), (1, 1, 1), ()),
+        ("XYZ2RGB", (0, 0, 0), (1, 1, 1), ("Rec. 2020", 255, 2)),
+        ("XYZ2RGB", (-0.2, -0.2, -0.2), (1.2, 1.2, 1.2), ("ECI RGB v2", 1.0)),
+        ("RGB2Lab", (0, 0, 0), (1, 1, 1), ("Rec. 709",)),
+        ("Lab2RGB", (0, -60, -60), (100, 60, 60), ("sRGB",)),
+        ("XYZ2IPT", (0, 0, 0), (1, 1, 1), ()),
+        ("IPT2XYZ", (0, -0.5, -0.5), (1, 0.5, 0.5), ()),
+        ("XYZ2ICtCp", (0, 0, 0), (1, 1, 1), ()),
+        ("XYZ2DIN99", (0, 0, 0), (96, 100, 82), ()),
+        ("XYZ2DIN99b", (1, 1, 1), (96, 100, 82), ()),
+        ("XYZ2DIN99o", (1, 1, 1), (96, 100, 82), ()),
+        ("XYZ2DIN99c", (1, 1, 1), (96, 100, 82), ()),
+        ("XYZ2DIN99d", (1, 1, 1), (96, 100, 82), ()),
+        ("XYZ2DIN99dLCH", (1, 1, 1), (96, 100, 82), ()),
+        ("Lab2DIN99", (0, -128, -128), (100, 128, 128), ()),
+        ("Lab2DIN99bLCH", (0, -128, -128), (100, 128, 128), ()),
+        ("Lab2DIN99oLCH", (0, -128, -128), (100, 128, 128), ()),
+        ("Lab2DIN99c", (1, -100, -100), (100, 100, 100), ()),
+        ("Lab2DIN99d", (1, -100, -100), (100, 100, 100), ()),
+        ("DIN992Lab", (0, -40, -40), (100, 40, 40), ()),
+        ("DIN99b2Lab", (0, -40, -40), (100, 40, 40), ()),
+        ("DIN99o2Lab", (0, -40, -40), (100, 40, 40), ()),
+        ("DIN99c2Lab", (1, -40, -40), (100, 40, 40), ()),
+        ("DIN99d2Lab", (1, -40, -40), (100, 40, 40), ()),
+    ],
+)
+def test_array_functions_are_matching_scalar_functions(name, low, high, args):
+    """testing if the array functions are matching the scalar functions"""
+    values = random_values(low, high)
+    expected = scalar_results(getattr(colormath, name), values, *args)
+    result = getattr(colormath_array, name)(values, *args)
+    assert result.shape == values.shape
+    numpy.testing.assert_allclose(result, expected, rtol=1e-9, atol=1e-9)
+
+
+@pytest.mark.parametrize(
+    "gamma", [2.2, -2.4, 1.0 / -2.4, -3.0, 1.0 / -3.0, -240, 1.0 / -240, -709, -2084]
+)
+def test_specialpow_is_matching_scalar_specialpow(gamma):
+    """testing if the array specialpow is matching the scalar specialpow"""
+    values = random_values(-1, 1).ravel()
+    expected = [colormath.specialpow(v, gamma) for v in values]
+    result = colormath_array.specialpow(values, gamma)
+    numpy.testing.assert_allclose(result, expected, rtol=1e-9, atol=1e-12)
+
+
+def test_specialpow_slope_limit_is_matching_scalar_specialpow():
+    """testing if the array specialpow slope limit is matching the scalar one"""
+    values = random_values(-1, 1).ravel()
+    expected = [colormath.specialpow(v, 2.4, 32) for v in values]
+    result = colormath_array.specialpow(values, 2.4, 32)
+    numpy.testing.assert_allclose(result, expected, rtol=1e-12)
+
+
+def test_XYZ2xyY_black_uses_whitepoint_chromaticity():
+    """testing if XYZ2xyY returns the whitepoint chromaticity for black"""
+    result = colormath_array.XYZ2xyY([[0, 0, 0], [0.5, 0.4, 0.3]], "D65")
+    numpy.testing.assert_allclose(result[0], colormath.XYZ2xyY(0, 0, 0, "D65"))
+
+
+def test_XYZ2Lab_broadcasts_whitepoints():
+    """testing if XYZ2Lab accepts one whitepoint per color"""
+    values = random_values((0, 0, 0), (1, 1, 1), 3)
+    whitepoints = numpy.array(
+        [colormath.get_whitepoint(wp) for wp in ("D50", "D65", "A")]
+    )
+    result = colormath_array.XYZ2Lab(values, whitepoints, 1.0)
+    for XYZ, whitepoint, Lab in zip(values, whitepoints, result):
+        assert Lab == pytest.approx(
+            colormath.XYZ2Lab(*XYZ, whitepoint=tuple(whitepoint))
+        )
+
+
+def test_adapt_broadcasts_whitepoints_and_cat_matrices():
+    """testing if adapt accepts one whitepoint and CAT matrix per color"""
+    values = random_values((0, 0, 0), (1, 1, 1), 2)
+    whitepoints = numpy.array([colormath.get_whitepoint(wp) for wp in ("D65", "A")])
+    cats = ["Bradford", "CAT02"]
+    cat_matrices = numpy.array([colormath.get_cat_matrix(cat) for cat in cats])
+    result = colormath_array.adapt(values, whitepoints, "D50", cat_matrices)
+    for XYZ, whitepoint, cat, adapted in zip(values, whitepoints, cats, result):
+        assert adapted == pytest.approx(
+            colormath.adapt(*XYZ, tuple(whitepoint), "D50", cat)
+        )
+
+
+def test_array_functions_keep_leading_dimensions():
+    """testing if the array functions keep the shape of the input"""
+    values = random_values((0, 0, 0), (1, 1, 1), 24).reshape((2, 4, 3, 3))
+    result = colormath_array.XYZ2Lab(values)
+    assert result.shape == values.shape
+    numpy.testing.assert_allclose(
+        result.reshape((-1, 3)),
+        colormath_array.XYZ2Lab(values.reshape((-1, 3))),
+    )
+
+
+def test_asarray_wrong_shape():
+    """testing if a ValueError is raised for values without three components"""
+    with pytest.raises(ValueError) as cm:
+        colormath_array.XYZ2Lab([[0.5, 0.5]])
+    assert str(cm.value) == (
+        "Expected three components on the last axis, got shape (1, 2)"
+    )
+
+
+def delta_samples(count=300, seed=1):
+    """Return random pairs of Lab samples, including neutral and equal ones"""
+    Lab1 = random_values((0, -100, -100), (100, 100, 100), count, seed)
+    Lab2 = random_values((0, -100, -100), (100, 100, 100), count, seed + 1)
+    # close pairs
+    Lab2[:100] = Lab1[:100] + random_values(-2, 2, 100, seed + 2)
+    # neutral and equal samples
+    Lab1[100:110, 1:] = 0
+    Lab2[105:115, 1:] = 0
+    Lab2[120:125] = Lab1[120:125]
+    Lab1[130:135, 2] = 0
+    Lab1[135:140, 1] = 0
+    return Lab1, Lab2
+
+
+@pytest.mark.parametrize(
+    "method, p1, p2, p3",
+    [
+        ("76", None, None, None),
+        ("94", None, None, None),
+        ("94", True, None, None),
+        ("CMC", None, None, None),
+        ("CMC(2:1)", None, None, None),
+        ("CMC", 1.5, 0.8, None),
+        ("2000", None, None, None),
+        ("CIE2K", 2.0, 1.0, 0.5),
+        (1976, None, None, None),
+    ],
+)
+def test_delta_is_matching_scalar_delta(method, p1, p2, p3):
+    """testing if the array delta is matching colormath.delta"""
+    Lab1, Lab2 = delta_samples()
+    result = colormath_array.delta(Lab1, Lab2, method, p1, p2, p3)
+    expected = [
+        colormath.delta(*(tuple(v1) + tuple(v2)), method=method, p1=p1, p2=p2, p3=p3)
+        for v1, v2 in zip(Lab1.tolist(), Lab2.tolist())
+    ]
+    assert sorted(result) == sorted(expected[0])
+    for key in result:
+        numpy.testing.assert_allclose(
+            result[key], [d[key] for d in expected], rtol=1e-9, atol=1e-9
+        )
+
+
+def test_delta_multiple_methods():
+    """testing if delta returns the results of every requested method"""
+    Lab1, Lab2 = delta_samples()
+    methods = ["94", "00", "CMC(2:1)"]
+    result = colormath_array.delta(Lab1, Lab2, methods)
+    assert list(result) == methods
+    for method in methods:
+        expected = colormath_array.delta(Lab1, Lab2, method)
+        for key in expected:
+            numpy.testing.assert_array_equal(result[method][key], expected[key])
+
+
+def test_delta_itp():
+    """testing if the ITP delta is calculated from ICtCp samples"""
+    ICtCp1 = colormath_array.XYZ2ICtCp(random_values(0, 0.1, 10, 3))
+    ICtCp2 = colormath_array.XYZ2ICtCp(random_values(0, 0.1, 10, 4))
+    result = colormath_array.delta(ICtCp1, ICtCp2, "ITP")
+    dI, dCt, dCp = numpy.moveaxis(ICtCp2 - ICtCp1, -1, 0)
+    numpy.testing.assert_allclose(
+        result["E"], 720 * numpy.sqrt(dI**2 + (0.5 * dCt) ** 2 + dCp**2)
+    )
+    numpy.testing.assert_allclose(result["T"], 0.5 * dCt)
+
+
+@pytest.mark.parametrize(
+    "name, gamma",
+    [
+        ("sRGB", -2.4),
+        ("l*", -3.0),
+        ("Rec. 709", -709),
+        ("SMPTE 240M", -240),
+        ("PQ", -2084),
+        (2.2, 2.2),
+    ],
+)
+def test_transfer_function_is_matching_specialpow(name, gamma):
+    """testing if the transfer functions are matching colormath.specialpow"""
+    values = random_values(0, 1).ravel()
+    transfer_function = colormath_array.get_transfer_function(name)
+    numpy.testing.assert_allclose(
+        transfer_function.decode(values),
+        [colormath.specialpow(v, gamma) for v in values],
+        rtol=1e-12,
+        atol=1e-15,
+    )
+    numpy.testing.assert_allclose(
+        transfer_function.encode(values),
+        [colormath.specialpow(v, 1.0 / gamma) for v in values],
+        rtol=1e-12,
+        atol=1e-15,
+    )
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {},
+        {"black_cdm2": 0.1, "white_cdm2": 400},
+        {"white_cdm2": 1000, "system_gamma": 1.0, "ambient_cdm2": 0},
+    ],
+)
+def test_hlg_transfer_function_is_matching_hlg(kwargs):
+    """testing if the HLG transfer function is matching colormath.HLG"""
+    values = random_values(0, 1).ravel()
+    hlg = colormath.HLG(**kwargs)
+    transfer_function = colormath_array.get_transfer_function("HLG", **kwargs)
+    numpy.testing.assert_allclose(
+        transfer_function.decode(values), [hlg.eotf(v) for v in values], rtol=1e-12
+    )
+    numpy.testing.assert_allclose(
+        transfer_function.encode(values),
+        [hlg.eotf(v, True) for v in values],
+        rtol=1e-12,
+    )
+
+
+def test_bt1886_transfer_function_is_matching_bt1886():
+    """testing if the BT.1886 transfer function is matching colormath.BT1886"""
+    rgb_space = colormath.get_rgb_space("Rec. 709")
+    XYZbp = colormath.xyY2XYZ(*colormath.XYZ2xyY(*rgb_space[1])[:2], 0.01)
+    bt1886 = colormath.BT1886(rgb_space[-1], XYZbp, 0.25)
+    transfer_function = colormath_array.get_transfer_function(
+        "BT.1886", black_Y=0.01, outoffset=0.25
+    )
+    values = random_values(0, 1).ravel()
+    expected = [bt1886.apply(*(v * c for c in rgb_space[1]))[1] for v in values]
+    encoded = colormath_array.specialpow(values, 1.0 / -709)
+    result = transfer_function.decode(encoded)
+    numpy.testing.assert_allclose(result, expected, rtol=1e-9)
+    numpy.testing.assert_allclose(transfer_function.encode(result), encoded)
+
+
+@pytest.mark.parametrize("name", ["PQ", "HLG", "sRGB", 2.2])
+def test_transfer_function_lut_is_within_error_bounds(name):
+    """testing if the LUT errors are within the estimated error bounds"""
+    transfer_function = colormath_array.get_transfer_function(name)
+    lut = transfer_function.lut(4097)
+    assert lut.size == 4097
+    assert lut.decode_error < 1e-6
+    values = random_values(0, 1, 10000).ravel()
+    linear = transfer_function.decode(values)
+    decode_error = numpy.abs(lut.decode(values) - linear).max()
+    encode_error = numpy.abs(lut.encode(linear) - values).max()
+    assert decode_error <= lut.decode_error * 1.25
+    assert encode_error <= lut.encode_error * 1.25
+    # Input outside of the table range is clipped
+    numpy.testing.assert_allclose(lut.decode([-1, 2]), transfer_function.decode([0, 1]))
+
+
+def test_get_transfer_function_lut_is_cached():
+    """testing if get_transfer_function caches LUTs by name and parameters"""
+    lut = colormath_array.get_transfer_function("HLG", 1025, white_cdm2=400)
+    assert isinstance(lut, colormath_array.TransferFunctionLUT)
+    assert colormath_array.get_transfer_function("HLG", 1025, white_cdm2=400) is lut
+    assert colormath_array.get_transfer_function("HLG", 1025, white_cdm2=600) is not lut
+
+
+def test_get_transfer_function_unknown_name():
+    """testing if a ValueError is raised for unknown transfer function names"""
+    with pytest.raises(ValueError) as cm:
+        colormath_array.get_transfer_function("Rec. 2100")
+    assert str(cm.value) == "Unknown transfer function 'Rec. 2100'"
+
+
+def test_transfer_function_lut_not_monotonic():
+    """testing if a ValueError is raised for decreasing transfer functions"""
+
+    class Inverted(colormath_array.TransferFunction):
+        def decode(self, v):
+            return 1 - numpy.asarray(v)
+
+    with pytest.raises(ValueError) as cm:
+        Inverted().lut(17)
+    assert str(cm.value) == "Transfer function is not monotonically increasing"
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        (0, 400),
+        (0.1, 600, 0, 4000),
+        (0.5, 1000, 0.01, 10000, False),
+        (3, 100, 0.5, 1000),
+    ],
+)
+def test_bt2390_is_matching_scalar_bt2390(args):
+    """testing if the array BT2390.apply is matching colormath.BT2390.apply"""
+    values = numpy.linspace(-0.1, 1.1, 1201)
+    bt2390 = colormath.BT2390(*args)
+    result = colormath_array.BT2390(*args).apply(values)
+    numpy.testing.assert_allclose(
+        result, [bt2390.apply(v) for v in values], rtol=1e-12, atol=1e-15
+    )
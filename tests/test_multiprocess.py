@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+
+import threading
+
+import pytest
+
+from DisplayCAL import multiprocess
+from DisplayCAL.config import getcfg, setcfg
+
+
+class ThreadAbort:
+    def __init__(self):
+        self.event = threading.Event()
+
+
+def _multiply(data, thread_abort_event, progress_queue, factor):
+    if thread_abort_event and thread_abort_event.is_set():
+        return []
+    progress_queue.put(100)
+    return [value * factor for value in data]
+
+
+def test_pool_slice_reuses_pool():
+    """Test pool_slice() keeps results in order and reuses the pool."""
+    try:
+        data_out = multiprocess.pool_slice(
+            _multiply, list(range(20)), (2,), num_workers=2, num_batches=2
+        )
+        assert sum(data_out, []) == list(range(0, 40, 2))
+        pool = multiprocess._pool
+        assert pool is not None
+        multiprocess.pool_slice(_multiply, [1, 2], (2,), num_workers=2)
+        assert multiprocess._pool is pool
+    finally:
+        multiprocess.shutdown()
+    assert multiprocess._pool is None
+
+
+def test_pool_slice_restarts_pool_on_config_change():
+    """Test pool_slice() restarts the pool if the configuration changed."""
+    argyll_dir = getcfg("argyll.dir")
+    try:
+        multiprocess.pool_slice(_multiply, [1, 2], (2,), num_workers=2)
+        pool = multiprocess._pool
+        setcfg("argyll.dir", "/nonexistent")
+        data_out = multiprocess.pool_slice(_multiply, [1, 2], (2,), num_workers=2)
+        assert data_out == [[2], [4]]
+        assert multiprocess._pool is not pool
+    finally:
+        setcfg("argyll.dir", argyll_dir)
+        multiprocess.shutdown()
+
+
+def test_pool_slice_keeps_pool_on_unrelated_config_change():
+    """Test pool_slice() keeps the pool if other configuration changed."""
+    last_cal_path = getcfg("last_cal_path")
+    try:
+        multiprocess.pool_slice(_multiply, [1, 2], (2,), num_workers=2)
+        pool = multiprocess._pool
+        setcfg("last_cal_path", "/nonexistent.cal")
+        multiprocess.pool_slice(_multiply, [1, 2], (2,), num_workers=2)
+        assert multiprocess._pool is pool
+    finally:
+        setcfg("last_cal_path", last_cal_path)
+        multiprocess.shutdown()
+
+
+def test_pool_slice_abort():
+    """Test pool_slice() forwards the abort event to the workers."""
+    thread_abort = ThreadAbort()
+    thread_abort.event.set()
+    try:
+        data_out = multiprocess.pool_slice(
+            _multiply, list(range(4)), (2,), num_workers=2, thread_abort=thread_abort
+        )
+    finally:
+        multiprocess.shutdown()
+    assert data_out and not any(data_out)
+    assert thread_abort.event.is_set()
+
+
+def test_pool_slice_adaptive():
+    """Test pool_slice() with adaptive chunks returns results in input order."""
+    try:
+        data_out = multiprocess.pool_slice(
+            _multiply, list(range(1000)), (3,), num_workers=3, num_batches="auto"
+        )
+    finally:
+        multiprocess.shutdown()
+    assert len(data_out) > 3
+    assert sum(data_out, []) == list(range(0, 3000, 3))
+
+
+def test_adaptive_chunk_scheduler():
+    """Test AdaptiveChunkScheduler sizes chunks by throughput."""
+    scheduler = multiprocess.AdaptiveChunkScheduler(10000, 4, target_time=1.0)
+    assert scheduler.next_chunksize(0) == 625
+    scheduler.update(100, 0.1)
+    assert scheduler.next_chunksize(625) == 1000
+    # Chunks get smaller towards the end of the work
+    assert scheduler.next_chunksize(9000) == 250
+    assert scheduler.next_chunksize(9999) == 1
+
+
+def _square(data, thread_abort_event, progress_queue):
+    return [[value * value for value in row] for row in data]
+
+
+def _first(data, thread_abort_event, progress_queue):
+    return [row[:1] for row in data]
+
+
+def test_pool_slice_shared_array():
+    """Test pool_slice() with inputs and outputs in shared memory."""
+    try:
+        with multiprocess.SharedArray([[i, i + 1] for i in range(100)]) as data_in:
+            # Results matching the input shape are written back in-place
+            squared = multiprocess.pool_slice(_square, data_in, num_workers=2)
+            assert len(squared) == 2
+            assert data_in.array[3].tolist() == [9.0, 16.0]
+            # Or to a separate output array
+            with multiprocess.SharedArray(shape=(100, 1)) as out:
+                multiprocess.pool_slice(_first, data_in, num_workers=2, data_out=out)
+                assert out.array[:, 0].tolist() == [i * i for i in range(100)]
+            # Results not matching the output shape are returned as-is
+            data_out = multiprocess.pool_slice(_first, data_in, num_workers=2)
+            assert data_out[0][:2] == [[0.0], [1.0]]
+    finally:
+        multiprocess.shutdown()
+    # Returned results are copies that stay valid after closing
+    assert squared[1][0].tolist() == [2500.0, 2601.0]
+
+
+def test_shared_array_close_with_views():
+    """Test SharedArray.close() refuses to unmap memory views still use."""
+    with pytest.raises(BufferError):
+        with multiprocess.SharedArray([[1, 2], [3, 4]]) as data:
+            view = data.array[:1]
+    assert view.tolist() == [[1, 2]]
+    del view
+    data.close()
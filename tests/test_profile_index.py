@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import sqlite3
+
+from DisplayCAL.icc_profile import ICCProfile
+from DisplayCAL.profile_index import ProfileIndex, find_profiles
+
+
+def test_profile_index(data_files, tmp_path):
+    """Test profile metadata is indexed, revalidated and queried."""
+    name = "UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"
+    shutil.copy(data_files[name], tmp_path / name)
+    (tmp_path / "invalid.icc").write_bytes(b"\0" * 256)
+    index = ProfileIndex(str(tmp_path / "index.sqlite"))
+    infos = index.scan([str(tmp_path)])
+    assert len(infos) == 1
+    info = infos[0]
+    profile = ICCProfile(str(data_files[name]))
+    assert info["description"] == profile.getDescription()
+    assert info["profile_class"] == "mntr"
+    assert info["trc_type"] == "gamma"
+    assert info["wtpt"] == list(profile.tags.wtpt.values())
+    assert info["profile_id"] == profile.calculateID(False).hex()
+    assert "A2B0" in info["tags"]
+    index.close()
+
+    # The index is persistent
+    index = ProfileIndex(str(tmp_path / "index.sqlite"))
+    assert index.query(color_space="RGB", tags=["A2B0", "vcgt"]) == [info]
+    assert index.query(tags=["A2B0", "clrt"]) == []
+    assert index.query(min_version=4) == []
+
+    # Changed files are updated
+    profile.setDescription("Test")
+    profile.write(str(tmp_path / name))
+    os.utime(tmp_path / name, (0, 0))
+    assert index.get(str(tmp_path / name))["description"] == "Test"
+
+    # Removed files are dropped
+    os.remove(tmp_path / name)
+    assert index.scan([str(tmp_path)]) == []
+    assert index.query() == []
+
+
+def test_profile_index_scans_outside_transaction(data_files, tmp_path, monkeypatch):
+    """Test profiles are parsed before the index is locked for writing."""
+    from DisplayCAL import profile_index
+
+    name = "UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"
+    shutil.copy(data_files[name], tmp_path / name)
+    index = ProfileIndex(str(tmp_path / "index.sqlite"))
+    scan = profile_index.ProfileScanner.scan
+
+    def _scan(self, paths):
+        assert not index._conn.in_transaction
+        return scan(self, paths)
+
+    monkeypatch.setattr(profile_index.ProfileScanner, "scan", _scan)
+    assert len(index.scan([str(tmp_path)])) == 1
+    assert len(index.query()) == 1
+
+
+def test_profile_index_locked(data_files, tmp_path, capsys):
+    """Test a database locked by another connection does not fail updates."""
+    name = "UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"
+    shutil.copy(data_files[name], tmp_path / name)
+    filename = str(tmp_path / "index.sqlite")
+    index = ProfileIndex(filename, timeout=0.1)
+    index._connect()
+    conn = sqlite3.connect(filename)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        infos = index.scan([str(tmp_path)])
+    finally:
+        conn.rollback()
+        conn.close()
+    assert len(infos) == 1
+    assert "database is locked" in capsys.readouterr().out
+    assert index.query() == []
+    # The profile is stored on the next update
+    assert index.scan([str(tmp_path)]) == infos
+    assert len(index.query()) == 1
+
+
+def test_find_profiles(data_files, tmp_path, monkeypatch):
+    """Test profiles in a directory are found by criteria."""
+    from DisplayCAL import profile_index
+
+    name = "UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"
+    shutil.copy(data_files[name], tmp_path / name)
+    monkeypatch.setattr(profile_index, "_profile_index", ProfileIndex())
+    infos = find_profiles([str(tmp_path)], tags=["A2B0"])
+    assert [info["path"] for info in infos] == [str(tmp_path / name)]
+    assert find_profiles([str(tmp_path)], profile_class="abst") == []
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+import numpy
+import pytest
+
+from DisplayCAL.util_cache import IdentityCache, LRUCache, freeze, snapshot
+
+
+def test_freeze_compares_by_value():
+    """testing if freeze returns equal keys for equal values"""
+    assert freeze([1.0, [2.0, 3.0]]) == freeze((1.0, (2.0, 3.0)))
+    assert hash(freeze([[1, 2], [3, 4]])) == hash(((1, 2), (3, 4)))
+    assert freeze("D50") == "D50"
+
+
+def test_freeze_numpy_array():
+    """testing if freeze returns a key for NumPy arrays"""
+    array = numpy.arange(6.0).reshape((2, 3))
+    assert freeze(array) == freeze(array.copy())
+    assert freeze(array) != freeze(array.reshape((3, 2)))
+
+
+def test_freeze_unhashable():
+    """testing if freeze raises a TypeError for unhashable values"""
+    with pytest.raises(TypeError):
+        freeze({"a": 1})
+
+
+def test_lru_cache_evicts_least_recently_used():
+    """testing if LRUCache discards the least recently used entry"""
+    cache = LRUCache(2)
+    cache["a"] = 1
+    cache["b"] = 2
+    assert cache.get("a") == 1
+    cache["c"] = 3
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+    assert len(cache) == 2
+
+
+def test_lru_cache_stats():
+    """testing if LRUCache counts hits, misses and evictions"""
+    cache = LRUCache(1)
+    cache["a"] = 1
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    with pytest.raises(KeyError):
+        cache["b"]
+    cache["b"] = 2
+    assert cache.stats() == {
+        "entries": 1,
+        "maxsize": 1,
+        "hits": 1,
+        "misses": 2,
+        "evictions": 1,
+    }
+    cache.clear()
+    assert cache.stats() == {
+        "entries": 0,
+        "maxsize": 1,
+        "hits": 0,
+        "misses": 0,
+        "evictions": 0,
+    }
+
+
+def test_snapshot_compares_equal_until_changed():
+    """testing if snapshot copies nested lists"""
+    value = ([1.0, [2.0, 3.0]], "D50")
+    copy = snapshot(value)
+    assert copy == value
+    value[0][1][0] = 4.0
+    assert copy != value
+
+
+def test_identity_cache():
+    """testing if IdentityCache is keyed by identity and detects changes"""
+    cache = IdentityCache(2)
+    trc = [0.0, 0.5, 1.0]
+    cache.store((trc, "D65"), 1.0, value="a")
+    assert cache.lookup((trc, "D65"), 1.0) == "a"
+    assert cache.lookup((trc, "D65"), 100.0) is None
+    assert cache.lookup((list(trc), "D65"), 1.0) is None
+    trc[1] = 0.25
+    assert cache.lookup((trc, "D65"), 1.0) is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 3
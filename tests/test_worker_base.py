@@ -1,6 +1,12 @@
 # -*- coding: utf-8 -*-
 
+import os
+import sys
+
+import pytest
+
 from DisplayCAL import worker_base
+from DisplayCAL.icc_profile import ICCProfile
 
 
 def test_printcmdline_1():
@@ -23,3 +29,306 @@ def test_printcmdline_1():
     # fn = "<bound method WorkerBase.log of <DisplayCAL.worker.Worker object at 0x7f7b941bb6a0>>"
     cwd = "/tmp/DisplayCAL-i91d9z8_"
     worker_base.printcmdline(cmd=cmd, args=args, cwd=cwd)
+
+
+def test_xicclu_native_1(data_files):
+    """Test worker_base.xicclu_native() returns Xicclu.get() compatible output."""
+    icc_profile_path = data_files[
+        "UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"
+    ]
+    result = worker_base.xicclu_native(
+        str(icc_profile_path), ["255 255 255", "0 0 0"], scale=255, get_clip=True
+    )
+    assert len(result) == 2
+    assert result[0][:3] == pytest.approx([0.9642, 1.0, 0.8249], abs=1e-4)
+    assert result[0][3] is False
+    worker = worker_base.WorkerBase()
+    native = worker.xicclu(icc_profile_path, [[1, 1, 1], [0, 0, 0]], use_native=True)
+    assert native == [row[:3] for row in result]
+
+
+def test_xicclu_native_pcs(data_files):
+    """Test worker_base.xicclu_native() scales XYZ like xicclu -pX."""
+    icc_profile_path = str(
+        data_files["UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"]
+    )
+    XYZ = worker_base.xicclu_native(icc_profile_path, [[1, 1, 1]], pcs="x")
+    XYZ100 = worker_base.xicclu_native(icc_profile_path, [[1, 1, 1]], pcs="X")
+    assert XYZ100[0] == pytest.approx([v * 100 for v in XYZ[0]])
+    with pytest.raises(NotImplementedError):
+        worker_base.xicclu_native(icc_profile_path, [[1, 1, 1]], pcs="j")
+
+
+def test_xicclu_native_matches_xicclu(data_files, setup_argyll):
+    """Test worker_base.xicclu_native() against ArgyllCMS xicclu."""
+    if not worker_base.get_argyll_util("xicclu"):
+        pytest.skip("ArgyllCMS xicclu not available")
+    icc_profile_path = str(
+        data_files["UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"]
+    )
+    RGB = [[1, 1, 1], [0.25, 0.5, 0.75], [0, 0, 0]]
+    worker = worker_base.WorkerBase()
+    for pcs, tolerance in (("x", 1e-3), ("X", 0.1), ("l", 0.05)):
+        for intent in ("r", "a"):
+            expected = worker.xicclu(
+                icc_profile_path,
+                RGB,
+                intent,
+                pcs=pcs,
+                use_native=False,
+                use_pool=False,
+                use_cache=False,
+            )
+            native = worker.xicclu(
+                icc_profile_path, RGB, intent, pcs=pcs, use_native=True, use_cache=False
+            )
+            for values, expected_values in zip(native, expected):
+                assert values == pytest.approx(expected_values, abs=tolerance)
+
+
+FAKE_XICCLU = """
+import sys
+
+# Block buffer stdout like a C program writing to a pipe does (regardless of
+# PYTHONUNBUFFERED)
+sys.stdout = open(sys.stdout.fileno(), "w", buffering=8192, closefd=False)
+scale = 1.0
+output_scale = 100.0 if "-pX" in sys.argv else 1.0
+for arg in sys.argv[1:]:
+    if arg.startswith("-s"):
+        scale = float(arg[2:])
+for line in sys.stdin:
+    values = [float(v) / scale for v in line.split()]
+    if not values:
+        break
+    ivalues = " ".join(f"{v:.6f}" for v in values)
+    ovalues = " ".join(f"{v * output_scale:.6f}" for v in values)
+    if "-v0" in sys.argv:
+        sys.stdout.write(f"{ovalues}\\n")
+    else:
+        sys.stdout.write(f"{ivalues} [RGB] -> {ovalues} [XYZ]\\n")
+"""
+
+
+@pytest.fixture(scope="function")
+def fake_xicclu(monkeypatch, tmp_path):
+    """Replace Argyll's xicclu with a script echoing its input."""
+    script = tmp_path / "xicclu"
+    script.write_text(f"#!{sys.executable}\n{FAKE_XICCLU}")
+    script.chmod(0o755)
+    monkeypatch.setattr(worker_base, "get_argyll_util", lambda name: str(script))
+    monkeypatch.setattr(worker_base, "get_argyll_version", lambda name: [2, 3, 1])
+    yield script
+
+
+def test_xicclu_pool_reuses_process(data_files, fake_xicclu):
+    """Test XiccluPool keeps a warm process per profile and parameters."""
+    icc_profile_path = data_files[
+        "UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"
+    ]
+    pool = worker_base.XiccluPool(max_idle=1, idle_timeout=60)
+    try:
+        result = pool.lookup(icc_profile_path, [[0.25, 0.5, 0.75], [0, 0, 0]])
+        assert result == [[0.25, 0.5, 0.75], [0, 0, 0]]
+        assert len(pool) == 1
+        pid = pool._idle[0][1].subprocess.pid
+        assert pool.lookup(icc_profile_path, [1, 1, 1]) == [[1, 1, 1]]
+        assert pool._idle[0][1].subprocess.pid == pid
+        # different lookup parameters need another process, least recently
+        # used idle process is ended
+        assert pool.lookup(icc_profile_path, ["255 0 0"], scale=255) == [[1, 0, 0]]
+        assert len(pool) == 1
+        assert pool._idle[0][1].subprocess.pid != pid
+    finally:
+        pool.shutdown()
+    assert len(pool) == 0
+
+
+def test_xicclu_pool_keys_on_profile_file(data_files, fake_xicclu, tmp_path):
+    """Test XiccluPool does not share processes between profile files."""
+    icc_profile_path = data_files[
+        "UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"
+    ]
+    copy_path = tmp_path / "copy.icc"
+    copy_path.write_bytes(icc_profile_path.read_bytes())
+    pool = worker_base.XiccluPool(max_idle=2, idle_timeout=60)
+    try:
+        pool.lookup(icc_profile_path, [1, 1, 1])
+        pool.lookup(copy_path, [1, 1, 1])
+        assert len(pool) == 2
+        assert {xicclu.profile_path for key, xicclu in pool._idle} == {
+            str(icc_profile_path),
+            str(copy_path),
+        }
+    finally:
+        pool.shutdown()
+
+
+def test_xicclu_pool_keys_on_file_stat(data_files, fake_xicclu, tmp_path, monkeypatch):
+    """Test XiccluPool keys on file stats without calculating the profile ID."""
+    copy_path = tmp_path / "copy.icc"
+    copy_path.write_bytes(
+        data_files[
+            "UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"
+        ].read_bytes()
+    )
+    calls = []
+    monkeypatch.setattr(ICCProfile, "calculateID", lambda *args: calls.append(args))
+    pool = worker_base.XiccluPool(max_idle=2, idle_timeout=60)
+    try:
+        pool.lookup(copy_path, [1, 1, 1])
+        pid = pool._idle[0][1].subprocess.pid
+        pool.lookup(copy_path, [0, 0, 0])
+        assert pool._idle[-1][1].subprocess.pid == pid
+        # A changed file needs a new process
+        os.utime(copy_path, (0, 0))
+        pool.lookup(copy_path, [0, 0, 0])
+        assert pool._idle[-1][1].subprocess.pid != pid
+    finally:
+        pool.shutdown()
+    assert calls == []
+
+
+def test_xicclu_process_pads_block_buffered_output(data_files, fake_xicclu):
+    """Test XiccluProcess gets results from a block buffered xicclu."""
+    icc_profile_path = str(
+        data_files["UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"]
+    )
+    xicclu = worker_base.XiccluProcess(icc_profile_path)
+    xicclu.timeout = 5
+    try:
+        for i in range(3):
+            v = i / 4.0
+            xicclu.lookup([[v, v, v], [1, 0, v]])
+            assert xicclu.get() == [[v, v, v], [1, 0, v]]
+    finally:
+        xicclu.exit(False)
+
+
+def test_xicclu_pool_timeout(data_files, fake_xicclu):
+    """Test XiccluPool kills a process that stops responding."""
+    icc_profile_path = data_files[
+        "UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"
+    ]
+    fake_xicclu.write_text(
+        f"#!{sys.executable}\nimport sys, time\nsys.stdin.readline()\ntime.sleep(60)\n"
+    )
+    pool = worker_base.XiccluPool(max_idle=1, idle_timeout=60, timeout=0.5)
+    try:
+        with pytest.raises(IOError, match="did not respond"):
+            pool.lookup(icc_profile_path, [1, 1, 1])
+        assert len(pool) == 0
+    finally:
+        pool.shutdown()
+
+
+def test_xicclu_lookup_iter(data_files, fake_xicclu):
+    """Test streaming Xicclu.lookup_iter() matches Xicclu.get()."""
+    icc_profile_path = data_files[
+        "UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"
+    ]
+    idata = [[i / 4999.0, 0.5, 1] for i in range(5000)]
+    xicclu = worker_base.Xicclu(str(icc_profile_path), direction="b", streaming=True)
+    rows = xicclu.lookup_iter(idata, output_format=("<H", 65535))
+    assert next(rows) == b"\x00\x00\x00\x80\xff\xff"
+    assert len(list(rows)) == 4999
+    assert xicclu.closed
+    with worker_base.Xicclu(str(icc_profile_path), direction="b") as xicclu:
+        xicclu(idata)
+    assert xicclu.get(output_format=("<H", 65535))[0] == b"\x00\x00\x00\x80\xff\xff"
+
+
+def test_xicclu_get_array(data_files, fake_xicclu):
+    """Test bulk parsing in Xicclu.get_array() and Xicclu.get_packed()."""
+    icc_profile_path = data_files[
+        "UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"
+    ]
+    with worker_base.Xicclu(str(icc_profile_path), direction="b") as xicclu:
+        xicclu([[0.25, 0.5, 1], [0, 0.75, 0.125]])
+    values = xicclu.get_array()
+    assert values.tolist() == xicclu.get()
+    output_format = ("<H", 65535)
+    assert xicclu.get_packed(output_format, True) == b"".join(
+        xicclu.get(output_format=output_format, reverse=True)
+    )
+    xicclu.output = [
+        b"0.100000 0.200000 0.300000 [RGB] -> 9.000000 8.000000 7.000000 [XYZ]\n",
+        b"0.900000 0.900000 0.900000 [RGB] -> 1.000000 1.000000 1.000000 [XYZ]"
+        b" (clip)\n",
+        b"[Actual 1.1 1.2 1.3, deltaE 0.5]\n",
+    ]
+    xicclu.show_actual_if_clipped = True
+    values, clip, actual = xicclu.get_array(get_clip=True)
+    assert values.tolist() == [[9, 8, 7], [1, 1, 1]]
+    assert clip.tolist() == [False, True]
+    assert actual[1].tolist() == [1.1, 1.2, 1.3, 0.5]
+    assert xicclu.get(get_clip=True)[1][3] == [1.1, 1.2, 1.3, 0.5]
+    # unexpected tokens never drop rows
+    xicclu.output = [
+        b"0.100000 0.200000 0.300000 [RGB] -> 9.000000 8.000000 7.000000 [XYZ]\n",
+        b"0.900000 0.900000 0.900000 [RGB] -> 1.000000 1.000000 1.000000 [XYZ]"
+        b" (unexpected)\n",
+    ]
+    xicclu.show_actual_if_clipped = False
+    assert xicclu.get_array().tolist() == [[9, 8, 7], [1, 1, 1]]
+    with pytest.raises(ValueError):
+        xicclu._parse_values([b"1 2 3", b"4 5"], 3)
+    xicclu.verbose = 0
+    xicclu.output = [b"9.0 8.0 7.0\n", b"1.0 1.0 1.0 (unexpected)\n"]
+    with pytest.raises(ValueError):
+        xicclu.get_array()
+
+
+def test_xicclu_cache(data_files, fake_xicclu, monkeypatch, tmp_path):
+    """Test XiccluCache memory and disk tiers."""
+    icc_profile_path = data_files[
+        "UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"
+    ]
+    cache = worker_base.XiccluCache(cachedir=str(tmp_path / "cache"))
+    key = cache.get_key(b"\0" * 16, [[1, 1, 1]], "r", "f")
+    assert key != cache.get_key(b"\0" * 16, [[1, 1, 0]], "r", "f")
+    assert cache.get(key) is None
+    cache.set(key, [[0.9642, 1.0, 0.8249, False]])
+    assert cache.get(key) == [[0.9642, 1.0, 0.8249, False]]
+    cache.clear()
+    # disk tier
+    assert cache.get(key) == [[0.9642, 1.0, 0.8249, False]]
+    assert cache.stats()["disk_hits"] == 1
+    # WorkerBase.xicclu only runs the lookup on the first call
+    cache = worker_base.XiccluCache()
+    monkeypatch.setattr(worker_base, "_xicclu_cache", cache)
+    worker = worker_base.WorkerBase()
+    for i in range(2):
+        result = worker.xicclu(
+            str(icc_profile_path), [[0.5, 0.5, 0.5]], "r", "b", use_cache=True
+        )
+        assert result == [[0.5, 0.5, 0.5]]
+        result[0][0] = 0
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_xicclu_cache_profile_key(data_files, tmp_path):
+    """Test XiccluCache keys on the profile file xicclu reads."""
+    icc_profile_path = data_files[
+        "UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"
+    ]
+    copy_path = tmp_path / "copy.icc"
+    copy_path.write_bytes(icc_profile_path.read_bytes())
+    key = worker_base.XiccluCache.get_profile_key(str(copy_path))
+    # same contents, different file
+    assert key != worker_base.XiccluCache.get_profile_key(str(icc_profile_path))
+    # in-memory changes are not seen by xicclu, but by in-process lookups
+    profile = ICCProfile(str(copy_path))
+    profile.setDescription("Changed")
+    assert worker_base.XiccluCache.get_profile_key(profile) == key
+    assert worker_base.XiccluCache.get_profile_key(profile, True) != key
+    # the file changed on disk
+    stat = copy_path.stat()
+    os.utime(copy_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert worker_base.XiccluCache.get_profile_key(str(copy_path)) != key
+    # profiles without a file are identified by their contents
+    profile.fileName = None
+    assert worker_base.XiccluCache.get_profile_key(profile) == profile.calculateID(
+        False
+    )
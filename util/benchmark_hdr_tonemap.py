@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Compare the iterative and batched HDR gamut mapping of _mp_hdr_tonemap.
+
+Usage: benchmark_hdr_tonemap.py [clutres]
+
+The input colors are captured from creating a synthetic PQ cLUT profile.
+
+"""
+
+import copy
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from DisplayCAL import icc_profile, multiprocess
+
+
+class Progress:
+    def put(self, item):
+        pass
+
+
+def main(clutres=33):
+    import numpy
+
+    captured = {}
+    pool_slice = multiprocess.pool_slice
+
+    def capture(func, data_in, args=None, *pargs, **kwargs):
+        if func is icc_profile._mp_hdr_tonemap:
+            captured["HDR_XYZ"] = data_in.array.tolist()
+            captured["args"] = args
+        return pool_slice(func, data_in, args, *pargs, **kwargs)
+
+    multiprocess.pool_slice = capture
+    try:
+        icc_profile.create_synthetic_hdr_clut_profile(
+            "PQ", "Rec. 2020", "Benchmark", white_cdm2=400, clutres=clutres
+        )
+    finally:
+        multiprocess.pool_slice = pool_slice
+        multiprocess.shutdown()
+
+    results = []
+    for batched in (False, True):
+        HDR_XYZ = copy.deepcopy(captured["HDR_XYZ"])
+        ts = time.perf_counter()
+        HDR_XYZ = icc_profile._mp_hdr_tonemap(
+            HDR_XYZ, None, Progress(), *captured["args"], batched=batched
+        )
+        print(
+            "%s: %.3f s"
+            % ("Batched" if batched else "Iterative", time.perf_counter() - ts)
+        )
+        results.append(numpy.array(HDR_XYZ, dtype=numpy.float64))
+    I = [icc_profile._XYZ2ICtCp_array(result[:, 1:])[..., 0] for result in results]
+    print("Max intensity difference: %.6f" % abs(I[0] - I[1]).max())
+    print("Max XYZ difference: %.6f" % abs(results[0] - results[1]).max())
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:2]])
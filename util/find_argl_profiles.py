@@ -6,17 +6,9 @@ import sys
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from DisplayCAL import ICCProfile as iccp
-from DisplayCAL.defaultpaths import iccprofiles, iccprofiles_home
+from DisplayCAL.profile_index import find_profiles
 
-for p in set(iccprofiles_home + iccprofiles):
-    if os.path.isdir(p):
-        for f in os.listdir(p):
-            try:
-                profile = iccp.ICCProfile(os.path.join(p, f))
-            except Exception:
-                pass
-            else:
-                if profile.creator == b"argl":
-                    print(f)
-                    print("")
+for info in find_profiles():
+    if info["creator"] == "argl":
+        print(os.path.basename(info["path"]))
+        print("")
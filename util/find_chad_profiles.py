@@ -6,19 +6,11 @@ import sys
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from DisplayCAL import ICCProfile as iccp
-from DisplayCAL.defaultpaths import iccprofiles, iccprofiles_home
+from DisplayCAL.icc_profile import ICCProfile
+from DisplayCAL.profile_index import find_profiles
 
-
-for p in set(iccprofiles_home + iccprofiles):
-    if os.path.isdir(p):
-        for f in os.listdir(p):
-            try:
-                profile = iccp.ICCProfile(os.path.join(p, f))
-            except Exception:
-                pass
-            else:
-                if "chad" in profile.tags:
-                    print(f)
-                    print(profile.tags.chad)
-                    print("")
+for info in find_profiles(tags=["chad"]):
+    profile = ICCProfile(info["path"], load=False, use_mmap=True)
+    print(os.path.basename(info["path"]))
+    print(profile.tags.chad)
+    print("")
@@ -6,26 +6,18 @@ import sys
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from DisplayCAL import ICCProfile as iccp
-from DisplayCAL.defaultpaths import iccprofiles, iccprofiles_home
+from DisplayCAL.icc_profile import ICCProfile
+from DisplayCAL.profile_index import find_profiles
 
 
 def main():
-    for p in set(iccprofiles_home + iccprofiles):
-        if not os.path.isdir(p):
-            continue
-        for f in os.listdir(p):
-            try:
-                profile = iccp.ICCProfile(os.path.join(p, f))
-            except Exception:
-                pass
-            if not "clrt" in profile.tags:
-                continue
-            print(f)
-            print(profile.connectionColorSpace)
-            for name in profile.tags.clrt:
-                print(name, profile.tags.clrt[name])
-            print("")
+    for info in find_profiles(tags=["clrt"]):
+        profile = ICCProfile(info["path"], load=False, use_mmap=True)
+        print(os.path.basename(info["path"]))
+        print(profile.connectionColorSpace)
+        for name in profile.tags.clrt:
+            print(name, profile.tags.clrt[name])
+        print("")
 
 
 if __name__ == "__main__":
@@ -6,21 +6,11 @@ import sys
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from DisplayCAL import ICCProfile as iccp
-from DisplayCAL.defaultpaths import iccprofiles, iccprofiles_home
+from DisplayCAL.profile_index import find_profiles
 
-
-for p in set(iccprofiles_home + iccprofiles):
-    if os.path.isdir(p):
-        for f in os.listdir(p):
-            try:
-                profile = iccp.ICCProfile(os.path.join(p, f))
-            except Exception:
-                pass
-            else:
-                if profile.profileClass == b"spac":
-                    print(f)
-                    print("ICC Version:", profile.version)
-                    print("Color space:", profile.colorSpace)
-                    print("Connection color space:", profile.connectionColorSpace)
-                    print("")
+for info in find_profiles(profile_class="spac"):
+    print(os.path.basename(info["path"]))
+    print("ICC Version:", info["version"])
+    print("Color space:", info["color_space"])
+    print("Connection color space:", info["connection_color_space"])
+    print("")
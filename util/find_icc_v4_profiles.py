@@ -6,23 +6,15 @@ import sys
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from DisplayCAL import ICCProfile as iccp
-from DisplayCAL.defaultpaths import iccprofiles, iccprofiles_home
+from DisplayCAL.icc_profile import ICCProfile
+from DisplayCAL.profile_index import find_profiles
 
-
-for p in set(iccprofiles_home + iccprofiles):
-    if os.path.isdir(p):
-        for f in os.listdir(p):
-            try:
-                profile = iccp.ICCProfile(os.path.join(p, f))
-            except Exception:
-                pass
-            else:
-                if profile.version >= 4:
-                    print(os.path.join(p, f))
-                    print(
-                        "Descriptions:",
-                        profile.tags.desc.keys(),
-                        profile.tags.desc.values()[0].keys(),
-                    )
-                    print("")
+for info in find_profiles(min_version=4):
+    profile = ICCProfile(info["path"], load=False, use_mmap=True)
+    print(info["path"])
+    print(
+        "Descriptions:",
+        list(profile.tags.desc.keys()),
+        list(list(profile.tags.desc.values())[0].keys()),
+    )
+    print("")